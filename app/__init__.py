@@ -1,30 +1,80 @@
-from dotenv import load_dotenv
-load_dotenv()  #containing my key
-from flask import Flask, jsonify 
-from .config import get_config
+import logging, os, time
+_IMPORTED_AT = time.perf_counter()
+from typing import Optional
+from flask import Flask, jsonify
 from .extensions import db
+#kept light on purpose: config (reads env), models, routes and the services behind them are
+#imported inside create_app, and the NumPy/requests-backed services only when a view first needs them
 
-from .routes.recommendations import bp as recs_bp
-# Initialize flask application, allows app/ to be a package imported
+log = logging.getLogger(__name__)
+_IMPORT_SECONDS = time.perf_counter() - _IMPORTED_AT
+#what importing the package cost, create_app reports it as the "import" phase
 
-from .models.appdetails import App
-#initially wasn't being imported, needs db/metadata
-#import after routes to prevent circular imports
 
-def create_app(env: str = "dev") -> Flask:
+def create_app(env: Optional[str] = None) -> Flask:
+    from dotenv import load_dotenv
+    load_dotenv()  #containing my key, before config reads the environment
+    from .config import get_config
+    from .services.engine_profile import configure as configure_engines, tune_engines
+    from .services.metrics import METRICS, init_metrics
+    from .services.profiler import init_profiler
+
+    phases = {"import": _IMPORT_SECONDS}
+    started = time.perf_counter()
     app = Flask(__name__)  #Create the WSGI app object
-    app.config.from_object(get_config(env))
+    app.config.from_object(get_config(env or os.getenv("APP_ENV", "dev")))
+    #APP_ENV=prod picks ProdConfig (engine tuning on, no schema creation, ranking preload)
+    configure_engines(app)
     db.init_app(app)
+    phases["config"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from .routes.recommendations import bp as recs_bp
+    app.register_blueprint(recs_bp, url_prefix="/api")
+    phases["routes"] = time.perf_counter() - started
 
     @app.get("/api/health")
     def health():
         return jsonify({"ok": True})
+        #liveness only, /api/ready is the one that waits for the database and warm ranking data
 
-    app.register_blueprint(recs_bp, url_prefix="/api")
-
-    #dev-only: create tables on startup (use Alembic later)
+    @app.get("/api/ready")
+    def ready():
+        from sqlalchemy import text
+        from .services.readiness import get_warmup
+        warmup = get_warmup(app)
+        warmup.start()
+        #no-op once running/done in this process, so a forked worker starts its own on the first probe
+        try:
+            db.session.execute(text("SELECT 1"))
+            database = True
+        except Exception:
+            database = False
+        status = warmup.status()
+        ok = database and status["ready"]
+        body = {"ok": ok, "database": database, **status, "startup_ms": app.extensions["startup"]}
+        return jsonify(body), 200 if ok else 503
 
+    started = time.perf_counter()
     with app.app_context():
-        db.create_all()
+        tune_engines(app, db.engines)
+        #pragmas go on before the first connection is opened
+        if app.config.get("SCHEMA_AUTO_CREATE", False):
+            from .services.schema import init_schema
+            init_schema()
+            #dev only: tables + FTS index on boot, production runs scripts/init_db.py once per deploy
+        init_metrics(app, db.engine)
+        #per-route latency, per-request SQL and steam counters at /api/metrics, nothing installed when disabled
+    init_profiler(app)
+    phases["database"] = time.perf_counter() - started
+
+    app.extensions["startup"] = {name: round(seconds * 1000, 1) for name, seconds in phases.items()}
+    for name, seconds in phases.items():
+        METRICS.startup_seconds.set(seconds, name)
+    log.info("create_app ready in %.0fms: %s", sum(phases.values()) * 1000, app.extensions["startup"])
 
-    return app
\ No newline at end of file
+    if app.config.get("PRELOAD_RANKING", False):
+        from .services.readiness import get_warmup
+        get_warmup(app).start()
+        #snapshot, facets and personalizer load in the background, /api/ready reports 503 until done
+    return app
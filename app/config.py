@@ -7,9 +7,92 @@ class BaseConfig:
     SQLALCHEMY_TRACK_MODIFICATIONS = False  
     STEAM_API_KEY = os.getenv("STEAM_API_KEY", "")  # Steam API key, fetched from environment or left empty
     STEAM_CACHE_TTL_SECONDS = int(os.getenv("STEAM_CACHE_TTL_SECONDS", "3600"))  # Time-to-live for Steam API cache, in seconds
+    STEAM_CACHE_MAX_ENTRIES = int(os.getenv("STEAM_CACHE_MAX_ENTRIES", "2048"))  # LRU bound on cached responses
+    STEAM_CACHE_MAX_BYTES = int(os.getenv("STEAM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # and on their approximate size
+    STEAM_CACHE_STALE_WHILE_REVALIDATE = os.getenv("STEAM_CACHE_STALE_WHILE_REVALIDATE", "0") == "1"  # serve expired entries while one refresh runs
+    STEAM_DISK_CACHE_PATH = os.getenv("STEAM_DISK_CACHE_PATH", "./steam_cache.db")  # shared by all processes on the host, empty disables
+    STEAM_DISK_CACHE_MAX_BYTES = int(os.getenv("STEAM_DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # compressed payload budget
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")  # rendered API responses + catalog version, shared by all processes, empty disables
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))  # upper bound on staleness between writes
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "1024"))  # per-process LRU in front of the file
+    STEAM_API_BASE = os.getenv("STEAM_API_BASE", "https://api.steampowered.com")  # point these at a fake server for tests
+    STEAM_STORE_BASE = os.getenv("STEAM_STORE_BASE", "https://store.steampowered.com")
+    STEAM_RATE_PER_SECOND = float(os.getenv("STEAM_RATE_PER_SECOND", "0.66"))  # storefront allows roughly 200 requests / 5 minutes
+    STEAM_RATE_BURST = int(os.getenv("STEAM_RATE_BURST", "10"))
+    STEAM_MAX_RETRIES = int(os.getenv("STEAM_MAX_RETRIES", "4"))  # retries on 429/5xx/connection errors
+    STEAM_BACKOFF_SECONDS = float(os.getenv("STEAM_BACKOFF_SECONDS", "1.0"))  # first backoff, doubles per retry
+    STEAM_TIMEOUT_SECONDS = float(os.getenv("STEAM_TIMEOUT_SECONDS", "10"))
+    SEED_WORKERS = int(os.getenv("SEED_WORKERS", "8"))  # concurrent fetches for /api/seed
+    SEED_CHUNK_SIZE = int(os.getenv("SEED_CHUNK_SIZE", "200"))  # rows per bulk upsert
+    BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "50"))  # jobs a worker claims at once
+    BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "8"))  # concurrent fetches per batch
+    BACKFILL_MAX_ATTEMPTS = int(os.getenv("BACKFILL_MAX_ATTEMPTS", "5"))
+    BACKFILL_RETRY_BASE_SECONDS = float(os.getenv("BACKFILL_RETRY_BASE_SECONDS", "60"))  # doubles per failed attempt
+    BACKFILL_LEASE_SECONDS = int(os.getenv("BACKFILL_LEASE_SECONDS", "600"))  # running jobs older than this are reclaimed
+    BACKFILL_REQUEUE_SECONDS = int(os.getenv("BACKFILL_REQUEUE_SECONDS", "86400"))  # failed/missing jobs can be queued again after this
+    REFRESH_REQUESTS_PER_MINUTE = float(os.getenv("REFRESH_REQUESTS_PER_MINUTE", "30"))  # steam budget for the refresh scheduler
+    REFRESH_MIN_AGE_SECONDS = int(os.getenv("REFRESH_MIN_AGE_SECONDS", "86400"))  # apps fetched more recently aren't candidates
+    REFRESH_MAX_DEFER_SECONDS = int(os.getenv("REFRESH_MAX_DEFER_SECONDS", str(30 * 86400)))  # cap on backing off unchanged apps
+    REFRESH_OWNER_WEIGHT = float(os.getenv("REFRESH_OWNER_WEIGHT", "10"))  # one owner counts like this many reviews
+    REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "4"))
+    RANKING_ENGINE = os.getenv("RANKING_ENGINE", "sql")  # "sql" ranks in the database, "memory" uses the NumPy snapshot
+    RANKING_REFRESH_SECONDS = float(os.getenv("RANKING_REFRESH_SECONDS", "5"))  # how often the snapshot checks for changed rows
+    RANKING_FULL_RELOAD_SECONDS = float(os.getenv("RANKING_FULL_RELOAD_SECONDS", "3600"))  # full reload, picks up deletes
+    RANKING_WATERMARK_OVERLAP_SECONDS = float(os.getenv("RANKING_WATERMARK_OVERLAP_SECONDS", "60"))  # refreshes re-read this far behind the watermark, for late commits
+    PERSONAL_HALF_LIFE_DAYS = float(os.getenv("PERSONAL_HALF_LIFE_DAYS", "30"))  # recency boost of a played game halves this often
+    if PERSONAL_HALF_LIFE_DAYS < 1:
+        raise ValueError("PERSONAL_HALF_LIFE_DAYS must be at least 1")
+        #shorter half-lives decay a recent play to nothing within hours, and push the recency math towards float64 limits
+    PERSONAL_RECENCY_BOOST = float(os.getenv("PERSONAL_RECENCY_BOOST", "2.0"))  # extra weight for a game played just now
+    PERSONAL_GEM_WEIGHT = float(os.getenv("PERSONAL_GEM_WEIGHT", "0.3"))  # share of the gem score in ?user_id= ranking
+    PERSONAL_MAX_PROFILES = int(os.getenv("PERSONAL_MAX_PROFILES", "10000"))  # cached user profiles per worker
+    LIBRARY_STORE_PATH = os.getenv("LIBRARY_STORE_PATH", "")  # owned_games snapshot file the workers memory-map, empty = every worker scans the table
+    LIBRARY_RELOAD_SECONDS = float(os.getenv("LIBRARY_RELOAD_SECONDS", "3600"))  # full reload of the library store
+    LIBRARY_CHECK_SECONDS = float(os.getenv("LIBRARY_CHECK_SECONDS", "5"))  # how often a worker reloads libraries other processes synced (library_syncs)
+    SEARCH_RELEVANCE_WEIGHT = float(os.getenv("SEARCH_RELEVANCE_WEIGHT", "0.05"))  # weight of FTS relevance vs gem score for ?sort=relevance
+    LEADERBOARDS_ENABLED = os.getenv("LEADERBOARDS_ENABLED", "1") == "1"  # serve matching /recommendations views from materialized boards
+    LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "200"))  # rows kept per board, deeper pages fall back to live scoring
+    LEADERBOARD_MIN_REVIEWS = [int(x) for x in os.getenv("LEADERBOARD_MIN_REVIEWS", "50").split(",") if x.strip()]  # thresholds to materialize
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "1000"))  # per POST /recommendations/batch
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "64"))  # requests scored together, bounds the rows x users matrix
+    SIMILAR_K = int(os.getenv("SIMILAR_K", "20"))  # neighbors stored per app
+    SIMILAR_FEATURE_WEIGHT = float(os.getenv("SIMILAR_FEATURE_WEIGHT", "0.5"))  # genre/category cosine vs co-ownership cosine
+    SIMILAR_MAX_OWNERS = int(os.getenv("SIMILAR_MAX_OWNERS", "2000"))  # owners sampled per app for co-ownership
+    SIMILAR_CHUNK_SIZE = int(os.getenv("SIMILAR_CHUNK_SIZE", "256"))  # apps per build chunk
+    SIMILAR_PROCESSES = int(os.getenv("SIMILAR_PROCESSES", "4"))
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"  # request/SQL/steam instrumentation + /api/metrics, off installs no hooks
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"  # sample stacks of in-flight requests, dump the slow ones
+    PROFILER_SLOW_MS = float(os.getenv("PROFILER_SLOW_MS", "500"))  # requests at least this slow get written
+    PROFILER_FORCE_TOKEN = os.getenv("PROFILER_FORCE_TOKEN", "")  # "X-Profile: <token>" forces a dump of a fast request, empty = header ignored
+    PROFILER_FORCED_PER_MINUTE = float(os.getenv("PROFILER_FORCED_PER_MINUTE", "6"))  # cap on forced dumps per worker
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))  # time between stack samples
+    PROFILER_DIR = os.getenv("PROFILER_DIR", "./profiles")  # collapsed stacks, one .folded file per profiled request
+    DB_TUNING = os.getenv("DB_TUNING", "0") == "1"  # per-backend engine tuning below, on by default in ProdConfig
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # wait this long on a locked database before erroring
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is crash-safe under WAL, only an OS crash can lose the last commits
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # page cache per connection, negative means KiB (64MB)
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes of the file read through mmap
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # connections kept open per process
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # extra connections allowed under bursts
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # reopen server connections older than this
+    DB_READ_ROUTING = os.getenv("DB_READ_ROUTING", "0") == "1"  # send read-only recommendation queries to the read engine
+    DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")  # replica for those reads, empty = read-only pool on the same SQLite file
+    SCHEMA_AUTO_CREATE = os.getenv("SCHEMA_AUTO_CREATE", "1") == "1"  # create_all + FTS index in create_app, off in prod (scripts/init_db.py)
+    PRELOAD_RANKING = os.getenv("PRELOAD_RANKING", "0") == "1"  # warm snapshot/facets/personalizer at boot, /api/ready waits for it
     
 class DevConfig(BaseConfig):
     DEBUG = True  
 
+class ProdConfig(BaseConfig):
+    DEBUG = False
+    DB_TUNING = os.getenv("DB_TUNING", "1") == "1"
+    #WAL + pragmas on SQLite, sized pre-pinged pools on server databases
+    SCHEMA_AUTO_CREATE = os.getenv("SCHEMA_AUTO_CREATE", "0") == "1"
+    PRELOAD_RANKING = os.getenv("PRELOAD_RANKING", "1") == "1"
+
+CONFIGS = {"dev": DevConfig, "prod": ProdConfig, "production": ProdConfig}
+
 def get_config(env: str):
-    return DevConfig  
\ No newline at end of file
+    return CONFIGS.get((env or "dev").lower(), DevConfig)  
\ No newline at end of file
@@ -1,2 +1,4 @@
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+from .services.engine_profile import RoutingSession
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+#RoutingSession sends reads inside @read_only views to the "read" bind when DB_READ_ROUTING is on
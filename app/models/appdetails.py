@@ -1,8 +1,24 @@
 from datetime import datetime
+from math import log10
+from typing import Optional
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Index, ForeignKey, Integer, String, Boolean, BigInteger, Text
+from sqlalchemy import Index, ForeignKey, Integer, String, Boolean, BigInteger, Text, Float, event
 from ..extensions import db
 
+
+def gem_score(positive: Optional[int], negative: Optional[int], recommendations_total: Optional[int]) -> float:
+    """
+    Hidden gems score, kept here so the stored App.score column and anything
+    scoring raw rows agree: pos_ratio / (1 + log10(popularity_proxy)).
+    Popularity prefers storefront recommendations_total and falls back to reviews.
+    """
+    total = int(positive or 0) + int(negative or 0)
+    if total == 0:
+        return 0.0
+    popularity = recommendations_total if recommendations_total is not None else total
+    return (int(positive or 0) / total) / (1.0 + log10(max(int(popularity or 0), 1)))
+
+
 class App(db.Model):
     __tablename__ = "apps"
     appid = db.Column(Integer, primary_key=True)
@@ -17,15 +33,17 @@ class App(db.Model):
     release_date_raw = db.Column(String)
     last_fetched_ts = db.Column(BigInteger)
     #don't wanna hammer the API, impoetant for cache
+    #epoch seconds of the last storefront fetch, the refresh scheduler ranks staleness off it
 
     #moved over from old GAMES table:
     positive      = db.Column(Integer, default=0)
     negative      = db.Column(Integer, default=0)
     players       = db.Column(Integer)    # nullable
-    last_updated  = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    last_fetched_ts = db.Column(BigInteger)
-    #don't wanna hammer the API, impoetant for cache
+    last_updated  = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    #onupdate so the in-memory ranking snapshot can refresh incrementally off it
+
+    score = db.Column(Float, nullable=False, default=0.0)
+    #stored gem_score, kept in sync by the listeners below so ranking is an index scan
 
     genres = db.relationship("AppGenre", back_populates="app",
                              cascade="all, delete-orphan")
@@ -48,6 +66,29 @@ class App(db.Model):
     def pos_ratio(self) -> float:
         t = self.total_reviews
         return (self.positive / t) if t else 0.0
+
+    @property
+    def popularity_proxy(self) -> int:
+        #replacement for owners_estimate, storefront recommendations or reviews
+        val = self.recommendations_total
+        if val is None:
+            val = self.total_reviews
+        return max(int(val or 0), 1)
+
+    __table_args__ = (
+        Index("idx_apps_score", "score", "appid"),
+        Index("idx_apps_last_updated", "last_updated"),
+    )
+    #composite so ORDER BY score DESC, appid DESC + keyset pagination walk the index
+
+
+@event.listens_for(App, "before_insert")
+@event.listens_for(App, "before_update")
+def _refresh_score(mapper, connection, target: App) -> None:
+    """Recompute the stored score whenever an App row goes through the ORM."""
+    target.score = gem_score(target.positive, target.negative, target.recommendations_total)
+
+
 class AppGenre(db.Model):
     """Genre table that connects to parent table app, through foreign key
     appid. Index named idx_genre created just to sift through all genres."""
@@ -81,4 +122,12 @@ class OwnedGame(db.Model):
     appid = db.Column(Integer, ForeignKey("apps.appid", ondelete="CASCADE"), primary_key=True)
     playtime_forever = db.Column(Integer, default=0)     
     rtime_last_played = db.Column(BigInteger) 
-    __table_args__ = (Index("idx_owned_user", "user_id"),)
+    __table_args__ = (Index("idx_owned_user", "user_id"), Index("idx_owned_app", "appid"))
+    #appid index for "who owns this" lookups (profile patches, co-ownership)
+
+class LibrarySync(db.Model):
+    """When each user's owned_games last changed, written in the same transaction as the
+    rows. Other worker processes poll it to reload just those libraries."""
+    __tablename__ = "library_syncs"
+    user_id = db.Column(Integer, primary_key=True)
+    synced_at = db.Column(Float, nullable=False, index=True)  # epoch seconds
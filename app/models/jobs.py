@@ -0,0 +1,31 @@
+from sqlalchemy import Index, Integer, String, BigInteger, Text
+from ..extensions import db
+
+class BackfillJob(db.Model):
+    """Queue of appids whose metadata still needs fetching. Keyed on appid so a game
+    owned by a thousand users is still one job, workers claim due rows in batches
+    (claimed_by/claimed_at act as a lease in case a worker dies mid-batch)."""
+    __tablename__ = "backfill_jobs"
+    appid = db.Column(Integer, primary_key=True)
+    status = db.Column(String, nullable=False, default="pending")
+    #pending -> running -> done, or back to pending with a later next_run_at,
+    #failed once attempts run out, missing if steam has no store page for it
+    attempts = db.Column(Integer, nullable=False, default=0)
+    next_run_at = db.Column(BigInteger, nullable=False, default=0)  # epoch seconds
+    claimed_by = db.Column(String)
+    claimed_at = db.Column(BigInteger)
+    last_error = db.Column(Text)
+    __table_args__ = (Index("idx_backfill_due", "status", "next_run_at"),)
+
+class AppRefreshState(db.Model):
+    """Bookkeeping for the staleness refresh scheduler. content_hash is the digest of the
+    last storefront payload we stored; when a refresh comes back identical the app is
+    deferred for longer each time (unchanged_streak) so quota goes to apps that move.
+    Failed refetches back off the same way (failure_streak), so an app that always
+    fails can't take the front of the queue every cycle."""
+    __tablename__ = "app_refresh_state"
+    appid = db.Column(Integer, db.ForeignKey("apps.appid", ondelete="CASCADE"), primary_key=True)
+    content_hash = db.Column(String)
+    unchanged_streak = db.Column(Integer, nullable=False, default=0)
+    failure_streak = db.Column(Integer, nullable=False, default=0)
+    defer_until = db.Column(BigInteger, nullable=False, default=0)  # epoch seconds
@@ -0,0 +1,27 @@
+from sqlalchemy import Integer, String, Float, BigInteger
+from ..extensions import db
+
+class LeaderboardEntry(db.Model):
+    """Materialized top-N hidden gems per scope ("all", "genre:<name>", "category:<name>",
+    lowercased) and min_reviews threshold. Rebuilt offline into a shadow table and swapped
+    in by rename (services/leaderboards.py), so rows carry everything the endpoint returns."""
+    __tablename__ = "leaderboard_entries"
+    scope = db.Column(String, primary_key=True)
+    min_reviews = db.Column(Integer, primary_key=True)
+    rank = db.Column(Integer, primary_key=True)
+    appid = db.Column(Integer, nullable=False)
+    name = db.Column(String)
+    positive = db.Column(Integer)
+    negative = db.Column(Integer)
+    recommendations_total = db.Column(Integer)
+    score = db.Column(Float, nullable=False)
+
+class LeaderboardScope(db.Model):
+    """One row per materialized (scope, min_reviews): how many apps qualified vs how many
+    were kept, so a page that runs off the end of a truncated board falls back to live scoring."""
+    __tablename__ = "leaderboard_scopes"
+    scope = db.Column(String, primary_key=True)
+    min_reviews = db.Column(Integer, primary_key=True)
+    qualified = db.Column(Integer, nullable=False)
+    materialized = db.Column(Integer, nullable=False)
+    built_at = db.Column(BigInteger, nullable=False)  # epoch seconds
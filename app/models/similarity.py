@@ -0,0 +1,19 @@
+from sqlalchemy import Index, ForeignKey, Integer, Float, BigInteger
+from ..extensions import db
+
+class AppNeighbor(db.Model):
+    """Precomputed "more like this" lists, top K neighbors per app ordered by rank.
+    Built offline by scripts/build_neighbors.py so a lookup is one primary key range read."""
+    __tablename__ = "app_neighbors"
+    appid = db.Column(Integer, ForeignKey("apps.appid", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(Integer, primary_key=True)
+    neighbor_appid = db.Column(Integer, nullable=False)
+    score = db.Column(Float, nullable=False)
+    __table_args__ = (Index("idx_neighbor_appid", "neighbor_appid"),)
+    #reverse lookup: whose lists mention an app that just changed
+
+class NeighborDirty(db.Model):
+    """Apps whose genres/categories or owners changed since the last neighbor build."""
+    __tablename__ = "app_neighbors_dirty"
+    appid = db.Column(Integer, primary_key=True)
+    marked_at = db.Column(BigInteger, nullable=False)
@@ -1,8 +1,11 @@
-from flask import Blueprint, jsonify, request, current_app
-from ..extensions import db
-from ..models.appdetails import App
-from ..services.steam_client import SteamClient
-from math import log10
+import json
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from ..services.ranking import top_gems_sql, serialize_row, parse_cursor, format_cursor
+from ..services.search import matching_appids
+from ..services.response_cache import cached_response, get_response_cache
+from ..services.engine_profile import read_only
+#NumPy-backed services and the steam client (requests) are imported inside the views that use them,
+#so spawning a worker or running a script doesn't pay for them until the first request needs them
 
 bp = Blueprint("recommendations", __name__)
          
@@ -10,87 +13,183 @@ bp = Blueprint("recommendations", __name__)
 #user request to seed some appids into the database for development purposes
 def seed():
 
+    from ..services.seed_pipeline import seed_apps
+    from ..services.steam_client import SteamClient
     data = request.get_json(silent=True) or {}
     #grab JSON payload from user request, if none present use empty dict
     #silent true means if JSON is malformed just return None rather than error
     appids = data.get("appids") or [570, 440, 620]  # Dota2/TF2/Portal2
-    client = SteamClient(cache_ttl=current_app.config.get("STEAM_CACHE_TTL_SECONDS", 3600))
-    #build client from config then grab ttl from config, default to 3600 if not present
-    for raw in appids:
-        appid = int(raw)
-        details = client.app_details(appid).get(str(appid), {}).get("data", {}) or {}
-        summary = client.app_reviews_summary(appid).get("query_summary", {}) or {}
-        #create a new Game instance or update existing
-        
-        game = App.query.get(appid) or App(appid=appid, name=details.get("name", f"App {appid}"))
-        game.positive = summary.get("total_positive", 0)
-        game.negative = summary.get("total_negative", 0)
-
-        db.session.add(game)
-    db.session.commit()
-    return jsonify({"seeded": len(appids)}), 201
+    app = current_app._get_current_object()
+    client = SteamClient.for_app(app)
+    #shared per process: one cache + token bucket, ttl/retries/base urls come from config
+    report = seed_apps(
+        appids, client,
+        workers=app.config.get("SEED_WORKERS", 8),
+        chunk_size=app.config.get("SEED_CHUNK_SIZE", 200),
+    )
+    return jsonify(report.as_dict()), 201
+
+@bp.get("/cache/stats")
+def cache_stats():
+    """Hit/miss/eviction counters for this worker's steam and API response caches."""
+    from ..services.steam_client import SteamClient
+    responses = get_response_cache()
+    libraries = current_app.extensions.get("library_store")
+    return jsonify({
+        "steam": SteamClient.for_app(current_app).cache_stats(),
+        "responses": responses.stats() if responses is not None else None,
+        "libraries": libraries.stats() if libraries is not None else None,
+        #only reported once something user-aware loaded it, this endpoint doesn't trigger the load
+    })
 
 """ Big picture: when user submits a POST request to /seed with a list of appids,
-    our server will use the SteamClient to fetch details and review summaries for each appid.
-    It will then create or update Game records in the database with the fetched data,
-    and finally commit the changes to the database. 
+    our server will use the SteamClient to fetch details and review summaries for each appid,
+    a few at a time under a shared rate limit. Fetched rows are upserted into App in chunks,
+    and appids that still fail after retries come back in "failed" instead of failing the seed.
 """
 
 @bp.get("/recommendations")
+@cached_response
+#rendered once per catalog version + query string, see services/response_cache.py
+@read_only
+#SELECTs go to the read replica / read-only pool when DB_READ_ROUTING is on
 def recommendations():
     """
     Return top N 'hidden gems' using a simple score:
     score = pos_ratio / (1 + log10(popularity_proxy))
+    Score is stored on App (see gem_score), so filtering, ordering and the
+    LIMIT all happen in SQL, or in the NumPy snapshot when RANKING_ENGINE is
+    "memory". Pass the X-Next-Cursor header back as ?cursor=
+    to get the next page. With ?user_id= the ranking is personalized (see
+    services/personalize.py) and owned games are left out.
+    genre=, category= (repeat or comma separate to OR values), is_free= and
+    min_metacritic= filter through in-memory facet bitmaps (services/facets.py).
+    include_facets=1 wraps the response as {"results": [...], "facets": counts}.
+    The global view and single genre/category views are served from the
+    materialized leaderboards (scripts/build_leaderboards.py) when they exist.
     """
+    from ..services.facets import FacetQuery, get_facet_index, TRUE_VALUES
+    from ..services.leaderboards import leaderboard_page, scope_for
+    from ..services.personalize import recommend_for_user
+    from ..services.ranking_engine import top_gems_memory
     limit = int(request.args.get("limit", 10))
     #default to top 10 if not specified, otherwise grab from user request
     #same process for all below, uses request args to grab query parameters
     min_reviews = int(request.args.get("min_reviews", 50))
     name_query = request.args.get("q")  # optional name filter
+    match = request.args.get("match", "substring")  # "substring" or "prefix"
+    by_relevance = request.args.get("sort") == "relevance"  # blend search relevance into the gem score
+    try:
+        after = parse_cursor(request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+
+    try:
+        facets = FacetQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    include_facets = request.args.get("include_facets", "").lower() in TRUE_VALUES
+
+    user_id = request.args.get("user_id", type=int)  # personalized mode, uses the user's owned games
+    affinity = None
+    facet_mask = facet_counts = board = None
+
+    if (user_id is None and not name_query and not include_facets
+            and current_app.config.get("LEADERBOARDS_ENABLED", True)):
+        scope = scope_for(facets)
+        if scope is not None:
+            board = leaderboard_page(scope, min_reviews, limit, after)
+            #None when there's no board for this view or the page runs past it
 
-    candidates = App.query.all() 
-    #get all games from database
-    if name_query:
-        candidates = [game for game in candidates if name_query.lower() in (game.name or "").lower()]
-    candidates = [game for game in candidates if ((game.positive or 0) + (game.negative or 0)) >= min_reviews]
-    #filter candidates by name query and minimum reviews
-
-    def total_reviews(game: App) -> int:
-        #return total reviews as int
-        return int(game.positive or 0) + int(game.negative or 0)
-
-    def pos_ratio(game: App) -> float:
-        #return positive review ratio as float
-        t = total_reviews(game)
-        return (float(game.positive) / t) if t else 0.0
-
-    def popularity_proxy(game: App) -> int:
-        """
-        Replacement for owners_estimate (often unavailable). Prefer storefront
-        recommendations_total if cached on App; otherwise fall back to total_reviews.
-        """
-        val = getattr(game, "recommendations_total", None)
-        if val is None:
-            val = total_reviews(game)
-        return max(int(val or 0), 1)
-
-    def score(game: App) -> float:
-        if total_reviews(game) == 0:
-            return 0.0
-        ratio = pos_ratio(game)
-        owners = popularity_proxy(game)  #crude popularity
-        return ratio / (1.0 + log10(max(owners, 1)))
-        #calculate score based on positive review ratio and popularity
-
-    ranked = sorted(candidates, key=score, reverse=True)[:limit]
+    if board is None and (facets or include_facets or (user_id is not None and name_query)):
+        index, snapshot = get_facet_index()
+        names = snapshot.mask_of(matching_appids(name_query, match)) if name_query else None
+        #name search still goes through the FTS index, then joins the bitmaps as one more mask
+        facet_mask = index.mask(snapshot, facets)
+        if names is not None:
+            facet_mask &= names
+        if include_facets:
+            facet_counts = index.counts(snapshot, facets, snapshot.candidate_mask(min_reviews, within=names))
+
+    if board is not None:
+        ranked = board
+    elif user_id is not None:
+        ranked, affinity = recommend_for_user(user_id, limit, min_reviews, after, facet_mask)
+        #content match on genres/categories weighted by playtime + recency, blended with the gem score
+    elif facet_mask is not None:
+        ranked = top_gems_memory(limit, min_reviews, after, mask=facet_mask, snapshot=snapshot)
+        #bitwise AND/OR of the facet bitmaps, then the same argpartition as the memory engine
+    elif current_app.config.get("RANKING_ENGINE") == "memory" and not name_query:
+        ranked = top_gems_memory(limit, min_reviews, after)
+        #columnar snapshot, one vectorized pass + argpartition instead of a query
+    else:
+        weight = current_app.config.get("SEARCH_RELEVANCE_WEIGHT", 0.05) if by_relevance else None
+        ranked = top_gems_sql(limit, min_reviews, name_query, after, match, weight)
 
     #format response through jsonify after sorting and limiting
-    return jsonify([
-        {
-            "appid": app.appid,  
-            "name": app.name,
-            "pos_ratio": round(pos_ratio(app), 4),
-            "total_reviews": total_reviews(app),
-            "owners_estimate": popularity_proxy(app),  # keep key name if you want to avoid breaking clients
-        } for app in ranked
-    ])
+    payload = [serialize_row(row) for row in ranked]
+    if affinity is not None:
+        for item in payload:
+            item["affinity"] = round(affinity.get(item["appid"], 0.0), 4)
+    response = jsonify({"results": payload, "facets": facet_counts} if include_facets else payload)
+    if ranked and len(ranked) == limit and not (by_relevance and name_query and facet_mask is None):
+        #relevance order isn't keyed on (score, appid), so no cursor for it
+        response.headers["X-Next-Cursor"] = format_cursor(ranked[-1].score, ranked[-1].appid)
+    return response
+
+@bp.post("/recommendations/batch")
+def recommendations_batch():
+    """
+    Many recommendation requests in one call, streamed back as NDJSON (one
+    {"id", "results", "next_cursor"} or {"id", "error"} line per request, in order).
+    Body: {"requests": [{"user_id": 7, "limit": 20, "genre": "RPG"}, ...]} or the
+    shorthand {"user_ids": [...]}. Other top-level keys (limit, min_reviews,
+    facets...) are defaults for every request. See services/batch.py.
+    """
+    from ..services.batch import BatchSpec, recommend_batch
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    raw = data.get("requests")
+    if raw is None and isinstance(data.get("user_ids"), list):
+        raw = [{"user_id": u} for u in data["user_ids"]]
+    if not isinstance(raw, list) or not raw:
+        return jsonify({"error": "requests or user_ids required"}), 400
+    if len(raw) > current_app.config.get("BATCH_MAX_REQUESTS", 1000):
+        return jsonify({"error": "too many requests in one batch"}), 413
+    defaults = {k: v for k, v in data.items() if k not in ("requests", "user_ids")}
+
+    parsed = []
+    for i, item in enumerate(raw):
+        try:
+            parsed.append(BatchSpec.from_dict(item, i, defaults))
+        except (TypeError, ValueError) as e:
+            parsed.append({"id": item.get("id", i) if isinstance(item, dict) else i, "error": str(e)})
+
+    def lines():
+        results = recommend_batch((p for p in parsed if isinstance(p, BatchSpec)),
+                                  current_app.config.get("BATCH_CHUNK_SIZE", 64))
+        for p in parsed:
+            #results come back in spec order, so errors slot in where they were
+            yield json.dumps(next(results) if isinstance(p, BatchSpec) else p) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
+@bp.get("/apps/<int:appid>/similar")
+@read_only
+def similar(appid: int):
+    """
+    "More like this": the precomputed top neighbors of appid (genre/category
+    overlap blended with co-ownership, see services/similarity.py). Lists are
+    built offline by scripts/build_neighbors.py, this is one indexed read.
+    """
+    from ..services.similarity import similar_apps
+    limit = min(int(request.args.get("limit", 10)), current_app.config.get("SIMILAR_K", 20))
+    payload = []
+    for row in similar_apps(appid, limit):
+        item = serialize_row(row)
+        item["similarity"] = round(row.similarity, 4)
+        payload.append(item)
+    return jsonify(payload)
@@ -1,9 +1,20 @@
 # services/app_metadata.py
 from __future__ import annotations
-from typing import Any, Dict, Optional, Tuple
-import requests
-from sqlalchemy.exc import IntegrityError
-from ..models.appdetails import db, App, OwnedGame, Genre, Category, AppGenre, AppCategory
+import logging, time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from ..models.appdetails import db, App, OwnedGame, AppGenre, AppCategory
+from ..signals import catalog_updated
+from .bulk import chunked, insert_ignore, upsert
+from .metrics import METRICS
+from .neighbor_dirty import mark_dirty
+from .ranking import refresh_scores
+
+log = logging.getLogger(__name__)
+
+#App columns a parsed payload (plus optional review counts) can carry
+APP_COLUMNS = ("name", "type", "is_free", "metacritic_score", "recommendations_total", "positive", "negative")
 
 # -------- helpers --------
 
@@ -67,16 +78,36 @@ def _parse_app_payload(raw: Dict[str, Any], appid: int) -> Optional[Dict[str, An
         "categories": categories,
     }
 
+def _failure_reason(e: Exception) -> str:
+    import requests
+    #coarse buckets for steam_appdetails_failures_total, the message goes to the log
+    if isinstance(e, requests.Timeout):
+        return "timeout"
+    if isinstance(e, requests.ConnectionError):
+        return "connection"
+    if isinstance(e, requests.HTTPError):
+        return "http_error"
+    if isinstance(e, ValueError):
+        return "invalid_json"
+    return "other"
+
 def _request_appdetails(appid: int) -> Optional[Dict[str, Any]]:
+    import requests
+    #imported on first use, most processes that load this module never call steam directly
     url = f"https://store.steampowered.com/api/appdetails?appids={appid}"
     try:
         request = requests.get(url, timeout=6)
         if request.status_code in (429, 500, 502, 503, 504):
-            raise RuntimeError(f"Transient HTTP {request.status_code}")
+            if METRICS.enabled:
+                METRICS.appdetails_failures.inc("transient")
+            log.warning("appdetails appid=%s failed: transient HTTP %s", appid, request.status_code)
+            return None
         request.raise_for_status()
         return request.json()
     except Exception as e:
-        print(f"[appdetails] appid={appid} failed: {e}")
+        if METRICS.enabled:
+            METRICS.appdetails_failures.inc(_failure_reason(e))
+        log.warning("appdetails appid=%s failed: %s", appid, e)
     return None
 
 def fetch_app_details(appid: int) -> Optional[Dict[str, Any]]:
@@ -89,98 +120,77 @@ def fetch_app_details(appid: int) -> Optional[Dict[str, Any]]:
         return None
     return _parse_app_payload(raw, appid)
 
+def ingest_app_metadata(metas: Iterable[Optional[Dict[str, Any]]], chunk_size: int = 500,
+                        keep_fetched_ts: bool = False) -> int:
+    """
+    Batch upsert of parsed _parse_app_payload results into apps / app_genres /
+    app_categories. Per chunk that's one INSERT ... ON CONFLICT for apps, one
+    DELETE + one INSERT per pivot table, a score refresh and a commit, no matter
+    how many genres are involved. Dicts may also carry positive/negative review
+    counts; keys a dict leaves out are left untouched on existing rows, and its
+    genres/categories are only replaced when those keys are present.
+    last_fetched_ts is only written when a dict carries it (a Steam fetch
+    does, a dump may), and with keep_fetched_ts an existing app keeps its
+    own value, so imported data never looks freshly fetched.
+    Returns the number of apps written.
+    """
+    update = [c.name for c in App.__table__.columns if c.name != "last_fetched_ts"] if keep_fetched_ts else None
+    written = 0
+    for chunk in chunked((m for m in metas if m), chunk_size):
+        by_appid = {int(m["appid"]): m for m in chunk}
+        #last payload wins if an appid shows up twice in a chunk
+        now = datetime.utcnow()
+        app_rows = []
+        for appid, meta in by_appid.items():
+            row = {"appid": appid, "last_updated": now}
+            row.update({col: meta[col] for col in APP_COLUMNS if col in meta})
+            if meta.get("last_fetched_ts") is not None:
+                row["last_fetched_ts"] = int(meta["last_fetched_ts"])
+            app_rows.append(row)
+        upsert(App.__table__, app_rows, key=["appid"], update=update)
+
+        _replace_pivot(AppGenre, "genre", {a: m["genres"] for a, m in by_appid.items() if "genres" in m})
+        _replace_pivot(AppCategory, "category", {a: m["categories"] for a, m in by_appid.items() if "categories" in m})
+
+        refresh_scores(by_appid)
+        mark_dirty(list(by_appid))
+        #same transaction as the rows, a crash can't leave metadata changed but the neighbor lists clean
+        db.session.commit()
+        catalog_updated.send(current_app._get_current_object(), appids=list(by_appid))
+        written += len(by_appid)
+    return written
+
+
+def _replace_pivot(model, column: str, values_by_appid: Dict[int, List[str]]) -> None:
+    #set-based replace: drop the chunk's old rows, insert the new set, duplicates ignored
+    if not values_by_appid:
+        return
+    table = model.__table__
+    db.session.execute(table.delete().where(table.c.appid.in_(list(values_by_appid))))
+    rows = [{"appid": appid, column: value} for appid, values in values_by_appid.items() for value in set(values)]
+    if rows:
+        insert_ignore(table, rows, key=["appid", column])
+
+
 def upsert_app_metadata(appid: int) -> Optional[App]:
     """
-    Fetch metadata for a single appid and upsert into App / Genre / Category + pivot tables.
-    Returns the App instance or none.
+    Fetch metadata for a single appid and upsert into App + genre/category pivot tables.
+    Returns the App instance or none. Bulk callers should use ingest_app_metadata.
     """
     meta = fetch_app_details(appid)
     if not meta:
         return None
+    meta["last_fetched_ts"] = int(time.time())
+    ingest_app_metadata([meta])
+    return db.session.get(App, meta["appid"])
 
-    #for apps
-    app = App.query.get(meta["appid"])
-    if not app:
-        app = App(
-            appid=meta["appid"],
-            name=meta["name"],
-            type=meta["type"],
-            is_free=meta["is_free"],
-            metacritic_score=meta["metacritic_score"],
-            recommendations_total=meta["recommendations_total"],
-        )
-        db.session.add(app)
-    else:
-        app.name = meta["name"]
-        app.type = meta["type"]
-        app.is_free = meta["is_free"]
-        app.metacritic_score = meta["metacritic_score"]
-        app.recommendations_total = meta["recommendations_total"]
-
-    #for genres now
-    genre_ids = []
-    for gamename in meta["genres"]:
-        game = Genre.query.filter_by(name=gamename).first()
-        if not game:
-            game = Genre(name=gamename)
-            db.session.add(game)
-            try:
-                db.session.flush()  # get g.id
-            except IntegrityError:
-                db.session.rollback()
-                game = Genre.query.filter_by(name=gamename).first()
-        genre_ids.append(game.id)
-
-    #for categories
-    category_ids = []
-    for category_name in meta["categories"]:
-        category = Category.query.filter_by(name=category_name).first()
-        if not category:
-            category = Category(name=category_name)
-            db.session.add(category)
-            try:
-                db.session.flush()
-            except IntegrityError:
-                db.session.rollback()
-                category = Category.query.filter_by(name=category_name).first()
-        category_ids.append(category.id)
-
-    #pivot inserts
-    for gid in genre_ids:
-        exists = AppGenre.query.filter_by(appid=app.appid, genre_id=gid).first()
-        if not exists:
-            db.session.add(AppGenre(appid=app.appid, genre_id=gid))
-
-    for cid in category_ids:
-        exists = AppCategory.query.filter_by(appid=app.appid, category_id=cid).first()
-        if not exists:
-            db.session.add(AppCategory(appid=app.appid, category_id=cid))
-
-    db.session.commit()
-    return app
-
-def backfill_metadata_for_user(user_id: int, limit: int = 200) -> int:
+def backfill_metadata_for_user(user_id: int, limit: Optional[int] = None) -> int:
     """
-    Iterate the user's OwnedGame rows and upsert metadata for any apps missing in App.
-    Returns the count of apps successfully (up)inserted/updated.
+    Queue metadata backfill for any apps this user owns that were never fetched.
+    Returns how many appids were queued. Nothing is fetched here, the
+    backfill worker (scripts/backfill_worker.py) does that off the request path
+    and dedupes appids shared between users.
     """
-    count = 0
-    # Get appids the user owns
-    owned = (
-        db.session.query(OwnedGame.appid)
-        .filter(OwnedGame.user_id == user_id)
-        .limit(limit)
-        .all()
-    )
-    appids = [row[0] for row in owned]
-
-
-    existing = set(
-        a[0] for a in db.session.query(App.appid).filter(App.appid.in_(appids)).all()
-    )
-    missing = [a for a in appids if a not in existing]
-
-    for appid in missing:
-        if upsert_app_metadata(appid):
-            count += 1
-    return count
+    from .backfill_queue import enqueue_backfill_for_user
+    #local import, the queue module imports this one
+    return enqueue_backfill_for_user(user_id, limit)
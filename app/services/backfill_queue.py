@@ -0,0 +1,155 @@
+# app/services/backfill_queue.py
+"""
+Metadata backfill as a DB-backed queue. Request paths only enqueue appids
+(deduped on appid across every user); scripts/backfill_worker.py claims due
+jobs in batches, fetches them concurrently through the shared rate-limited
+SteamClient, writes results with ingest_app_metadata and reschedules failures
+with exponential backoff. Progress lives in backfill_jobs, so a crash or a run
+of 429s picks up where it left off. Jobs that ended failed or missing are
+requeued when their appid is offered again after a cooldown.
+"""
+from __future__ import annotations
+import logging, os, socket, time, uuid
+from typing import Any, Dict, Iterable, List, Optional
+from flask import current_app
+from sqlalchemy import and_, bindparam, or_, select, update
+from ..models.appdetails import db, App, OwnedGame
+from ..models.jobs import BackfillJob
+from .app_metadata import ingest_app_metadata
+from .bulk import chunked, upsert
+from .seed_pipeline import fetch_many
+from .steam_client import SteamClient
+
+log = logging.getLogger(__name__)
+
+jobs = BackfillJob.__table__
+
+
+def enqueue_appids(appids: Iterable[int], requeue_after: int = 86400) -> int:
+    """
+    Queue appids for backfill. Pending, running and done jobs are left alone,
+    failed / missing ones settled more than requeue_after seconds ago start over
+    as pending with attempts=0. Does not commit.
+    """
+    rows = [{"appid": int(a), "status": "pending", "attempts": 0, "next_run_at": 0} for a in set(appids)]
+    retry = and_(or_(jobs.c.status == "failed", jobs.c.status == "missing"),
+                 jobs.c.next_run_at <= int(time.time()) - requeue_after)
+    #failed/missing rows keep next_run_at = when they were settled. or_ rather than in_, IN lists can't go through executemany
+    for chunk in chunked(rows, 500):
+        upsert(jobs, chunk, key=["appid"], where=retry)
+    return len(rows)
+
+
+def enqueue_backfill_for_user(user_id: int, limit: Optional[int] = None) -> int:
+    """
+    Queue every app this user owns that we have no storefront data for yet
+    (stub parents created by the owned-games sync have never been fetched).
+    Returns how many appids were offered to the queue.
+    """
+    query = (
+        select(OwnedGame.appid)
+        .join(App, App.appid == OwnedGame.appid)
+        .where(OwnedGame.user_id == user_id, App.last_fetched_ts.is_(None))
+    )
+    if limit:
+        query = query.limit(limit)
+    appids = [a for (a,) in db.session.execute(query)]
+    count = enqueue_appids(appids, current_app.config.get("BACKFILL_REQUEUE_SECONDS", 86400))
+    db.session.commit()
+    return count
+
+
+def claim_batch(worker_id: str, size: int = 50, lease_seconds: int = 600) -> List[BackfillJob]:
+    """
+    Atomically move up to `size` due jobs to running for this worker. Jobs left
+    running past their lease (dead worker) are due again. The status check is
+    repeated on the UPDATE itself so two workers can't take the same row.
+    """
+    now = int(time.time())
+    due = or_(
+        and_(jobs.c.status == "pending", jobs.c.next_run_at <= now),
+        and_(jobs.c.status == "running", jobs.c.claimed_at < now - lease_seconds),
+    )
+    picked = select(jobs.c.appid).where(due).order_by(jobs.c.next_run_at, jobs.c.appid).limit(size)
+    db.session.execute(
+        update(jobs)
+        .where(jobs.c.appid.in_(picked.scalar_subquery()), due)
+        .values(status="running", claimed_by=worker_id, claimed_at=now, attempts=jobs.c.attempts + 1)
+    )
+    db.session.commit()
+    return BackfillJob.query.filter_by(status="running", claimed_by=worker_id, claimed_at=now).all()
+
+
+def _retry_delay(attempts: int, base: float, cap: float) -> int:
+    return int(min(cap, base * (2 ** max(attempts - 1, 0))))
+
+
+def process_batch(claimed: List[BackfillJob], client: SteamClient, workers: int = 8, max_attempts: int = 5,
+                  retry_base: float = 60.0, retry_cap: float = 6 * 3600.0) -> Dict[str, int]:
+    """Fetch a claimed batch, ingest what came back and settle every job's status."""
+    attempts = {job.appid: job.attempts for job in claimed}
+    fetched: List[Dict[str, Any]] = []
+    settled: List[Dict[str, Any]] = []
+    now = int(time.time())
+    for appid, row, error in fetch_many(client, list(attempts), workers):
+        if error is None and row.get("name"):
+            fetched.append(row)
+            settled.append({"_appid": appid, "status": "done", "next_run_at": now, "last_error": None})
+        elif error is None:
+            #steam answered but there's no store page (delisted, tool, dlc stub), don't keep asking
+            settled.append({"_appid": appid, "status": "missing", "next_run_at": now, "last_error": "no appdetails"})
+        elif attempts[appid] >= max_attempts:
+            settled.append({"_appid": appid, "status": "failed", "next_run_at": now, "last_error": str(error)[:500]})
+        else:
+            delay = _retry_delay(attempts[appid], retry_base, retry_cap)
+            settled.append({"_appid": appid, "status": "pending", "next_run_at": now + delay, "last_error": str(error)[:500]})
+    if fetched:
+        ingest_app_metadata(fetched)
+    if settled:
+        db.session.execute(
+            update(jobs).where(jobs.c.appid == bindparam("_appid")).values(
+                status=bindparam("status"), next_run_at=bindparam("next_run_at"),
+                last_error=bindparam("last_error"), claimed_by=None,
+            ),
+            settled,
+        )
+    db.session.commit()
+    counts: Dict[str, int] = {}
+    for row in settled:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    return counts
+
+
+def run_worker(app, batch_size: Optional[int] = None, once: bool = False, idle_sleep: float = 5.0,
+               worker_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Claim -> fetch -> ingest loop. With once=True it drains what's due right now
+    and returns, otherwise it polls forever. Returns totals per final status.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    config = app.config
+    batch_size = batch_size or config.get("BACKFILL_BATCH_SIZE", 50)
+    totals: Dict[str, int] = {}
+    with app.app_context():
+        client = SteamClient.for_app(app)
+        while True:
+            claimed = claim_batch(worker_id, batch_size, config.get("BACKFILL_LEASE_SECONDS", 600))
+            if not claimed:
+                if once:
+                    return totals
+                time.sleep(idle_sleep)
+                continue
+            counts = process_batch(
+                claimed, client,
+                workers=config.get("BACKFILL_WORKERS", 8),
+                max_attempts=config.get("BACKFILL_MAX_ATTEMPTS", 5),
+                retry_base=config.get("BACKFILL_RETRY_BASE_SECONDS", 60),
+            )
+            for status, n in counts.items():
+                totals[status] = totals.get(status, 0) + n
+            log.info("backfill worker %s: %s", worker_id, counts)
+
+
+def queue_stats() -> Dict[str, int]:
+    rows = db.session.execute(select(jobs.c.status, db.func.count()).group_by(jobs.c.status)).all()
+    return {status: count for status, count in rows}
@@ -0,0 +1,145 @@
+# app/services/batch.py
+"""
+Many recommendation requests in one call (nightly email job etc). The catalog
+snapshot, feature matrix and facet bitmaps are synced once for the whole
+batch. Requests are then handled `chunk_size` at a time: the chunk's user
+profiles come from the LibraryStore arrays (no query), all their affinities come out of a single
+(rows x features) @ (features x users) product, and names for every result in
+the chunk are fetched together. Results are yielded per request in input
+order, so callers can stream them while memory stays bounded by the chunk.
+"""
+from __future__ import annotations
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from werkzeug.datastructures import MultiDict
+from .bulk import chunked
+from .facets import FacetQuery, get_facet_index
+from .personalize import get_personalizer
+from .ranking import format_cursor, parse_cursor, serialize_row
+from .search import matching_appids
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchSpec:
+    """One request of a batch, the same knobs GET /api/recommendations takes."""
+    id: Any
+    user_id: Optional[int] = None
+    limit: int = 10
+    min_reviews: int = 50
+    after: Optional[Tuple[float, int]] = None
+    facets: Optional[FacetQuery] = None
+    q: Optional[str] = None
+    match: str = "substring"
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], default_id: Any, defaults: Optional[Dict[str, Any]] = None) -> "BatchSpec":
+        """Raises ValueError on anything malformed, the batch reports it per request."""
+        if not isinstance(raw, dict):
+            raise ValueError("request must be an object")
+        merged = {**(defaults or {}), **raw}
+        user_id = merged.get("user_id")
+        return cls(
+            id=raw.get("id", default_id),
+            user_id=int(user_id) if user_id is not None else None,
+            limit=int(merged.get("limit", 10)),
+            min_reviews=int(merged.get("min_reviews", 50)),
+            after=parse_cursor(merged.get("cursor")),
+            facets=FacetQuery.from_args(_as_args(merged)),
+            q=merged.get("q") or None,
+            match=merged.get("match", "substring"),
+        )
+
+
+def _as_args(raw: Dict[str, Any]) -> MultiDict:
+    #JSON values -> the strings FacetQuery.from_args expects from a query string
+    def text(value):
+        return ("true" if value else "false") if isinstance(value, bool) else str(value)
+    args = MultiDict()
+    for key, value in raw.items():
+        for item in (value if isinstance(value, list) else [value]):
+            if item is not None:
+                args.add(key, text(item))
+    return args
+
+
+def _error(spec: BatchSpec, error: Exception) -> Dict[str, Any]:
+    #one bad request shouldn't cut off the stream for the ones after it
+    if isinstance(error, ValueError):
+        return {"id": spec.id, "error": str(error)}
+    log.exception("batch request %r failed", spec.id, exc_info=error)
+    return {"id": spec.id, "error": "internal error"}
+
+
+def recommend_batch(specs: Iterable[BatchSpec], chunk_size: int = 64) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {"id", "results", "next_cursor"} per spec, in order. Personalized
+    specs score like ?user_id= (owned games excluded, "affinity" added), the
+    rest rank by gem score, both under the spec's facet/name filters. A spec
+    that fails yields {"id", "error"} in its place (every spec of its chunk
+    when the shared scoring step fails) and the batch carries on.
+    """
+    try:
+        personalizer, snapshot = get_personalizer()
+        index, snapshot = get_facet_index()
+    except Exception as e:
+        for spec in specs:
+            yield _error(spec, e)
+        return
+    for chunk in chunked(specs, chunk_size):
+        try:
+            user_ids = [s.user_id for s in chunk if s.user_id is not None]
+            profiles = personalizer.profiles_for(snapshot, user_ids) if user_ids else {}
+            column_of = {u: j for j, u in enumerate(dict.fromkeys(user_ids))}
+            affinity = personalizer.affinity_matrix(snapshot, [profiles[u] for u in column_of]) if column_of else None
+            blended = personalizer.blended(snapshot, affinity) if affinity is not None else None
+        except Exception as e:
+            for spec in chunk:
+                yield _error(spec, e)
+            continue
+
+        ranked: List[Tuple[BatchSpec, Any, Optional[np.ndarray]]] = []
+        #(spec, positions or the exception it raised, scores)
+        for spec in chunk:
+            try:
+                scores = snapshot.score if spec.user_id is None else blended[:, column_of[spec.user_id]]
+                within = index.mask(snapshot, spec.facets) if spec.facets else None
+                if spec.q:
+                    names = snapshot.mask_of(matching_appids(spec.q, spec.match))
+                    within = names if within is None else within & names
+                mask = snapshot.candidate_mask(spec.min_reviews, spec.after, scores, within=within)
+                if spec.user_id is not None:
+                    mask &= ~personalizer.owned_mask(snapshot, profiles[spec.user_id])
+                ranked.append((spec, snapshot.top_k(mask, spec.limit, scores), scores))
+            except Exception as e:
+                ranked.append((spec, e, None))
+
+        found = [positions for _, positions, _ in ranked if not isinstance(positions, Exception)]
+        try:
+            names = snapshot.names(np.concatenate(found) if found else [])
+        except Exception as e:
+            for spec, _, _ in ranked:
+                yield _error(spec, e)
+            continue
+        for spec, positions, scores in ranked:
+            if isinstance(positions, Exception):
+                yield _error(spec, positions)
+                continue
+            try:
+                rows = snapshot.rows(positions, scores, names)
+                results = [serialize_row(row) for row in rows]
+                if spec.user_id is not None:
+                    column = affinity[:, column_of[spec.user_id]]
+                    for item, pos in zip(results, positions):
+                        item["affinity"] = round(float(column[pos]), 4)
+            except Exception as e:
+                yield _error(spec, e)
+                continue
+            yield {
+                "id": spec.id,
+                "results": results,
+                "next_cursor": format_cursor(rows[-1].score, rows[-1].appid) if rows and len(rows) == spec.limit else None,
+            }
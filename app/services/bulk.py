@@ -0,0 +1,63 @@
+# app/services/bulk.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from sqlalchemy import Table
+from ..extensions import db
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to `size` items without materializing the whole iterable."""
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _dialect_insert(table: Table):
+    #ON CONFLICT lives on the dialect-specific insert constructs
+    name = db.session.get_bind().dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"bulk upsert not supported on {name}")
+    return insert(table)
+
+
+def upsert(table: Table, rows: Sequence[Dict[str, Any]], key: Sequence[str],
+           update: Optional[Sequence[str]] = None, extra_set: Optional[Dict[str, Any]] = None,
+           where: Optional[Any] = None) -> int:
+    """
+    INSERT ... ON CONFLICT (key) DO UPDATE for many rows, one executemany per row shape.
+    Rows with different key sets are grouped, so callers can mix e.g. rows with
+    and without review counts without NULL-ing columns they didn't send.
+    `update` limits which sent columns overwrite on conflict (default: all non-key),
+    an empty list means DO NOTHING. `extra_set` adds SQL expressions to the SET,
+    `where` limits which existing rows get updated. Does not commit.
+    """
+    shapes: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        shapes.setdefault(tuple(sorted(row)), []).append(row)
+    for columns, group in shapes.items():
+        stmt = _dialect_insert(table)
+        #executemany of one single-row statement: compiled once and cached, where a
+        #multi-row VALUES has to be recompiled for every distinct batch length
+        wanted = [c for c in (update if update is not None else columns) if c in columns and c not in key]
+        if not wanted and not extra_set:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(key))
+        else:
+            set_ = {c: stmt.excluded[c] for c in wanted}
+            set_.update(extra_set or {})
+            stmt = stmt.on_conflict_do_update(index_elements=list(key), set_=set_, where=where)
+        db.session.execute(stmt, group)
+    return len(rows)
+
+
+def insert_ignore(table: Table, rows: Sequence[Dict[str, Any]], key: Sequence[str]) -> int:
+    """Bulk insert that skips rows whose key already exists."""
+    return upsert(table, rows, key, update=[])
@@ -0,0 +1,192 @@
+# app/services/cache.py
+from __future__ import annotations
+import json, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+CREDENTIAL_PARAMS = frozenset({"key", "access_token"})
+#never part of a cache key, keys end up in the shared disk cache and its fixture dumps
+
+
+class Stamped(NamedTuple):
+    """Loader result that carries its original fetch time (e.g. from a lower cache tier)."""
+    data: Any
+    stored_at: float
+
+
+def canonical_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    """
+    Same url + params always map to the same key, whatever order the dict was built in.
+    Values are stringified so {"appids": 570} and {"appids": "570"} share an entry.
+    Credentials (CREDENTIAL_PARAMS) are dropped, the response doesn't depend on them.
+    """
+    pairs = sorted((str(k), str(v)) for k, v in (params or {}).items() if str(k) not in CREDENTIAL_PARAMS)
+    if not pairs:
+        return url
+    return url + "?" + urlencode(pairs)
+
+
+def scrub_key(key: str) -> str:
+    """Rebuild an already stored key without credentials (entries written before they were stripped)."""
+    url, sep, query = key.partition("?")
+    return canonical_key(url, dict(parse_qsl(query, keep_blank_values=True))) if sep else key
+
+
+def approx_size(data: Any) -> int:
+    #JSON length is close enough to what the payload costs us, only paid once per store
+    try:
+        return len(json.dumps(data, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class LRUCache:
+    """
+    Thread-safe TTL cache bounded by entry count and approximate bytes, evicting
+    least recently used first. get_or_load() collapses concurrent misses for one
+    key into a single loader call (single-flight). With stale_while_revalidate an
+    expired entry (up to max_stale seconds past its ttl) is returned immediately
+    while one background thread reloads it.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024,
+                 stale_while_revalidate: bool = False, max_stale: Optional[float] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = ttl if max_stale is None else max_stale
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        #key -> (stored_at, data, approx bytes), most recently used at the end
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.stale_hits = self.coalesced = self.refreshes = 0
+
+    # -------- plain access --------
+
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh value or None, counts as a hit/miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: Any, stored_at: Optional[float] = None) -> None:
+        size = approx_size(data)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if size > self.max_bytes:
+                return
+                #one payload bigger than the whole budget, don't flush everything for it
+            self._entries[key] = (time.time() if stored_at is None else stored_at, data, size)
+            self._bytes += size
+            if len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop_dead()
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def _drop_dead(self) -> None:
+        #caller holds the lock. entries too old to serve even as stale go before live LRU ones
+        limit = self.ttl + (self.max_stale if self.stale_while_revalidate else 0)
+        cutoff = time.time() - limit
+        for key in [k for k, (stored_at, _, _) in self._entries.items() if stored_at < cutoff]:
+            _, _, size = self._entries.pop(key)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # -------- single-flight --------
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                if self.stale_while_revalidate and age < self.ttl + self.max_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._start_refresh(key, loader)
+                    return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+            #someone else is already fetching this key, wait for their result
+        return self._load(key, loader, future)
+
+    def _load(self, key: str, loader: Callable[[], Any], future: Future) -> Any:
+        try:
+            data = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            if isinstance(data, Stamped):
+                #keep the lower tier's age so the entry doesn't outlive its ttl here
+                self.put(key, data.data, data.stored_at)
+                data = data.data
+            else:
+                self.put(key, data)
+            future.set_result(data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _start_refresh(self, key: str, loader: Callable[[], Any]) -> None:
+        #caller holds the lock
+        future: Future = Future()
+        self._inflight[key] = future
+        self.refreshes += 1
+
+        def run():
+            try:
+                self._load(key, loader, future)
+            except Exception:
+                pass
+                #keep serving the stale copy, the next request will try again
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale_hits + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
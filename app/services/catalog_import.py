@@ -0,0 +1,337 @@
+# app/services/catalog_import.py
+"""
+Offline bulk import of appdetails / review-summary payloads from a dump file.
+
+Accepted inputs (optionally .gz):
+  *.jsonl / *.ndjson  one record per line
+  *.json              a top-level array of records, or one object keyed by
+                      appid the way a multi-app appdetails response is
+
+A record is any of:
+  {"570": {"success": true, "data": {...}}}              raw appdetails response
+  {"appid": 570, "appdetails": {...raw...}, "reviews": {...}, "last_fetched_ts": 1700000000}
+  {"appid": 570, "query_summary": {...}}                  review summary only
+  {"key": "<steam url>", "data": {...}}                   a warm_steam_cache dump line
+
+The file is parsed as a stream of generators (bytes -> records -> partial rows
+-> batches), so memory is bounded by the batch size, not the file. Details go
+through _parse_app_payload and every batch is one ingest_app_metadata
+transaction. After each commit the byte offset is written to a checkpoint file,
+and a rerun resumes from there. Nothing here touches the network.
+
+No single record may be larger than max_record bytes: an oversized JSONL line
+is skipped with a warning, and a JSON array or object fails with the byte offset
+of the record. Without this cap, a truncated or malformed file would be read
+into memory until EOF.
+"""
+from __future__ import annotations
+import codecs, gzip, json, logging, os, re, time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+from .app_metadata import _parse_app_payload, ingest_app_metadata
+
+log = logging.getLogger(__name__)
+
+READ_SIZE = 1 << 20
+MAX_RECORD_BYTES = 64 << 20
+_REVIEWS_URL = re.compile(r"/appreviews/(\d+)")
+_WHITESPACE = " \t\r\n"
+
+#(record, byte offset just past it, container state to resume in)
+Located = Tuple[Any, int, Optional[str]]
+
+
+@dataclass
+class ImportReport:
+    records: int = 0
+    apps_written: int = 0
+    skipped: int = 0
+    batches: int = 0
+    bytes_read: int = 0
+    resumed_from: int = 0
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(self.elapsed_seconds, 1e-9)
+        return {
+            "records": self.records,
+            "apps_written": self.apps_written,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "bytes_read": self.bytes_read,
+            "resumed_from": self.resumed_from,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "records_per_second": round(self.records / elapsed, 1),
+            "mb_per_second": round(self.bytes_read / elapsed / 1e6, 2),
+        }
+
+
+def _open(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _is_jsonl(path: str) -> bool:
+    base = path[:-3] if path.endswith(".gz") else path
+    return base.endswith((".jsonl", ".ndjson"))
+
+
+# -------- stage 1: bytes -> records --------
+
+def iter_jsonl(fh: IO[bytes], offset: int = 0, max_record: int = MAX_RECORD_BYTES) -> Iterator[Located]:
+    position = offset
+    while True:
+        line = fh.readline(max_record + 1)
+        if not line:
+            return
+        position += len(line)
+        if len(line) > max_record and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = fh.readline(READ_SIZE)
+                position += len(line)
+            log.warning("skipping line over %s bytes ending at byte %s", max_record, position)
+            yield None, position, None
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            log.warning("skipping malformed line ending at byte %s: %s", position, e)
+            record = None
+        yield record, position, None
+
+
+class _JsonStream:
+    """
+    Items of a top-level JSON array or object, decoded one at a time with
+    raw_decode over a rolling buffer. Byte offsets are tracked so a checkpoint
+    can seek straight back to the item after the last committed one.
+    """
+
+    def __init__(self, fh: IO[bytes], offset: int = 0, max_record: int = MAX_RECORD_BYTES):
+        self.fh = fh
+        self.max_record = max_record
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.offset = offset
+        #byte offset of buf[pos]
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self.utf8.decode(b"", final=True)
+        else:
+            self.buf = self.buf[self.pos:] + self.utf8.decode(chunk)
+        self.pos = 0
+        return True
+
+    def _advance(self, end: int) -> None:
+        self.offset += len(self.buf[self.pos:end].encode("utf-8"))
+        self.pos = end
+
+    def _peek(self) -> Optional[str]:
+        #next non-whitespace char, None at EOF
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self._advance(self.pos + 1)
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char is None or char not in chars:
+            raise ValueError(f"expected one of {chars!r} at byte {self.offset}, got {char!r}")
+        self._advance(self.pos + 1)
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if len(self.buf) - self.pos > self.max_record:
+                    raise ValueError(f"record at byte {self.offset} is malformed or over {self.max_record} bytes")
+                    #past the cap more input won't help, don't buffer the rest of the file looking for its end
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and not self.eof and not isinstance(value, (dict, list, str)):
+                #a number could still be cut off by the buffer edge
+                self._fill()
+                continue
+            self._advance(end)
+            return value
+
+    def items(self, container: Optional[str] = None) -> Iterator[Located]:
+        """
+        Yield the container's items. Objects yield {key: value} so an
+        appid-keyed appdetails object reads the same as a list of responses.
+        Pass the container ("[" or "{") to resume right after an item.
+        """
+        resuming = container is not None
+        if not resuming:
+            container = self._expect("[{")
+        close = "]" if container == "[" else "}"
+        first = not resuming
+        while True:
+            if self._peek() == close:
+                self._advance(self.pos + 1)
+                return
+            if not first:
+                self._expect(",")
+            first = False
+            if container == "[":
+                record = self._value()
+            else:
+                key = self._value()
+                self._expect(":")
+                record = {key: self._value()}
+            yield record, self.offset, container
+
+
+def iter_records(path: str, offset: int = 0, container: Optional[str] = None,
+                 max_record: int = MAX_RECORD_BYTES) -> Iterator[Located]:
+    """Stream records from a dump, starting at a checkpointed offset when given."""
+    with _open(path) as fh:
+        if offset:
+            fh.seek(offset)
+        if _is_jsonl(path):
+            yield from iter_jsonl(fh, offset, max_record)
+        else:
+            yield from _JsonStream(fh, offset, max_record).items(container if offset else None)
+
+
+# -------- stage 2: records -> partial app rows --------
+
+def _review_row(appid: int, summary: Dict[str, Any]) -> Dict[str, Any]:
+    summary = summary.get("query_summary", summary) or {}
+    return {
+        "appid": appid,
+        "positive": int(summary.get("total_positive", 0) or 0),
+        "negative": int(summary.get("total_negative", 0) or 0),
+    }
+
+
+def record_rows(record: Any) -> List[Dict[str, Any]]:
+    """
+    Partial rows for ingest_app_metadata from one record (details and/or
+    review counts). Empty when nothing usable is in it (e.g. success=false).
+    """
+    if not isinstance(record, dict):
+        return []
+    if "key" in record and "data" in record:
+        #warm_steam_cache dump line: which endpoint it was tells us the shape
+        match = _REVIEWS_URL.search(record["key"])
+        if match:
+            record = {"appid": int(match.group(1)), "reviews": record["data"]}
+        else:
+            record = record["data"]
+        if not isinstance(record, dict):
+            return []
+    rows: List[Dict[str, Any]] = []
+    if "appid" in record:
+        appid = int(record["appid"])
+        if isinstance(record.get("appdetails"), dict):
+            parsed = _parse_app_payload(record["appdetails"], appid)
+            if parsed:
+                rows.append(parsed)
+        reviews = record.get("reviews") or ({"query_summary": record["query_summary"]} if "query_summary" in record else None)
+        if isinstance(reviews, dict):
+            rows.append(_review_row(appid, reviews))
+        if rows and isinstance(record.get("last_fetched_ts"), int):
+            rows[0]["last_fetched_ts"] = record["last_fetched_ts"]
+            #when the dump was fetched, if it says, otherwise the app stays "never fetched" for the backfill
+        return rows
+    for key in record:
+        #raw appdetails response, possibly for several appids
+        if str(key).isdigit():
+            parsed = _parse_app_payload(record, int(key))
+            if parsed:
+                rows.append(parsed)
+    return rows
+
+
+# -------- stage 3: batches + checkpoints --------
+
+def _batches(located: Iterator[Located], batch_size: int,
+             report: ImportReport) -> Iterator[Tuple[List[Dict[str, Any]], int, Optional[str]]]:
+    #merge partial rows per appid so details and reviews in one batch don't overwrite each other
+    batch: Dict[int, Dict[str, Any]] = {}
+    offset, container = report.resumed_from, None
+    for record, offset, container in located:
+        report.records += 1
+        rows = record_rows(record)
+        if not rows:
+            report.skipped += 1
+        for row in rows:
+            batch.setdefault(row["appid"], {}).update(row)
+        if len(batch) >= batch_size:
+            yield list(batch.values()), offset, container
+            batch = {}
+    if batch:
+        yield list(batch.values()), offset, container
+
+
+def _file_identity(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def load_checkpoint(checkpoint_path: str, path: str) -> Optional[Dict[str, Any]]:
+    """Saved progress for this exact file (same size and mtime), else None."""
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as fh:
+            saved = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return saved if saved.get("file") == _file_identity(path) else None
+
+
+def _save_checkpoint(checkpoint_path: str, path: str, offset: int, container: Optional[str],
+                     report: ImportReport) -> None:
+    tmp = checkpoint_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"file": _file_identity(path), "offset": offset, "container": container,
+                   "records": report.records, "apps_written": report.apps_written}, fh)
+    os.replace(tmp, checkpoint_path)
+    #atomic rename, a crash leaves the previous checkpoint intact
+
+
+def import_catalog(path: str, batch_size: int = 5000, checkpoint_path: Optional[str] = None,
+                   resume: bool = True, progress: Optional[Callable[[ImportReport], None]] = None,
+                   max_record: int = MAX_RECORD_BYTES) -> ImportReport:
+    """
+    Import a dump into apps / app_genres / app_categories. Each batch is one
+    transaction, followed by a checkpoint. A batch that committed but didn't
+    get its checkpoint is simply upserted again on resume.
+    """
+    checkpoint_path = checkpoint_path or path + ".checkpoint"
+    report = ImportReport()
+    offset, container = 0, None
+    if resume:
+        saved = load_checkpoint(checkpoint_path, path)
+        if saved:
+            offset, container = saved["offset"], saved.get("container")
+            report.resumed_from = offset
+            log.info("resuming %s at byte %s", path, offset)
+    started = time.monotonic()
+    for rows, end, container in _batches(iter_records(path, offset, container, max_record), batch_size, report):
+        report.apps_written += ingest_app_metadata(rows, chunk_size=len(rows), keep_fetched_ts=True)
+        report.batches += 1
+        report.bytes_read = end - report.resumed_from
+        _save_checkpoint(checkpoint_path, path, end, container, report)
+        report.elapsed_seconds = time.monotonic() - started
+        if progress:
+            progress(report)
+    report.elapsed_seconds = time.monotonic() - started
+    return report
@@ -0,0 +1,193 @@
+# app/services/disk_cache.py
+from __future__ import annotations
+import json, os, sqlite3, threading, time, zlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .cache import canonical_key, scrub_key
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class DiskCache:
+    """
+    Steam responses in a SQLite file shared by every process on the host
+    (gunicorn workers, scripts). Payloads are zlib-compressed JSON, entries
+    expire after ttl and the file is kept under max_bytes by dropping the
+    least recently accessed rows. WAL mode so readers never wait on a writer.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, max_bytes: int = 256 * 1024 * 1024,
+                 touch_interval: float = 60.0, evict_every: int = 200):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        #only rewrite accessed_at this often per key, reads stay reads
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.writes = self.evictions = 0
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        #sqlite connections can't hop threads, so one per thread per process
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _pack(data: Any) -> bytes:
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(stored_at, data) for a fresh entry, else None."""
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT stored_at, accessed_at, payload FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[0] >= self.ttl:
+            self.misses += 1
+            return None
+        if now - row[1] >= self.touch_interval:
+            self._conn().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0], self._unpack(row[2])
+
+    def put(self, key: str, data: Any, stored_at: Optional[float] = None) -> None:
+        now = time.time()
+        blob = self._pack(data)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, stored_at, accessed_at, size, payload) VALUES (?, ?, ?, ?, ?)",
+            (key, now if stored_at is None else stored_at, now, len(blob), blob),
+        )
+        self.writes += 1
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then least recently accessed ones until under max_bytes."""
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.ttl,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            target = total - int(self.max_bytes * 0.9)
+            #trim to 90% so we aren't evicting again on the very next put
+            cutoff = conn.execute(
+                """SELECT accessed_at FROM (
+                       SELECT accessed_at, SUM(size) OVER (ORDER BY accessed_at, key) AS running
+                       FROM entries) WHERE running >= ? LIMIT 1""", (target,)
+            ).fetchone()
+            if cutoff is not None:
+                removed += conn.execute("DELETE FROM entries WHERE accessed_at <= ?", (cutoff[0],)).rowcount
+        self.evictions += removed
+        return removed
+
+    # -------- counters --------
+
+    def counter(self, name: str) -> int:
+        """Current value of a named counter shared by every process using this file (0 if never bumped)."""
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name: str) -> int:
+        """Atomically add one to a named counter, returns the new value."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+            )
+            value = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    # -------- fixtures --------
+
+    def warm_from_file(self, path: str, keep_timestamps: bool = False) -> int:
+        """
+        Load a JSONL dump ({"url", "params", "data"} or {"key", "data"} per line)
+        so tests and cold starts can skip the network. Entries are stamped now
+        unless keep_timestamps and the line has stored_at.
+        """
+        count = 0
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    key = scrub_key(record["key"]) if record.get("key") else canonical_key(record["url"], record.get("params"))
+                    stored_at = record.get("stored_at") if keep_timestamps else None
+                    now = time.time()
+                    blob = self._pack(record["data"])
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, stored_at, accessed_at, size, payload) VALUES (?, ?, ?, ?, ?)",
+                        (key, stored_at or now, now, len(blob), blob),
+                    )
+                    count += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        for key, stored_at, payload in self._conn().execute("SELECT key, stored_at, payload FROM entries ORDER BY key"):
+            yield {"key": key, "stored_at": stored_at, "data": self._unpack(payload)}
+
+    def dump(self, path: str) -> int:
+        """Write every entry as JSONL, the format warm_from_file reads back. Keys are scrubbed of credentials."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as fh:
+            for entry in self.iter_entries():
+                entry["key"] = scrub_key(entry["key"])
+                fh.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,145 @@
+# app/services/engine_profile.py
+"""
+Per-backend engine tuning and read/write routing, driven by config.
+
+SQLite (DB_TUNING on, the production profile): every new connection gets a
+busy timeout, synchronous=NORMAL, a page cache and mmap window, and the file
+is switched to WAL once, so readers keep serving while a sync or import holds
+the write lock. Server databases (Postgres, MySQL) get a sized pool with
+pre-ping and recycling instead.
+
+Read routing (DB_READ_ROUTING): a second engine under the "read" bind, on
+DATABASE_READ_URL when set (a replica) or, for SQLite, a read-only connection
+pool on the same file. Views wrapped in @read_only send their SELECTs there;
+anything flushed or any INSERT/UPDATE/DELETE still goes to the primary.
+"""
+from __future__ import annotations
+import contextvars
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_BIND = "read"
+
+_reading: contextvars.ContextVar[bool] = contextvars.ContextVar("db_reading", default=False)
+
+
+def _is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def _is_memory(uri: str) -> bool:
+    database = make_url(uri).database
+    return not database or database == ":memory:"
+
+
+def engine_options(uri: str, config) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS for this backend, empty when tuning is off."""
+    if not config.get("DB_TUNING", False):
+        return {}
+    if _is_sqlite(uri):
+        if _is_memory(uri):
+            return {}
+            #in-memory databases live in one connection, pool sizing doesn't apply
+        return {
+            "pool_size": config.get("DB_POOL_SIZE", 10),
+            "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+            "connect_args": {"timeout": config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000},
+        }
+    return {
+        "pool_size": config.get("DB_POOL_SIZE", 10),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+        #a connection the server or a proxy dropped is replaced instead of failing the request
+    }
+
+
+def sqlite_read_uri(uri: str) -> str:
+    """Same SQLite file opened read-only (mode=ro), so the read pool can never take the write lock."""
+    url = make_url(uri)
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+
+def read_bind(uri: str, config) -> Optional[Dict[str, Any]]:
+    """SQLALCHEMY_BINDS entry for the read engine, None when routing is off or not possible."""
+    if not config.get("DB_READ_ROUTING", False):
+        return None
+    read_uri = config.get("DATABASE_READ_URL") or None
+    if read_uri is None:
+        if not _is_sqlite(uri) or _is_memory(uri):
+            return None
+            #no replica configured, and a server database's primary is already a pool of its own
+        read_uri = sqlite_read_uri(uri)
+    options = engine_options(read_uri, config)
+    options.setdefault("connect_args", {})
+    #keeps sqlite-only connect_args from the primary's options off a server replica
+    return {"url": read_uri, **options}
+
+
+def configure(app) -> None:
+    """Fill SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS before db.init_app; explicit settings win."""
+    config = app.config
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(uri, config), **config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+    bind = read_bind(uri, config)
+    if bind is not None:
+        config["SQLALCHEMY_BINDS"] = {READ_BIND: bind, **(config.get("SQLALCHEMY_BINDS") or {})}
+
+
+def tune_engine(engine: Engine, config, read_only: bool = False) -> None:
+    """Set the SQLite pragmas on every new connection of this engine (no-op for other backends)."""
+    if not config.get("DB_TUNING", False) or engine.dialect.name != "sqlite" or _is_memory(str(engine.url)):
+        return
+    pragmas = [
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA cache_size={int(config.get('SQLITE_CACHE_SIZE', -65536))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if not read_only:
+        pragmas.insert(0, "PRAGMA journal_mode=WAL")
+        #persistent in the file, repeating it per connection is a cheap no-op
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def tune_engines(app, engines: Dict[Optional[str], Engine]) -> None:
+    """After db.init_app, inside an app context: pragmas on the primary and the read engine."""
+    for key, engine in engines.items():
+        tune_engine(engine, app.config, read_only=key == READ_BIND)
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads inside @read_only views to the "read" bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _reading.get() and not self._flushing and not isinstance(clause, UpdateBase):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view: Callable[..., Any]) -> Callable[..., Any]:
+    """Route this view's SELECTs to the read engine (when one is configured)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _reading.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _reading.reset(token)
+    return wrapper
@@ -0,0 +1,183 @@
+# app/services/facets.py
+"""
+Faceted filtering for /api/recommendations (genre=, category=, is_free=,
+min_metacritic=). Every genre and category value gets a NumPy bool array over
+the catalog snapshot's rows, so a filter is a few bitwise ORs (values of one
+facet) and ANDs (across facets) before scoring. is_free and metacritic are
+already snapshot columns and compare directly. The bitmaps follow the
+snapshot: a full reload rebuilds them, an incremental refresh re-reads only
+the genres/categories of the rows it touched.
+"""
+from __future__ import annotations
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from ..models.appdetails import db, AppGenre, AppCategory
+from .bulk import chunked
+from .ranking_engine import CatalogSnapshot, get_snapshot
+
+#facet name -> (pivot model, value column)
+PIVOTS = {
+    "genre": (AppGenre, AppGenre.genre),
+    "category": (AppCategory, AppCategory.category),
+}
+
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+
+
+def _split(values: Iterable[str]) -> List[str]:
+    #genre=Action&genre=RPG and genre=Action,RPG mean the same thing
+    return [v.strip() for raw in values for v in raw.split(",") if v.strip()]
+
+
+@dataclass
+class FacetQuery:
+    """Parsed facet filters. Values of one facet are OR'd, facets are AND'd."""
+    terms: Dict[str, List[str]] = field(default_factory=dict)
+    is_free: Optional[bool] = None
+    min_metacritic: Optional[int] = None
+
+    @classmethod
+    def from_args(cls, args) -> "FacetQuery":
+        """Build from request.args, raises ValueError on a malformed value."""
+        terms = {name: _split(args.getlist(name)) for name in PIVOTS}
+        is_free = args.get("is_free")
+        if is_free is not None:
+            if is_free.lower() in TRUE_VALUES:
+                is_free = True
+            elif is_free.lower() in FALSE_VALUES:
+                is_free = False
+            else:
+                raise ValueError("is_free must be true or false")
+        min_metacritic = args.get("min_metacritic")
+        return cls(
+            terms={k: v for k, v in terms.items() if v},
+            is_free=is_free,
+            min_metacritic=int(min_metacritic) if min_metacritic is not None else None,
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.terms) or self.is_free is not None or self.min_metacritic is not None
+
+
+class FacetIndex:
+    """Per-value bitmaps aligned with one CatalogSnapshot's rows."""
+
+    def __init__(self):
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {name: {} for name in PIVOTS}
+        self._keys: Dict[str, Dict[str, str]] = {name: {} for name in PIVOTS}
+        #lowercased value -> stored value, filters are case-insensitive
+        self.size = 0
+        self.generation = -1
+        self.version = -1
+        self._lock = threading.Lock()
+
+    def _bitmap(self, facet: str, value: str) -> np.ndarray:
+        bitmap = self.bitmaps[facet].get(value)
+        if bitmap is None:
+            bitmap = self.bitmaps[facet][value] = np.zeros(self.size, dtype=bool)
+            self._keys[facet][value.lower()] = value
+        return bitmap
+
+    def _set_rows(self, snapshot: CatalogSnapshot, appids: Optional[List[int]]) -> None:
+        """Set bits from the pivot tables for `appids` (None = everything)."""
+        for facet, (model, column) in PIVOTS.items():
+            chunks = [None] if appids is None else chunked(appids, 500)
+            for chunk in chunks:
+                query = select(model.appid, column)
+                if chunk is not None:
+                    query = query.where(model.appid.in_(chunk))
+                for appid, value in db.session.execute(query):
+                    pos = snapshot.row_of(appid)
+                    if pos is not None and pos < self.size:
+                        self._bitmap(facet, value)[pos] = True
+
+    def build(self, snapshot: CatalogSnapshot) -> None:
+        version = snapshot.version
+        self.bitmaps = {name: {} for name in PIVOTS}
+        self._keys = {name: {} for name in PIVOTS}
+        self.size = len(snapshot)
+        self._set_rows(snapshot, None)
+        self.generation, self.version = snapshot.generation, version
+
+    def _grow(self, size: int) -> None:
+        #snapshot appended rows, new rows start with no bits set
+        for values in self.bitmaps.values():
+            for value, bitmap in values.items():
+                values[value] = np.concatenate((bitmap, np.zeros(size - len(bitmap), dtype=bool)))
+        self.size = size
+
+    def sync(self, snapshot: CatalogSnapshot) -> None:
+        """Catch up with the snapshot: full build after a reload, else patch changed rows."""
+        with self._lock:
+            if self.generation != snapshot.generation:
+                self.build(snapshot)
+                return
+            version = snapshot.version
+            changed = snapshot.changed_since(self.version)
+            if changed is None:
+                self.build(snapshot)
+                return
+            if not len(changed):
+                return
+            if len(snapshot) > self.size:
+                self._grow(len(snapshot))
+            for values in self.bitmaps.values():
+                for bitmap in values.values():
+                    bitmap[changed] = False
+            self._set_rows(snapshot, [int(a) for a in snapshot.appid[changed]])
+            self.version = version
+
+    # -------- querying --------
+
+    def _facet_mask(self, facet: str, values: List[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            key = self._keys[facet].get(value.lower())
+            if key is not None:
+                mask |= self.bitmaps[facet][key]
+        return mask
+
+    def mask(self, snapshot: CatalogSnapshot, query: FacetQuery, skip: Optional[str] = None) -> np.ndarray:
+        """Rows matching every filter in query (except facet `skip`, used for counts)."""
+        mask = np.ones(len(snapshot), dtype=bool)
+        for facet, values in query.terms.items():
+            if facet != skip:
+                mask[:self.size] &= self._facet_mask(facet, values)
+                mask[self.size:] = False
+        if query.is_free is not None and skip != "is_free":
+            mask &= snapshot.is_free == query.is_free
+        if query.min_metacritic is not None:
+            mask &= snapshot.metacritic_score >= query.min_metacritic
+            #-1 (unknown) never passes
+        return mask
+
+    def counts(self, snapshot: CatalogSnapshot, query: FacetQuery, base: np.ndarray) -> Dict[str, Any]:
+        """
+        Matching rows per facet value within `base`. Each facet is counted with
+        its own filter left out, so picking genre=RPG still shows how many
+        Action games there would be.
+        """
+        out: Dict[str, Any] = {}
+        for facet, values in self.bitmaps.items():
+            within = (base & self.mask(snapshot, query, skip=facet))[:self.size]
+            counts = {value: int(np.count_nonzero(bitmap & within)) for value, bitmap in values.items()}
+            out[facet] = {value: n for value, n in counts.items() if n}
+        within = base & self.mask(snapshot, query, skip="is_free")
+        free = int(np.count_nonzero(within & snapshot.is_free))
+        out["is_free"] = {"true": free, "false": int(np.count_nonzero(within)) - free}
+        return out
+
+
+def get_facet_index() -> Tuple[FacetIndex, CatalogSnapshot]:
+    """Per-app facet index, synced with the (refreshed) catalog snapshot."""
+    snapshot = get_snapshot()
+    index = current_app.extensions.get("facet_index")
+    if index is None:
+        index = current_app.extensions["facet_index"] = FacetIndex()
+    index.sync(snapshot)
+    return index, snapshot
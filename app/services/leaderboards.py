@@ -0,0 +1,154 @@
+# app/services/leaderboards.py
+"""
+Materialized "hidden gems" leaderboards: global top N plus top N per genre
+and per category, for each configured min_reviews. A build runs one
+ROW_NUMBER() OVER (PARTITION BY scope ORDER BY score DESC, appid DESC) query
+per scope kind into fresh shadow tables, then renames them over the live ones
+in a single transaction, so readers see the old boards or the new ones and
+never a half-built set. /api/recommendations reads a board when the query is
+exactly one of these views and falls back to live scoring otherwise.
+"""
+from __future__ import annotations
+import logging, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from flask import current_app
+from sqlalchemy import MetaData, func, inspect, literal, select, tuple_
+from ..models.appdetails import db, App, AppGenre, AppCategory
+from ..models.leaderboards import LeaderboardEntry, LeaderboardScope
+from ..signals import leaderboards_swapped
+from .facets import FacetQuery
+
+log = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "all"
+_TABLES = (LeaderboardEntry.__table__, LeaderboardScope.__table__)
+
+
+def scope_for(facets: FacetQuery) -> Optional[str]:
+    """Board that answers these filters exactly: none -> global, one genre or category value -> its board."""
+    if not facets:
+        return GLOBAL_SCOPE
+    if facets.is_free is not None or facets.min_metacritic is not None or len(facets.terms) != 1:
+        return None
+    (facet, values), = facets.terms.items()
+    if len(values) != 1:
+        return None
+    return f"{facet}:{values[0]}".lower()
+
+
+def _ranked(scope, min_reviews: int, size: int, join=None):
+    """Top `size` rows per scope value with at least min_reviews, ranks from 0."""
+    total = func.coalesce(App.positive, 0) + func.coalesce(App.negative, 0)
+    rank = func.row_number().over(partition_by=scope, order_by=(App.score.desc(), App.appid.desc())) - 1
+    qualified = func.count().over(partition_by=scope)
+    inner = select(
+        scope.label("scope"), literal(min_reviews).label("min_reviews"), rank.label("rank"),
+        App.appid, App.name, App.positive, App.negative, App.recommendations_total, App.score,
+        qualified.label("qualified"),
+    ).where(total >= min_reviews)
+    if join is not None:
+        inner = inner.join(join, join.appid == App.appid)
+    inner = inner.subquery()
+    return select(inner).where(inner.c.rank < size)
+
+
+def _drop_leftovers(conn) -> None:
+    #shadow tables from a build that died before its swap
+    names = inspect(conn).get_table_names()
+    for table in _TABLES:
+        for name in names:
+            if name.startswith(f"{table.name}_shadow") or name == f"{table.name}_old":
+                conn.exec_driver_sql(f"DROP TABLE {name}")
+
+
+def _swap(shadows: Dict[str, str]) -> None:
+    """Rename every shadow over its live table in one transaction (DDL is transactional on SQLite and Postgres)."""
+    statements = []
+    for live, shadow in shadows.items():
+        statements += [
+            f"ALTER TABLE {live} RENAME TO {live}_old",
+            f"ALTER TABLE {shadow} RENAME TO {live}",
+            f"DROP TABLE {live}_old",
+        ]
+    with db.engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            #pysqlite doesn't open a transaction before DDL on its own, so do it by hand
+            raw = conn.connection.driver_connection
+            isolation = raw.isolation_level
+            raw.isolation_level = None
+            try:
+                raw.execute("BEGIN IMMEDIATE")
+                try:
+                    for statement in statements:
+                        raw.execute(statement)
+                    raw.execute("COMMIT")
+                except BaseException:
+                    raw.execute("ROLLBACK")
+                    raise
+            finally:
+                raw.isolation_level = isolation
+        else:
+            with conn.begin():
+                for statement in statements:
+                    conn.exec_driver_sql(statement)
+
+
+def build_leaderboards(size: int = 200, thresholds: Sequence[int] = (50,)) -> Dict[str, Any]:
+    """
+    Rebuild every board into shadow tables and swap them in. Scores come
+    from App.score (the same gem_score recommendations() orders by).
+    """
+    started = time.monotonic()
+    built_at = int(time.time())
+    suffix = f"_shadow_{built_at}"
+    with db.engine.begin() as conn:
+        _drop_leftovers(conn)
+        shadow_meta = MetaData()
+        entries, scopes = (t.to_metadata(shadow_meta, name=t.name + suffix) for t in _TABLES)
+        shadow_meta.create_all(conn)
+        for threshold in thresholds:
+            for scope, join in (
+                (literal(GLOBAL_SCOPE), None),
+                (func.lower(literal("genre:") + AppGenre.genre), AppGenre),
+                (func.lower(literal("category:") + AppCategory.category), AppCategory),
+            ):
+                ranked = _ranked(scope, threshold, size, join).subquery()
+                conn.execute(entries.insert().from_select(
+                    [c.name for c in entries.columns],
+                    select(*(ranked.c[c.name] for c in entries.columns)),
+                ))
+                conn.execute(scopes.insert().from_select(
+                    ["scope", "min_reviews", "qualified", "materialized", "built_at"],
+                    select(ranked.c.scope, ranked.c.min_reviews, func.max(ranked.c.qualified), func.count(),
+                           literal(built_at)).group_by(ranked.c.scope, ranked.c.min_reviews),
+                ))
+        boards, rows = conn.execute(select(func.count(), func.coalesce(func.sum(scopes.c.materialized), 0))).one()
+    _swap({LeaderboardEntry.__tablename__: entries.name, LeaderboardScope.__tablename__: scopes.name})
+    leaderboards_swapped.send(current_app._get_current_object(), built_at=built_at)
+    #response caches key on the catalog version, this bumps it so nobody keeps serving the old boards
+    elapsed = time.monotonic() - started
+    log.info("leaderboards swapped in: %s boards, %s rows in %.1fs", boards, rows, elapsed)
+    return {"boards": boards, "rows": rows, "elapsed_seconds": round(elapsed, 3)}
+
+
+def leaderboard_page(scope: str, min_reviews: int, limit: int,
+                     after: Optional[Tuple[float, int]] = None) -> Optional[List[Any]]:
+    """
+    One page of a board in the order top_gems_sql would return it, or None
+    when there is no board for (scope, min_reviews) or the page runs past
+    the rows that were kept and live scoring has to take over.
+    """
+    meta = db.session.get(LeaderboardScope, (scope, min_reviews))
+    if meta is None:
+        return None
+    query = (
+        select(LeaderboardEntry.appid, LeaderboardEntry.name, LeaderboardEntry.positive, LeaderboardEntry.negative,
+               LeaderboardEntry.recommendations_total, LeaderboardEntry.score)
+        .where(LeaderboardEntry.scope == scope, LeaderboardEntry.min_reviews == min_reviews)
+    )
+    if after is not None:
+        query = query.where(tuple_(LeaderboardEntry.score, LeaderboardEntry.appid) < tuple_(*after))
+    rows = db.session.execute(query.order_by(LeaderboardEntry.rank).limit(limit)).all()
+    if len(rows) < limit and meta.qualified > meta.materialized:
+        return None
+    return rows
@@ -0,0 +1,391 @@
+# app/services/library_store.py
+"""
+Read-side copy of owned_games for user-aware scoring, held as flat arrays
+instead of rows or ORM objects.
+
+Libraries are stored CSR-style across all users. user_ids is sorted and
+ptr[i]:ptr[i + 1] is user i's slice of appid (int32), playtime (int32, minutes)
+and last_played (int64, epoch seconds, 0 = never). Each slice is sorted by
+appid, so that is 16 bytes per ownership row and a membership test is a
+searchsorted.
+
+Loading reads owned_games in one ordered, streamed scan (yield_per), fetched in
+batches that go straight into NumPy. With LIBRARY_STORE_PATH set, the arrays are also written
+to a snapshot file, and the other workers memory-map it (copy-on-write)
+instead of scanning again while it is younger than LIBRARY_RELOAD_SECONDS.
+
+upsert_owned_games_only announces every change through library_synced.
+Playtime and last-played edits are written into the arrays in place. Libraries
+that gain or lose games move to a per-user overlay, which is folded back into
+the CSR once it grows past a fraction of the base. Writes made by other
+processes are found through library_syncs (one stamp per user, written with
+the rows): every LIBRARY_CHECK_SECONDS, and right away when the response
+cache sees a new version, the users stamped since the last check are re-read
+and their differences go through the same patch path (and library_reloaded).
+"""
+from __future__ import annotations
+import logging, os, tempfile, threading, time
+from itertools import chain
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+from ..models.appdetails import db, LibrarySync, OwnedGame
+from ..signals import library_reloaded, library_synced
+
+log = logging.getLogger(__name__)
+
+_MAGIC = b"LIBCSR01"
+_HEADER = np.dtype([("magic", "S8"), ("n_users", "<i8"), ("n_rows", "<i8"), ("loaded_at", "<i8")])
+_LAYOUT = (("user_ids", "<i8", "users"), ("ptr", "<i8", "ptr"), ("last_played", "<i8", "rows"),
+           ("appid", "<i4", "rows"), ("playtime", "<i4", "rows"))
+#file order, every array starts 8-byte aligned (the two int32 arrays together span n_rows * 8 bytes)
+_FETCH_ROWS = 50000
+COMPACT_MIN_ROWS = 65536
+COMPACT_FRACTION = 0.05
+#fold the overlay back in once it holds more than max(this many rows, this share of the base)
+SYNC_OVERLAP = 60.0
+#library_syncs are re-read this far behind the newest stamp seen, for late commits and clock skew
+_IN_CHUNK = 500
+
+
+class Library(NamedTuple):
+    """One user's games, sorted by appid."""
+    appid: np.ndarray
+    playtime: np.ndarray
+    last_played: np.ndarray
+
+
+_EMPTY = Library(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64))
+
+
+def _library_from_plays(plays: Dict[int, Tuple[int, Optional[int]]]) -> Library:
+    appids = sorted(plays)
+    return Library(
+        np.array(appids, dtype=np.int32),
+        np.array([plays[a][0] or 0 for a in appids], dtype=np.int32),
+        np.array([plays[a][1] or 0 for a in appids], dtype=np.int64),
+    )
+
+
+class LibraryStore:
+    """CSR libraries for every user with a per-user overlay of libraries changed since the load."""
+
+    def __init__(self, path: str = "", reload_interval: float = 3600.0, check_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self._sync_mark = 0.0
+        #newest library_syncs stamp covered by the arrays
+        self._lock = threading.RLock()
+        self._overlay: Dict[int, Library] = {}
+        self._overlay_rows = 0
+        self._loaded_at = 0.0
+        #monotonic time of the last load, 0 = never
+        self.version = 0
+        #bumped on every change
+        self.generation = 0
+        #bumped on full loads, cached per-user state derived from the store should be rebuilt
+        self.source = "empty"
+        self._set_arrays(np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                         _EMPTY.appid, _EMPTY.playtime, _EMPTY.last_played)
+
+    def _set_arrays(self, user_ids, ptr, appid, playtime, last_played) -> None:
+        self.user_ids, self.ptr = user_ids, ptr
+        self.appid, self.playtime, self.last_played = appid, playtime, last_played
+
+    # -------- loading --------
+
+    def load(self) -> None:
+        """Map a fresh snapshot file when there is one, else scan owned_games (and write the file)."""
+        started = time.time()
+        mark, arrays = self._read_file() if self.path else (0.0, None)
+        #a mapped file covers the syncs up to when its scan started, checked before the arrays are read
+        source = "file"
+        if arrays is None:
+            mark = started
+            arrays = self._scan()
+            source = "database"
+            if self.path:
+                try:
+                    write_snapshot(self.path, *arrays, loaded_at=started)
+                except OSError as e:
+                    log.warning("couldn't write library snapshot %s: %s", self.path, e)
+        with self._lock:
+            changed = not self._loaded_at or not self._same_as(arrays)
+            self._set_arrays(*arrays)
+            self._overlay.clear()
+            self._overlay_rows = 0
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._sync_mark = mark
+            self.source = source
+            if changed:
+                self.version += 1
+                self.generation += 1
+                #a timed reload that found what the patches already had keeps dependents' caches
+        log.info("library store: %d users, %d rows from %s", len(self.user_ids), len(self.appid), source)
+
+    def _scan(self) -> Tuple[np.ndarray, ...]:
+        table = OwnedGame.__table__
+        query = select(
+            table.c.user_id, table.c.appid,
+            func.coalesce(table.c.playtime_forever, 0), func.coalesce(table.c.rtime_last_played, 0),
+        ).order_by(table.c.user_id, table.c.appid)
+        result = db.session.execute(query).yield_per(_FETCH_ROWS)
+        #streamed in batches instead of buffering every row, each batch flattened into one int64 block
+        try:
+            parts = [np.fromiter(chain.from_iterable(batch), dtype=np.int64, count=4 * len(batch))
+                     for batch in result.partitions()]
+        finally:
+            result.close()
+        rows = np.concatenate(parts).reshape(-1, 4) if parts else np.zeros((0, 4), dtype=np.int64)
+        user_ids, counts = np.unique(rows[:, 0], return_counts=True)
+        ptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        return (user_ids, ptr, rows[:, 1].astype(np.int32), rows[:, 2].astype(np.int32),
+                np.ascontiguousarray(rows[:, 3]))
+
+    def _same_as(self, arrays: Tuple[np.ndarray, ...]) -> bool:
+        """Whether freshly loaded arrays hold exactly what the store (overlay folded in) has now."""
+        self._compact()
+        current = (self.user_ids, self.ptr, self.appid, self.playtime, self.last_played)
+        return all(np.array_equal(a, b) for a, b in zip(current, arrays))
+
+    def _read_file(self) -> Tuple[float, Optional[Tuple[np.ndarray, ...]]]:
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except OSError:
+            return 0.0, None
+        if age >= self.reload_interval:
+            return 0.0, None
+        try:
+            return snapshot_time(self.path), read_snapshot(self.path)
+        except (OSError, ValueError) as e:
+            log.warning("ignoring library snapshot %s: %s", self.path, e)
+            return 0.0, None
+
+    def maybe_reload(self) -> None:
+        """Cheap per-request hook, reloads every reload_interval seconds and checks syncs every check_interval."""
+        now = time.monotonic()
+        if not self._loaded_at or now - self._loaded_at >= self.reload_interval:
+            self.load()
+        elif now - self._checked_at >= self.check_interval:
+            self.refresh_changed()
+
+    # -------- other processes' syncs --------
+
+    def refresh_changed(self) -> List[int]:
+        """
+        Re-read the libraries stamped in library_syncs since the last check and
+        patch the ones that differ. Returns those user_ids.
+        """
+        if not self._loaded_at:
+            return []
+        self._checked_at = time.monotonic()
+        stamps = db.session.execute(
+            select(LibrarySync.user_id, LibrarySync.synced_at).where(LibrarySync.synced_at >= self._sync_mark - SYNC_OVERLAP)
+        ).all()
+        if not stamps:
+            return []
+        user_ids = sorted({int(u) for u, _ in stamps})
+        plays: Dict[int, Dict[int, Tuple[int, int]]] = {u: {} for u in user_ids}
+        table = OwnedGame.__table__
+        for chunk in (user_ids[i:i + _IN_CHUNK] for i in range(0, len(user_ids), _IN_CHUNK)):
+            rows = db.session.execute(select(
+                table.c.user_id, table.c.appid,
+                func.coalesce(table.c.playtime_forever, 0), func.coalesce(table.c.rtime_last_played, 0),
+            ).where(table.c.user_id.in_(chunk)))
+            for user_id, appid, playtime, last_played in rows:
+                plays[user_id][appid] = (playtime, last_played)
+        changed = []
+        with self._lock:
+            self._sync_mark = max(self._sync_mark, max(float(t) for _, t in stamps))
+            for user_id in user_ids:
+                current = self.library(user_id)
+                have = {int(a): (int(p), int(lp)) for a, p, lp in zip(current.appid, current.playtime, current.last_played)}
+                want = plays[user_id]
+                changes = [(a, have.get(a), want.get(a)) for a in sorted(have.keys() | want.keys())
+                           if have.get(a) != want.get(a)]
+                if changes:
+                    self.apply_changes(user_id, changes)
+                    changed.append((user_id, changes))
+        sender = current_app._get_current_object()
+        for user_id, changes in changed:
+            library_reloaded.send(sender, user_id=user_id, changes=changes)
+        return [user_id for user_id, _ in changed]
+
+    # -------- reads --------
+
+    def _index(self, user_id: int) -> int:
+        i = int(np.searchsorted(self.user_ids, user_id))
+        return i if i < len(self.user_ids) and self.user_ids[i] == user_id else -1
+
+    def library(self, user_id: int) -> Library:
+        """One user's games (views into the store, don't modify). Unknown users get an empty library."""
+        with self._lock:
+            overlay = self._overlay.get(user_id)
+            if overlay is not None:
+                return overlay
+            i = self._index(user_id)
+            if i < 0:
+                return _EMPTY
+            start, end = self.ptr[i], self.ptr[i + 1]
+            return Library(self.appid[start:end], self.playtime[start:end], self.last_played[start:end])
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(user_ids, ptr, appid) with the overlay folded in, for whole-catalog builds."""
+        with self._lock:
+            self._compact()
+            return self.user_ids, self.ptr, self.appid
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            arrays = (self.user_ids, self.ptr, self.appid, self.playtime, self.last_played)
+            return {"users": len(self.user_ids), "rows": len(self.appid), "overlay_users": len(self._overlay),
+                    "overlay_rows": self._overlay_rows, "bytes": sum(a.nbytes for a in arrays),
+                    "source": self.source}
+
+    # -------- writes --------
+
+    def apply_changes(self, user_id: int, changes: List[Tuple[int, Optional[tuple], Optional[tuple]]]) -> None:
+        """Patch one library from library_synced changes, (appid, old, new) with (playtime, last_played) plays."""
+        if not self._loaded_at or not changes:
+            return
+        with self._lock:
+            if user_id not in self._overlay and all(old is not None and new is not None for _, old, new in changes):
+                i = self._index(user_id)
+                if i >= 0 and self._patch_in_place(i, changes):
+                    self.version += 1
+                    return
+            current = self.library(user_id)
+            plays = {int(a): (int(p), int(lp)) for a, p, lp in zip(current.appid, current.playtime, current.last_played)}
+            for appid, _, new in changes:
+                if new is None:
+                    plays.pop(int(appid), None)
+                else:
+                    plays[int(appid)] = new
+            previous = self._overlay.get(user_id)
+            self._overlay[user_id] = _library_from_plays(plays)
+            self._overlay_rows += len(plays) - (len(previous.appid) if previous is not None else 0)
+            self.version += 1
+            if self._overlay_rows > max(COMPACT_MIN_ROWS, COMPACT_FRACTION * len(self.appid)):
+                self._compact()
+
+    def _patch_in_place(self, i: int, changes) -> bool:
+        start, end = int(self.ptr[i]), int(self.ptr[i + 1])
+        appids = np.array([appid for appid, _, _ in changes], dtype=np.int32)
+        at = start + np.searchsorted(self.appid[start:end], appids)
+        if (at >= end).any() or (self.appid[np.minimum(at, end - 1)] != appids).any():
+            return False
+            #the base is missing one of them (e.g. loaded before its insert), go through the overlay
+        self.playtime[at] = [new[0] or 0 for _, _, new in changes]
+        self.last_played[at] = [new[1] or 0 for _, _, new in changes]
+        return True
+
+    def _compact(self) -> None:
+        """Fold the overlay into fresh CSR arrays (in memory, a mapped file is left alone)."""
+        if not self._overlay:
+            return
+        replaced = np.array(sorted(self._overlay), dtype=np.int64)
+        user_ids = np.union1d(self.user_ids, replaced)
+        counts = np.zeros(len(user_ids), dtype=np.int64)
+        base_at = np.searchsorted(user_ids, self.user_ids)
+        counts[base_at] = np.diff(self.ptr)
+        for user_id, library in self._overlay.items():
+            counts[np.searchsorted(user_ids, user_id)] = len(library.appid)
+        ptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        appid = np.empty(int(ptr[-1]), dtype=np.int32)
+        playtime = np.empty(int(ptr[-1]), dtype=np.int32)
+        last_played = np.empty(int(ptr[-1]), dtype=np.int64)
+        keep = ~np.isin(self.user_ids, replaced)
+        #unchanged users move over in one gather, overlay users are copied one by one
+        source = np.repeat(keep, np.diff(self.ptr))
+        target = np.repeat(np.isin(user_ids, self.user_ids[keep]), counts)
+        appid[target], playtime[target], last_played[target] = (
+            self.appid[source], self.playtime[source], self.last_played[source])
+        for user_id, library in self._overlay.items():
+            j = int(np.searchsorted(user_ids, user_id))
+            appid[ptr[j]:ptr[j + 1]] = library.appid
+            playtime[ptr[j]:ptr[j + 1]] = library.playtime
+            last_played[ptr[j]:ptr[j + 1]] = library.last_played
+        self._set_arrays(user_ids, ptr, appid, playtime, last_played)
+        self._overlay.clear()
+        self._overlay_rows = 0
+
+
+# -------- snapshot file --------
+
+def write_snapshot(path: str, user_ids, ptr, appid, playtime, last_played, loaded_at: Optional[float] = None) -> None:
+    """
+    Write the arrays to `path` atomically (temp file + rename), readers never see half a file.
+    loaded_at is when the scan started (default now).
+    """
+    header = np.zeros(1, dtype=_HEADER)
+    header[0] = (_MAGIC, len(user_ids), len(appid), int(time.time() if loaded_at is None else loaded_at))
+    arrays = {"user_ids": user_ids, "ptr": ptr, "appid": appid, "playtime": playtime, "last_played": last_played}
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".library-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header.tobytes())
+            for name, dtype, _ in _LAYOUT:
+                fh.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def snapshot_time(path: str) -> float:
+    """loaded_at of a snapshot file, epoch seconds."""
+    header = np.fromfile(path, dtype=_HEADER, count=1)
+    if len(header) != 1 or header[0]["magic"] != _MAGIC:
+        raise ValueError("not a library snapshot")
+    return float(header[0]["loaded_at"])
+
+
+def read_snapshot(path: str) -> Tuple[np.ndarray, ...]:
+    """Map the arrays of a snapshot file copy-on-write, in _set_arrays order."""
+    header = np.fromfile(path, dtype=_HEADER, count=1)
+    if len(header) != 1 or header[0]["magic"] != _MAGIC:
+        raise ValueError("not a library snapshot")
+    n_users, n_rows = int(header[0]["n_users"]), int(header[0]["n_rows"])
+    lengths = {"users": n_users, "ptr": n_users + 1, "rows": n_rows}
+    offset = _HEADER.itemsize
+    expected = offset + sum(np.dtype(d).itemsize * lengths[kind] for _, d, kind in _LAYOUT)
+    if os.path.getsize(path) != expected:
+        raise ValueError("truncated library snapshot")
+    arrays = {}
+    for name, dtype, kind in _LAYOUT:
+        count = lengths[kind]
+        arrays[name] = (np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=(count,))
+                        if count else np.zeros(0, dtype=dtype))
+        #mode "c": pages are shared between workers until one patches a play in place
+        offset += np.dtype(dtype).itemsize * count
+    return arrays["user_ids"], arrays["ptr"], arrays["appid"], arrays["playtime"], arrays["last_played"]
+
+
+def get_library_store() -> LibraryStore:
+    """One store per Flask app (so per worker process), loaded on first use."""
+    ext = current_app.extensions
+    store = ext.get("library_store")
+    if store is None:
+        store = LibraryStore(
+            path=current_app.config.get("LIBRARY_STORE_PATH", ""),
+            reload_interval=current_app.config.get("LIBRARY_RELOAD_SECONDS", 3600),
+            check_interval=current_app.config.get("LIBRARY_CHECK_SECONDS", 5),
+        )
+        ext["library_store"] = store
+    store.maybe_reload()
+    return store
+
+
+# -------- write-path hooks --------
+
+@library_synced.connect
+def _on_library_synced(sender, user_id=None, changes=None, **extra):
+    store = sender.extensions.get("library_store")
+    if store is not None and user_id is not None:
+        store.apply_changes(int(user_id), changes or [])
@@ -0,0 +1,220 @@
+# app/services/metrics.py
+"""
+In-process counters and histograms rendered in the Prometheus text format at
+/api/metrics. Collected per worker process like the caches, so scrape each
+worker (or run one per host). With METRICS_ENABLED off no request or SQL hooks
+are installed and the instrumented call sites cost one attribute check.
+
+What gets recorded:
+  http_request_duration_seconds   per route + method, from before_request to the returned response
+  http_requests_total             per route + method + status
+  http_request_sql_statements     statements one request ran (executemany counts once)
+  http_request_sql_seconds        time those statements spent in the driver
+  steam_cache_requests_total      SteamClient._get by endpoint and tier that answered
+  steam_upstream_seconds          actual HTTP round trips to steam, retries included
+  steam_upstream_responses_total  by endpoint and status ("error" for connection failures)
+  steam_appdetails_failures_total _request_appdetails failures by reason
+  app_startup_seconds / app_warmup_seconds   create_app phases and the ranking preload (gauges)
+"""
+from __future__ import annotations
+import threading, time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Gauge(Counter):
+    """Last value set, for one-off measurements like startup phases."""
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative buckets rendered at scrape time; observe() only bumps one slot."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, List[float]] = {}
+        #label values -> [count per bucket..., count above the last bucket, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[slot] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, slots in series:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), slots):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {repr(float(slots[-1]))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_number(cumulative)}")
+        return lines
+
+
+class Metrics:
+    """The process-wide set of instruments. `enabled` is flipped by init_metrics."""
+
+    def __init__(self):
+        self.enabled = False
+        self.request_seconds = Histogram("http_request_duration_seconds", "Request latency.", ("route", "method"))
+        self.requests = Counter("http_requests_total", "Requests served.", ("route", "method", "status"))
+        self.request_sql_statements = Histogram(
+            "http_request_sql_statements", "SQL statements per request.", ("route",), COUNT_BUCKETS)
+        self.request_sql_seconds = Histogram("http_request_sql_seconds", "SQL time per request.", ("route",))
+        self.steam_cache = Counter(
+            "steam_cache_requests_total", "SteamClient lookups by the tier that answered (memory, disk, upstream).",
+            ("endpoint", "result"))
+        self.steam_upstream_seconds = Histogram(
+            "steam_upstream_seconds", "HTTP round trips to steam, one per attempt.", ("endpoint",))
+        self.steam_upstream = Counter(
+            "steam_upstream_responses_total", "Steam responses by status code, error for connection failures.",
+            ("endpoint", "status"))
+        self.appdetails_failures = Counter(
+            "steam_appdetails_failures_total", "Failed _request_appdetails calls.", ("reason",))
+        self.profiled = Counter("slow_requests_profiled_total", "Requests whose stack samples were written.", ("route",))
+        self.startup_seconds = Gauge("app_startup_seconds", "create_app time by phase.", ("phase",))
+        self.warmup_seconds = Gauge("app_warmup_seconds", "Ranking data preload time by step.", ("step",))
+
+    def instruments(self) -> Iterable:
+        return (v for v in vars(self).values() if isinstance(v, (Counter, Histogram)))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for instrument in self.instruments():
+            lines += instrument.render()
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+# -------- per-request SQL accounting --------
+
+class _SqlTally(threading.local):
+    #statements/time for the request running on this thread, None outside requests
+    statements: Optional[int] = None
+    seconds: float = 0.0
+    started: float = 0.0
+
+
+_sql = _SqlTally()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql.statements is not None:
+        _sql.started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql.statements is not None:
+        _sql.statements += 1
+        _sql.seconds += time.perf_counter() - _sql.started
+
+
+def route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+    #the rule template, not the path, so /apps/<int:appid>/similar stays one series
+
+
+def _start_request() -> None:
+    g._metrics_started = time.perf_counter()
+    _sql.statements, _sql.seconds = 0, 0.0
+
+
+def _finish_request(response: Response) -> Response:
+    started = g.pop("_metrics_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route, method = route_label(), request.method
+    METRICS.request_seconds.observe(elapsed, route, method)
+    METRICS.requests.inc(route, method, str(response.status_code))
+    METRICS.request_sql_statements.observe(_sql.statements or 0, route)
+    METRICS.request_sql_seconds.observe(_sql.seconds, route)
+    _sql.statements = None
+    return response
+
+
+def init_metrics(app: Flask, engine) -> None:
+    """Install the request and SQL hooks and /api/metrics, only when METRICS_ENABLED."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    METRICS.enabled = True
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    #after_request also sees the 500 Flask renders for an unhandled error
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.get("/api/metrics")
+    def metrics():
+        return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
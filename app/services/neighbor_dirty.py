@@ -0,0 +1,20 @@
+# app/services/neighbor_dirty.py
+"""
+Dirty marks for the neighbor index (services/similarity.py). Kept apart from
+the NumPy build code so the write paths (ingest_app_metadata,
+upsert_owned_games_only) can mark apps without importing the build itself.
+"""
+from __future__ import annotations
+import time
+from typing import Sequence
+from ..models.similarity import NeighborDirty
+from .bulk import chunked, upsert
+
+
+def mark_dirty(appids: Sequence[int]) -> None:
+    """Queue apps for the next incremental neighbor build. Does not commit, the marks go in with the caller's rows."""
+    if not appids:
+        return
+    now = int(time.time())
+    for chunk in chunked([{"appid": int(a), "marked_at": now} for a in set(appids)], 500):
+        upsert(NeighborDirty.__table__, chunk, key=["appid"])
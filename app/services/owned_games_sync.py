@@ -1,36 +1,110 @@
-# app/services/owned_sync.py
-from ..models.appdetails import db, App, OwnedGame
-
-def upsert_owned_games_only(user_id: int, games: list[dict]) -> dict:
-    #load once: all rows for this user → O(1) lookups in the loop
-    existing_by_appid = {}
-    for row in OwnedGame.query.filter_by(user_id=user_id).all():
-        existing_by_appid[row.appid] = row
-    #create a dict of all ownedgame rows for user-
-    seen = set()
-    created = updated = 0
+# app/services/owned_games_sync.py
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import and_, bindparam
+from ..models.appdetails import db, App, LibrarySync, OwnedGame
+from ..signals import library_synced
+from .bulk import chunked, insert_ignore, upsert
+from .neighbor_dirty import mark_dirty
 
+IN_CHUNK = 500
+#keeps IN (...) lists and multi-row VALUES well under sqlite's bound parameter limit
+
+
+def _incoming_rows(games: List[dict]) -> Dict[int, Tuple[int, Optional[int]]]:
+    #appid -> (playtime_forever, rtime_last_played), last entry wins on duplicates
+    incoming: Dict[int, Tuple[int, Optional[int]]] = {}
     for g in games:
         appid = g.get("appid")
         if appid is None:
             continue
-        seen.add(appid)
-        
-        if App.query.get(appid) is None:
-            db.session.add(App(appid=appid))  
-            #FK parent
-        
-        row = existing_by_appid.get(appid)
-        #lookups in O(1) time cuz of dict,essentially one query over n+1 queries
-        if row is None:
-            row = OwnedGame(user_id=user_id, appid=appid)
-            db.session.add(row)
-            created += 1
-        else:
-            updated += 1
-
-        row.playtime_forever  = int(g.get("playtime_forever") or 0)
         rlp = g.get("rtime_last_played")
-        row.rtime_last_played = int(rlp) if rlp is not None else None
+        incoming[int(appid)] = (int(g.get("playtime_forever") or 0), int(rlp) if rlp is not None else None)
+    return incoming
+
+
+def _ensure_app_parents(appids: List[int]) -> int:
+    """FK parents for apps we've never seen: one IN query + one bulk insert per chunk."""
+    created = 0
+    for chunk in chunked(appids, IN_CHUNK):
+        known = {a for (a,) in db.session.query(App.appid).filter(App.appid.in_(chunk))}
+        missing = [{"appid": a, "positive": 0, "negative": 0, "score": 0.0} for a in chunk if a not in known]
+        if missing:
+            insert_ignore(App.__table__, missing, key=["appid"])
+            created += len(missing)
+    return created
+
+
+def upsert_owned_games_only(user_id: int, games: list[dict], prune: bool = False) -> dict:
+    """
+    Sync one user's library to `games` with bulk statements. Rows whose
+    playtime and last-played didn't change aren't written. Games missing from
+    `games` (refunds, removals) are only deleted with prune=True, which callers
+    should pass only for a confirmed complete GetOwnedGames response: a
+    private or failing profile comes back as an empty list. An empty `games`
+    never prunes.
+    Returns counts plus the exact appids created/updated/deleted.
+    """
+    #load once: all rows for this user as plain tuples, no ORM objects
+    existing: Dict[int, Tuple[int, Optional[int]]] = {
+        appid: (playtime or 0, rlp)
+        for appid, playtime, rlp in db.session.query(
+            OwnedGame.appid, OwnedGame.playtime_forever, OwnedGame.rtime_last_played
+        ).filter(OwnedGame.user_id == user_id)
+    }
+    incoming = _incoming_rows(games)
+
+    created = [a for a in incoming if a not in existing]
+    updated = [a for a in incoming if a in existing and incoming[a] != existing[a]]
+    unchanged = len(incoming) - len(created) - len(updated)
+    deleted = [a for a in existing if a not in incoming] if prune and incoming else []
+    #an empty list is what steam sends for private profiles too, never read it as "owns nothing"
+
+    parents_created = _ensure_app_parents(created)
+
+    table = OwnedGame.__table__
+    if created:
+        rows = [{"user_id": user_id, "appid": a, "playtime_forever": incoming[a][0],
+                 "rtime_last_played": incoming[a][1]} for a in created]
+        for chunk in chunked(rows, IN_CHUNK):
+            db.session.execute(table.insert(), chunk)
+    if updated:
+        stmt = (
+            table.update()
+            .where(and_(table.c.user_id == bindparam("_user_id"), table.c.appid == bindparam("_appid")))
+            .values(playtime_forever=bindparam("playtime_forever"), rtime_last_played=bindparam("rtime_last_played"))
+        )
+        db.session.execute(stmt, [
+            {"_user_id": user_id, "_appid": a, "playtime_forever": incoming[a][0], "rtime_last_played": incoming[a][1]}
+            for a in updated
+        ])
+        #executemany, one round trip for every changed row
+    for chunk in chunked(deleted, IN_CHUNK):
+        db.session.execute(table.delete().where(table.c.user_id == user_id, table.c.appid.in_(chunk)))
+    if created or updated or deleted:
+        upsert(LibrarySync.__table__, [{"user_id": user_id, "synced_at": time.time()}], key=["user_id"])
+        #commits with the rows, other processes' library stores poll this to reload the user
+    mark_dirty(created + deleted)
+    #only gaining/losing a game changes co-ownership, playtime edits don't
     db.session.commit()
-    return {"created": created, "updated": updated, "total_incoming": len(games)}
+    if created or updated or deleted:
+        changes = [(a, None, incoming[a]) for a in created]
+        changes += [(a, existing[a], incoming[a]) for a in updated]
+        changes += [(a, existing[a], None) for a in deleted]
+        library_synced.send(current_app._get_current_object(), user_id=user_id, changes=changes)
+        #lets cached profiles/library stores patch themselves instead of reloading
+
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "unchanged": unchanged,
+        "deleted": len(deleted),
+        "app_parents_created": parents_created,
+        "total_incoming": len(games),
+        "diff": {
+            "created": sorted(created),
+            "updated": sorted(updated),
+            "deleted": sorted(deleted),
+        },
+    }
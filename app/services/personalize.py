@@ -0,0 +1,412 @@
+# app/services/personalize.py
+"""
+Content-based personal recommendations (?user_id=).
+
+Every app is a sparse row over genre/category features (L2 normalized, kept as
+COO arrays aligned with the catalog snapshot's rows). A user's profile is a
+vector over the same features: sum of each owned game's row weighted by
+log1p(playtime_forever), plus a recency term that decays with
+rtime_last_played. Candidates are scored with one sparse mat-vec (X @ profile),
+blended with the gem score, owned games excluded.
+
+The recency term is stored as S = sum(w * exp((t - anchor) / tau) * row) with
+the anchor near the profile's build time, so at request time it's just
+S * exp(-(now - anchor) / tau): decay never needs a rebuild, and a library
+change is an exact +/- delta on L and S. Profiles are cached per process and
+patched from library_synced / library_reloaded (another process's sync) and
+from the catalog snapshot's change log, so every worker sees metadata writes.
+Libraries are read from the LibraryStore (services/library_store.py) as
+arrays, so building a profile runs no query and creates no ORM objects.
+"""
+from __future__ import annotations
+import threading, time
+from collections import OrderedDict
+from math import exp, log
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from ..models.appdetails import db, AppGenre, AppCategory
+from ..signals import library_reloaded, library_synced
+from .bulk import chunked
+from .library_store import Library, LibraryStore, get_library_store
+from .ranking_engine import CatalogSnapshot, get_snapshot
+
+MIN_HALF_LIFE_DAYS = 1.0
+MAX_RECENCY_EXPONENT = 50.0
+#caps exp((t - anchor) / tau) for last_played stamps far past the anchor (clock skew), well inside float64 range
+
+Play = Tuple[int, Optional[int]]
+#(playtime_forever minutes, rtime_last_played epoch seconds or None)
+
+
+def _app_features(appids: Optional[List[int]] = None) -> Dict[int, List[str]]:
+    """appid -> ["genre:Action", "category:Co-op", ...], for all apps or a subset."""
+    features: Dict[int, List[str]] = {}
+    for model, column, prefix in ((AppGenre, AppGenre.genre, "genre:"), (AppCategory, AppCategory.category, "category:")):
+        for chunk in [None] if appids is None else chunked(appids, 500):
+            query = select(model.appid, column)
+            if chunk is not None:
+                query = query.where(model.appid.in_(chunk))
+            for appid, value in db.session.execute(query):
+                features.setdefault(appid, []).append(prefix + value)
+    return features
+
+
+class FeatureMatrix:
+    """
+    Sparse app x feature matrix in COO form (rows, cols, data). Rows are
+    catalog snapshot positions, columns come from an append-only vocabulary so
+    profile vectors built earlier stay valid when new genres show up.
+    """
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.cols = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros(0, dtype=np.float64)
+        self.generation = -1
+        #snapshot generation the rows were built against
+        self.version = -1
+        #snapshot version the rows are patched up to
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vocab)
+
+    def _entries(self, features_by_pos: Dict[int, List[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows: List[int] = []
+        cols: List[int] = []
+        data: List[float] = []
+        for pos, names in features_by_pos.items():
+            names = set(names)
+            if not names:
+                continue
+            weight = 1.0 / np.sqrt(len(names))
+            #binary row scaled to unit length, so X @ p is a cosine up to |p|
+            for name in names:
+                rows.append(pos)
+                cols.append(self.vocab.setdefault(name, len(self.vocab)))
+                data.append(weight)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(data, dtype=np.float64)
+
+    def build(self, snapshot: CatalogSnapshot) -> None:
+        version = snapshot.version
+        by_pos = {}
+        for appid, names in _app_features().items():
+            pos = snapshot.row_of(appid)
+            if pos is not None:
+                by_pos[pos] = names
+        self.rows, self.cols, self.data = self._entries(by_pos)
+        self.generation, self.version = snapshot.generation, version
+
+    def replace_rows(self, features_by_pos: Dict[int, List[str]]) -> None:
+        """Swap the entries of a few rows, O(nnz) with no re-sorting."""
+        keep = ~np.isin(self.rows, np.fromiter(features_by_pos, dtype=np.int64, count=len(features_by_pos)))
+        rows, cols, data = self._entries(features_by_pos)
+        self.rows = np.concatenate((self.rows[keep], rows))
+        self.cols = np.concatenate((self.cols[keep], cols))
+        self.data = np.concatenate((self.data[keep], data))
+
+    def row_vectors(self, positions: Iterable[int]) -> Dict[int, np.ndarray]:
+        """Dense feature vectors for a handful of rows."""
+        positions = list(positions)
+        out = {pos: np.zeros(self.n_features) for pos in positions}
+        mask = np.isin(self.rows, np.array(positions, dtype=np.int64))
+        for pos, col, value in zip(self.rows[mask], self.cols[mask], self.data[mask]):
+            out[int(pos)][col] += value
+        return out
+
+    def matvec(self, vector: np.ndarray, n_rows: int) -> np.ndarray:
+        """X @ vector for every row, one bincount over the nonzeros."""
+        vector = _pad(vector, self.n_features)
+        return np.bincount(self.rows, weights=self.data * vector[self.cols], minlength=n_rows)[:n_rows]
+
+    def matmat(self, vectors: np.ndarray, n_rows: int, block: int = 8192) -> np.ndarray:
+        """
+        X @ vectors for a features x k matrix. Rows are densified `block` at a
+        time, so memory is block x features on top of the n_rows x k result.
+        """
+        vectors = np.vstack((vectors, np.zeros((max(self.n_features - len(vectors), 0), vectors.shape[1]))))
+        order = np.argsort(self.rows, kind="stable")
+        rows, cols, data = self.rows[order], self.cols[order], self.data[order]
+        out = np.zeros((n_rows, vectors.shape[1]))
+        for start in range(0, n_rows, block):
+            stop = min(start + block, n_rows)
+            lo, hi = np.searchsorted(rows, (start, stop))
+            dense = np.zeros((stop - start, self.n_features))
+            dense[rows[lo:hi] - start, cols[lo:hi]] = data[lo:hi]
+            out[start:stop] = dense @ vectors[:self.n_features]
+        return out
+
+    def rmatvec(self, weights: np.ndarray) -> np.ndarray:
+        """X.T @ weights (weights indexed by row), how profiles are summed."""
+        weights = _pad(weights, int(self.rows.max()) + 1 if len(self.rows) else 0)
+        return np.bincount(self.cols, weights=self.data * weights[self.rows], minlength=self.n_features)
+
+
+def _pad(vector: np.ndarray, size: int) -> np.ndarray:
+    if len(vector) >= size:
+        return vector
+    return np.concatenate((vector, np.zeros(size - len(vector))))
+
+
+class Profile:
+    __slots__ = ("user_id", "long_term", "recent", "anchor")
+
+    def __init__(self, user_id: int, n_features: int, anchor: float):
+        self.user_id = user_id
+        self.long_term = np.zeros(n_features)
+        self.recent = np.zeros(n_features)
+        self.anchor = anchor
+        #epoch seconds the recency weights in `recent` are relative to
+        #the library itself stays in the LibraryStore, enough to patch the profile without touching the DB
+
+
+class Personalizer:
+    """Feature matrix + LRU of user profiles for one worker process."""
+
+    def __init__(self, libraries: LibraryStore, half_life_days: float = 30.0, recency_boost: float = 2.0,
+                 gem_weight: float = 0.3, max_profiles: int = 10000):
+        if half_life_days < MIN_HALF_LIFE_DAYS:
+            raise ValueError(f"half_life_days must be at least {MIN_HALF_LIFE_DAYS}")
+        self.libraries = libraries
+        self._library_generation = -1
+        #store generation the cached profiles were built against
+        self.tau = half_life_days * 86400 / log(2)
+        self.recency_boost = recency_boost
+        self.gem_weight = gem_weight
+        self.max_profiles = max_profiles
+        self.features = FeatureMatrix()
+        self.profiles: "OrderedDict[int, Profile]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    # -------- weights --------
+
+    def weights(self, play: Optional[Play], anchor: float) -> Tuple[float, float]:
+        """(long-term, recency) weight of one owned game, recency relative to `anchor`."""
+        if play is None:
+            return 0.0, 0.0
+        playtime, last_played = play
+        base = float(np.log1p(max(playtime or 0, 0)))
+        if not last_played:
+            return base, 0.0
+        return base, base * exp(min((last_played - anchor) / self.tau, MAX_RECENCY_EXPONENT))
+
+    def library_weights(self, library: Library, anchor: float) -> Tuple[np.ndarray, np.ndarray]:
+        """weights() for a whole library at once, last_played 0 means never played."""
+        base = np.log1p(np.maximum(library.playtime, 0).astype(np.float64))
+        exponent = np.minimum((library.last_played - anchor) / self.tau, MAX_RECENCY_EXPONENT)
+        recent = np.where(library.last_played > 0, base * np.exp(exponent), 0.0)
+        return base, recent
+
+    def _reanchor(self, profile: Profile, anchor: float) -> None:
+        """Move the recency terms to a later anchor, old plays decay towards 0 instead of new ones growing."""
+        if anchor > profile.anchor:
+            profile.recent = profile.recent * exp(-(anchor - profile.anchor) / self.tau)
+            profile.anchor = anchor
+
+    def _vector(self, profile: Profile, now: float) -> np.ndarray:
+        n = self.features.n_features
+        decay = exp(min(-(now - profile.anchor) / self.tau, MAX_RECENCY_EXPONENT))
+        return _pad(profile.long_term, n) + self.recency_boost * decay * _pad(profile.recent, n)
+
+    # -------- keeping in sync --------
+
+    def sync(self, snapshot: CatalogSnapshot) -> None:
+        """
+        Build on first use / after a full snapshot reload, drop cached profiles
+        after a library store reload (each is rebuilt on its user's next
+        request), else patch the rows the snapshot changed since the last sync.
+        """
+        with self._lock:
+            version = snapshot.version
+            changed = None
+            if self.features.generation == snapshot.generation:
+                changed = snapshot.changed_since(self.features.version)
+            if changed is None:
+                self.features.build(snapshot)
+                self.profiles.clear()
+                self._library_generation = self.libraries.generation
+                return
+            if self._library_generation != self.libraries.generation:
+                self._library_generation = self.libraries.generation
+                self.profiles.clear()
+            self.features.version = version
+            if not len(changed):
+                return
+            appids = [int(a) for a in snapshot.appid[changed]]
+            fresh = _app_features(appids)
+            #the change log covers every worker's writes, not just the ones announced in this process
+            by_pos = {int(pos): fresh.get(appid, []) for pos, appid in zip(changed, appids)}
+            old_rows = self.features.row_vectors(by_pos)
+            self.features.replace_rows(by_pos)
+            new_rows = self.features.row_vectors(by_pos)
+            n = self.features.n_features
+            deltas = {}
+            for pos in by_pos:
+                delta = _pad(new_rows[pos], n) - _pad(old_rows[pos], n)
+                if delta.any():
+                    deltas[int(snapshot.appid[pos])] = delta
+            #most changed rows only moved their review counts, their features stay put
+            if not deltas or not self.profiles:
+                return
+            dirty = np.fromiter(deltas, dtype=np.int64, count=len(deltas))
+            for profile in self.profiles.values():
+                library = self.libraries.library(profile.user_id)
+                for i in np.flatnonzero(np.isin(library.appid, dirty)):
+                    delta = deltas[int(library.appid[i])]
+                    long_w, recent_w = self.weights((int(library.playtime[i]), int(library.last_played[i])), profile.anchor)
+                    profile.long_term = _pad(profile.long_term, n) + long_w * delta
+                    profile.recent = _pad(profile.recent, n) + recent_w * delta
+
+    def apply_library_changes(self, snapshot: Optional[CatalogSnapshot], user_id: int,
+                              changes: List[Tuple[int, Optional[Play], Optional[Play]]]) -> None:
+        """
+        Exact delta update of a cached profile, users we haven't cached are left
+        alone. The LibraryStore patches the library itself from the same signal.
+        """
+        with self._lock:
+            profile = self.profiles.get(user_id)
+            if profile is None or snapshot is None:
+                return
+            self._reanchor(profile, time.time())
+            n = self.features.n_features
+            positions = {appid: snapshot.row_of(appid) for appid, _, _ in changes}
+            rows = self.features.row_vectors(p for p in positions.values() if p is not None)
+            long_term = _pad(profile.long_term, n)
+            recent = _pad(profile.recent, n)
+            for appid, old, new in changes:
+                pos = positions.get(appid)
+                if pos is None:
+                    continue
+                old_l, old_r = self.weights(old, profile.anchor)
+                new_l, new_r = self.weights(new, profile.anchor)
+                long_term += (new_l - old_l) * rows[pos]
+                recent += (new_r - old_r) * rows[pos]
+            profile.long_term, profile.recent = long_term, recent
+
+    # -------- profiles --------
+
+    def _profile_from_library(self, snapshot: CatalogSnapshot, user_id: int) -> Profile:
+        profile = Profile(user_id, self.features.n_features, time.time())
+        library = self.libraries.library(user_id)
+        positions = snapshot.rows_of(library.appid)
+        known = positions >= 0
+        long_w = np.zeros(len(snapshot))
+        recent_w = np.zeros(len(snapshot))
+        owned_long, owned_recent = self.library_weights(library, profile.anchor)
+        long_w[positions[known]] = owned_long[known]
+        recent_w[positions[known]] = owned_recent[known]
+        profile.long_term = self.features.rmatvec(long_w)
+        profile.recent = self.features.rmatvec(recent_w)
+        return profile
+
+    def profile(self, snapshot: CatalogSnapshot, user_id: int) -> Profile:
+        """Cached profile, built from the user's LibraryStore arrays the first time they show up."""
+        return self.profiles_for(snapshot, [user_id])[user_id]
+
+    def profiles_for(self, snapshot: CatalogSnapshot, user_ids: List[int]) -> Dict[int, Profile]:
+        """Profiles for many users, the uncached (or dropped by sync) ones built from the LibraryStore."""
+        found: Dict[int, Profile] = {}
+        with self._lock:
+            for user_id in dict.fromkeys(user_ids):
+                profile = self.profiles.get(user_id)
+                if profile is not None:
+                    self.profiles.move_to_end(user_id)
+                else:
+                    profile = self.profiles[user_id] = self._profile_from_library(snapshot, user_id)
+                found[user_id] = profile
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+        return found
+
+    # -------- scoring --------
+
+    def affinity(self, snapshot: CatalogSnapshot, profile: Profile, now: Optional[float] = None) -> np.ndarray:
+        """Cosine-style similarity of every catalog row to the profile, 0 for an empty profile."""
+        now = now or time.time()
+        vector = self._vector(profile, now - now % 3600)
+        #decay moves in hourly steps so scores (and cursors) hold still between page requests
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return np.zeros(len(snapshot))
+        return self.features.matvec(vector / norm, len(snapshot))
+
+    def affinity_matrix(self, snapshot: CatalogSnapshot, profiles: List[Profile],
+                        now: Optional[float] = None) -> np.ndarray:
+        """affinity() for many profiles at once: one (rows x features) @ (features x users) product."""
+        now = now or time.time()
+        vectors = np.zeros((self.features.n_features, len(profiles)))
+        for j, profile in enumerate(profiles):
+            vector = self._vector(profile, now - now % 3600)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vectors[:, j] = vector / norm
+        return self.features.matmat(vectors, len(snapshot))
+
+    def blended(self, snapshot: CatalogSnapshot, affinity: np.ndarray) -> np.ndarray:
+        """
+        (1 - gem_weight) * affinity + gem_weight * gem score scaled to [0, 1].
+        affinity can be one vector or a rows x users matrix.
+        """
+        top = snapshot.score.max() if len(snapshot) else 0.0
+        gem = snapshot.score / top if top > 0 else snapshot.score
+        if affinity.ndim == 2:
+            gem = gem[:, None]
+        return (1.0 - self.gem_weight) * affinity + self.gem_weight * gem
+
+    def owned_mask(self, snapshot: CatalogSnapshot, profile: Profile) -> np.ndarray:
+        mask = np.zeros(len(snapshot), dtype=bool)
+        positions = snapshot.rows_of(self.libraries.library(profile.user_id).appid)
+        mask[positions[positions >= 0]] = True
+        return mask
+
+
+def get_personalizer() -> Tuple[Personalizer, CatalogSnapshot]:
+    """Per-app personalizer, synced with the (refreshed) catalog snapshot."""
+    snapshot = get_snapshot()
+    libraries = get_library_store()
+    ext = current_app.extensions
+    personalizer = ext.get("personalizer")
+    if personalizer is None:
+        config = current_app.config
+        personalizer = Personalizer(
+            libraries,
+            half_life_days=config.get("PERSONAL_HALF_LIFE_DAYS", 30.0),
+            recency_boost=config.get("PERSONAL_RECENCY_BOOST", 2.0),
+            gem_weight=config.get("PERSONAL_GEM_WEIGHT", 0.3),
+            max_profiles=config.get("PERSONAL_MAX_PROFILES", 10000),
+        )
+        ext["personalizer"] = personalizer
+    personalizer.sync(snapshot)
+    return personalizer, snapshot
+
+
+def recommend_for_user(user_id: int, limit: int, min_reviews: int,
+                       after: Optional[Tuple[float, int]] = None,
+                       mask: Optional[np.ndarray] = None) -> Tuple[List[Any], Dict[int, float]]:
+    """
+    Top unowned apps for a user ordered by blended score. Returns rows shaped
+    like ranking_engine rows (score is the blended score, for the cursor) and
+    appid -> affinity. `mask` narrows candidates (facet filters).
+    """
+    personalizer, snapshot = get_personalizer()
+    profile = personalizer.profile(snapshot, user_id)
+    affinity = personalizer.affinity(snapshot, profile)
+    scores = personalizer.blended(snapshot, affinity)
+    mask = snapshot.candidate_mask(min_reviews, after, scores, within=mask) & ~personalizer.owned_mask(snapshot, profile)
+    positions = snapshot.top_k(mask, limit, scores)
+    rows = snapshot.rows(positions, scores)
+    return rows, {int(snapshot.appid[p]): float(affinity[p]) for p in positions}
+
+
+# -------- write-path hooks --------
+
+@library_synced.connect
+@library_reloaded.connect
+def _on_library_synced(sender, user_id=None, changes=None, **extra):
+    personalizer = sender.extensions.get("personalizer")
+    if personalizer is not None and changes:
+        personalizer.apply_library_changes(sender.extensions.get("catalog_snapshot"), user_id, changes)
+
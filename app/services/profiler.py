@@ -0,0 +1,134 @@
+# app/services/profiler.py
+"""
+Opt-in sampling profiler for slow requests (PROFILER_ENABLED). While a request
+runs, one background thread grabs that request thread's stack every
+PROFILER_INTERVAL_MS via sys._current_frames(); the request itself does no
+extra work besides registering. A request slower than PROFILER_SLOW_MS gets
+its samples written to PROFILER_DIR in the collapsed "frame;frame;frame count"
+format that flamegraph.pl and speedscope read. A fast request is only dumped
+when sent with "X-Profile: <PROFILER_FORCE_TOKEN>", at most
+PROFILER_FORCED_PER_MINUTE times a minute, so anonymous clients can't fill the
+disk. Nothing is installed when disabled.
+"""
+from __future__ import annotations
+import hmac, logging, os, re, sys, threading, time
+from collections import Counter
+from typing import Dict, Optional
+from flask import Flask, Response, g, request
+from .metrics import METRICS, route_label
+from .rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _frame_name(frame, line: bool = False) -> str:
+    code = frame.f_code
+    where = os.path.basename(code.co_filename) + (f":{frame.f_lineno}" if line else "")
+    return f"{code.co_name} ({where})"
+
+
+def collapse(frame, max_depth: int = 128) -> str:
+    """Root-first 'a;b;c' for one stack, the leaf keeps its line number."""
+    names = [_frame_name(frame, line=True)]
+    frame = frame.f_back
+    while frame is not None and len(names) < max_depth:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    def __init__(self, slow_ms: float = 500, interval_ms: float = 5, out_dir: str = "./profiles",
+                 force_token: str = "", forced_per_minute: float = 6):
+        self.slow_seconds = slow_ms / 1000
+        self.interval = interval_ms / 1000
+        self.out_dir = out_dir
+        self.force_token = force_token
+        #empty = X-Profile is ignored
+        self._forced = TokenBucket(forced_per_minute / 60, forced_per_minute) if forced_per_minute > 0 else None
+        self._active: Dict[int, Counter] = {}
+        #thread id -> sampled stacks for the request running on it
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_forever(self) -> None:
+        while True:
+            self._wake.wait()
+            #parked while no request is in flight
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+                if not self._active:
+                    self._wake.clear()
+
+    def begin(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_forever, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._active[threading.get_ident()] = Counter()
+            self._wake.set()
+
+    def force_requested(self, header: Optional[str]) -> bool:
+        """True when the X-Profile header carries the configured token."""
+        return bool(self.force_token and header) and hmac.compare_digest(header.encode(), self.force_token.encode())
+
+    def end(self, label: str, elapsed: float, force: bool = False) -> Optional[str]:
+        """
+        Stop sampling this thread; write the samples if the request was slow, or
+        forced and within the forced-dump rate. Returns the file.
+        """
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks:
+            return None
+        if elapsed < self.slow_seconds and not (force and self._forced is not None and self._forced.try_acquire()):
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{_SLUG.sub('_', label).strip('_')}-{int(elapsed * 1000)}ms.folded"
+        path = os.path.join(self.out_dir, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        return path
+
+
+def init_profiler(app: Flask) -> None:
+    """Hook the profiler into every request, only when PROFILER_ENABLED."""
+    if not app.config.get("PROFILER_ENABLED", False):
+        return
+    profiler = SlowRequestProfiler(
+        slow_ms=app.config.get("PROFILER_SLOW_MS", 500),
+        interval_ms=app.config.get("PROFILER_INTERVAL_MS", 5),
+        out_dir=app.config.get("PROFILER_DIR", "./profiles"),
+        force_token=app.config.get("PROFILER_FORCE_TOKEN", ""),
+        forced_per_minute=app.config.get("PROFILER_FORCED_PER_MINUTE", 6),
+    )
+    app.extensions["profiler"] = profiler
+
+    @app.before_request
+    def _begin_profile():
+        g._profile_started = time.perf_counter()
+        profiler.begin()
+
+    @app.after_request
+    def _end_profile(response: Response) -> Response:
+        started = g.pop("_profile_started", None)
+        if started is None:
+            return response
+        route = route_label()
+        elapsed = time.perf_counter() - started
+        path = profiler.end(f"{request.method} {route}", elapsed,
+                            force=profiler.force_requested(request.headers.get("X-Profile")))
+        if path:
+            METRICS.profiled.inc(route)
+            log.warning("slow request %s %s took %.0fms, stack samples in %s", request.method, request.full_path,
+                        elapsed * 1000, path)
+        return response
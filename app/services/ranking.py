@@ -0,0 +1,80 @@
+# app/services/ranking.py
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import bindparam, func, select, tuple_, update
+from ..models.appdetails import db, App, gem_score
+from .search import apply_name_filter, relevance
+
+#columns the endpoint actually needs, no full ORM objects per row
+RANK_COLUMNS = (App.appid, App.name, App.positive, App.negative, App.recommendations_total, App.score)
+
+
+def parse_cursor(raw: Optional[str]) -> Optional[Tuple[float, int]]:
+    """
+    Cursor is "<score>:<appid>" of the last row on the previous page.
+    Returns None for a missing cursor, raises ValueError for a malformed one.
+    """
+    if not raw:
+        return None
+    score, _, appid = raw.partition(":")
+    return float(score), int(appid)
+
+
+def format_cursor(score: float, appid: int) -> str:
+    #repr round-trips floats exactly so the next page starts right after this row
+    return f"{score!r}:{appid}"
+
+
+def top_gems_sql(limit: int, min_reviews: int, name_query: Optional[str] = None,
+                 after: Optional[Tuple[float, int]] = None, match: str = "substring",
+                 relevance_weight: Optional[float] = None) -> List[Any]:
+    """
+    Filter, order and LIMIT in the database. Walks idx_apps_score from the top
+    (or from the cursor) so a page only reads about `limit` qualifying rows.
+    With a name query the FTS index picks the matching rows first. Passing
+    relevance_weight orders by score + weight * relevance instead (no cursor).
+    """
+    total = func.coalesce(App.positive, 0) + func.coalesce(App.negative, 0)
+    query = db.session.query(*RANK_COLUMNS).filter(total >= min_reviews)
+    indexed = False
+    if name_query:
+        query, indexed = apply_name_filter(query, db.engine, name_query, match)
+    if indexed and relevance_weight is not None:
+        blended = App.score + relevance_weight * relevance()
+        return query.order_by(blended.desc(), App.appid.desc()).limit(limit).all()
+    if after is not None:
+        query = query.filter(tuple_(App.score, App.appid) < tuple_(*after))
+    return query.order_by(App.score.desc(), App.appid.desc()).limit(limit).all()
+
+
+def serialize_row(row: Any) -> Dict[str, Any]:
+    """Shape a ranked row the way /api/recommendations has always returned it."""
+    positive = int(row.positive or 0)
+    total = positive + int(row.negative or 0)
+    popularity = row.recommendations_total if row.recommendations_total is not None else total
+    return {
+        "appid": row.appid,
+        "name": row.name,
+        "pos_ratio": round(positive / total, 4) if total else 0.0,
+        "total_reviews": total,
+        "owners_estimate": max(int(popularity or 0), 1),  # keep key name if you want to avoid breaking clients
+    }
+
+
+def refresh_scores(appids: Iterable[int]) -> int:
+    """
+    Recompute App.score for rows written with Core statements (bulk upserts
+    skip the ORM listeners). One SELECT + one executemany UPDATE per call.
+    Does not commit.
+    """
+    appids = list(appids)
+    if not appids:
+        return 0
+    rows = db.session.execute(
+        select(App.appid, App.positive, App.negative, App.recommendations_total).where(App.appid.in_(appids))
+    ).all()
+    params = [{"_appid": r.appid, "score": gem_score(r.positive, r.negative, r.recommendations_total)} for r in rows]
+    if params:
+        stmt = update(App.__table__).where(App.__table__.c.appid == bindparam("_appid")).values(score=bindparam("score"))
+        db.session.execute(stmt, params)
+    return len(params)
@@ -0,0 +1,362 @@
+# app/services/ranking_engine.py
+from __future__ import annotations
+import threading, time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from flask import current_app
+from sqlalchemy import or_, select
+from ..models.appdetails import db, App
+
+#columns pulled into the snapshot, order matters for _columns_from_rows
+_SNAPSHOT_COLUMNS = (
+    App.appid, App.positive, App.negative, App.recommendations_total,
+    App.metacritic_score, App.is_free, App.last_updated, App.last_fetched_ts,
+)
+
+
+def vector_scores(positive: np.ndarray, negative: np.ndarray, recommendations: np.ndarray) -> np.ndarray:
+    """
+    Vectorized gem_score. recommendations uses -1 for "unknown" so it can stay
+    an int array, same fallback to total reviews as App.popularity_proxy.
+    """
+    total = positive + negative
+    safe_total = np.maximum(total, 1)
+    ratio = np.where(total > 0, positive / safe_total, 0.0)
+    popularity = np.where(recommendations >= 0, recommendations, total)
+    popularity = np.maximum(popularity, 1)
+    return np.where(total > 0, ratio / (1.0 + np.log10(popularity)), 0.0)
+
+
+class SnapshotColumns:
+    """
+    One published version of the snapshot's arrays plus its appid -> row map.
+    Never modified once built: refreshes build a new one and swap a single
+    reference, so a reader that takes `snapshot.columns` once sees arrays of
+    one length from one moment, without holding the lock.
+    """
+    __slots__ = ("appid", "positive", "negative", "recommendations_total", "metacritic_score", "is_free",
+                 "updated", "total_reviews", "score", "row_of", "_lookup")
+
+    def __init__(self, appid, positive, negative, recommendations, metacritic, is_free, updated,
+                 row_of: Optional[Dict[int, int]] = None):
+        self.appid = appid
+        self.positive = positive
+        self.negative = negative
+        self.recommendations_total = recommendations
+        self.metacritic_score = metacritic
+        self.is_free = is_free
+        self.updated = updated
+        #last_updated as epoch seconds, a row can change without its numbers changing (genres etc)
+        self.total_reviews = positive + negative
+        self.score = vector_scores(positive, negative, recommendations)
+        for array in (appid, positive, negative, recommendations, metacritic, is_free, updated, self.total_reviews, self.score):
+            array.flags.writeable = False
+        self.row_of = row_of if row_of is not None else {int(a): i for i, a in enumerate(appid)}
+        self._lookup: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        #(positions sorted by appid, appids in that order) for rows_of, built on first use
+
+    def __len__(self) -> int:
+        return len(self.appid)
+
+    def sorted_lookup(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._lookup is None:
+            order = np.argsort(self.appid, kind="stable")
+            self._lookup = (order, self.appid[order])
+            #two readers racing here compute the same thing, either result is fine
+        return self._lookup
+
+
+class CatalogSnapshot:
+    """
+    Columnar copy of the apps table held as NumPy arrays, one row per app.
+    Between full loads rows never move (new apps are appended) so other indexes
+    can address them by position, `generation` tells them when that resets. Refreshes pull only rows whose last_updated or
+    last_fetched_ts moved past the previous watermark, minus an overlap window
+    so rows committed late with an older timestamp still get picked up.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0, full_reload_interval: float = 3600.0,
+                 watermark_overlap: float = 60.0):
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.watermark_overlap = watermark_overlap
+        self._lock = threading.Lock()
+        #serializes writers, readers go through the `columns` reference instead
+        self._updated_mark: Optional[datetime] = None
+        self._fetched_mark: Optional[int] = None
+        self._last_refresh = 0.0
+        self._last_full_load = 0.0
+        self.version = 0
+        #bumped on every change so dependents (facets etc) know to catch up
+        self.generation = 0
+        #bumped on full loads, row positions are only stable within one generation
+        self._changes: deque = deque(maxlen=256)
+        #(version, positions touched by that refresh) so dependents can patch just those rows
+        self.columns = SnapshotColumns(*_columns_from_rows([]))
+
+    #column shorthands, each reads the current reference: a call that needs several columns
+    #consistently (or one column more than once across a refresh) takes `columns` once instead
+    appid = property(lambda self: self.columns.appid)
+    positive = property(lambda self: self.columns.positive)
+    negative = property(lambda self: self.columns.negative)
+    recommendations_total = property(lambda self: self.columns.recommendations_total)
+    metacritic_score = property(lambda self: self.columns.metacritic_score)
+    is_free = property(lambda self: self.columns.is_free)
+    total_reviews = property(lambda self: self.columns.total_reviews)
+    score = property(lambda self: self.columns.score)
+
+    # -------- loading --------
+
+    def _advance_marks(self, rows: List[Tuple]) -> None:
+        for row in rows:
+            if row[6] is not None and (self._updated_mark is None or row[6] > self._updated_mark):
+                self._updated_mark = row[6]
+            if row[7] is not None and (self._fetched_mark is None or row[7] > self._fetched_mark):
+                self._fetched_mark = row[7]
+
+    def load(self) -> None:
+        """Full load, also used periodically to pick up deleted apps."""
+        rows = db.session.execute(select(*_SNAPSHOT_COLUMNS).order_by(App.appid)).all()
+        columns = SnapshotColumns(*_columns_from_rows(rows))
+        with self._lock:
+            self._updated_mark = self._fetched_mark = None
+            self._advance_marks(rows)
+            self.columns = columns
+            self._last_refresh = self._last_full_load = time.monotonic()
+            self.version += 1
+            self.generation += 1
+            self._changes.clear()
+
+    def refresh(self) -> int:
+        """
+        Pull rows changed since the last watermark (minus the overlap window)
+        and publish a patched copy of the columns. Returns how many rows changed.
+        """
+        if not self._last_full_load:
+            self.load()
+            return len(self.columns)
+        conditions = []
+        if self._updated_mark is not None:
+            conditions.append(App.last_updated >= self._updated_mark - timedelta(seconds=self.watermark_overlap))
+        if self._fetched_mark is not None:
+            conditions.append(App.last_fetched_ts >= self._fetched_mark - int(self.watermark_overlap))
+        query = select(*_SNAPSHOT_COLUMNS)
+        if conditions:
+            query = query.where(or_(*conditions))
+        #the overlap re-reads recent rows every time, rows whose values and last_updated didn't change are dropped below
+        rows = db.session.execute(query).all()
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            if not rows:
+                return 0
+            self._advance_marks(rows)
+            current = self.columns
+            fresh_cols = _columns_from_rows(rows)
+            positions = np.array([current.row_of.get(int(a), -1) for a in fresh_cols[0]], dtype=np.int64)
+            known = positions >= 0
+            old = (current.positive, current.negative, current.recommendations_total,
+                   current.metacritic_score, current.is_free, current.updated)
+            changed = ~known
+            if known.any():
+                at = np.where(known, positions, 0)
+                for before, after in zip(old, fresh_cols[1:]):
+                    changed |= known & (before[at] != after)
+            if not changed.any():
+                return 0
+            patch = changed & known
+            merged = []
+            for before, after in zip(old, fresh_cols[1:]):
+                column = before.copy()
+                column[positions[patch]] = after[patch]
+                merged.append(column)
+            row_of = current.row_of
+            appid = current.appid
+            fresh = ~known
+            if fresh.any():
+                start = len(appid)
+                appid = np.concatenate((appid, fresh_cols[0][fresh]))
+                merged = [np.concatenate((column, after[fresh])) for column, after in zip(merged, fresh_cols[1:])]
+                row_of = dict(row_of)
+                #a new dict, readers of the old columns keep a map that matches their arrays
+                for offset, a in enumerate(fresh_cols[0][fresh]):
+                    row_of[int(a)] = start + offset
+                positions[fresh] = np.arange(start, start + int(fresh.sum()))
+            else:
+                appid = appid.copy()
+            self.columns = SnapshotColumns(appid, *merged, row_of=row_of)
+            self.version += 1
+            self._changes.append((self.version, positions[changed]))
+            return int(changed.sum())
+
+    def maybe_refresh(self) -> None:
+        """Cheap per-request hook, only touches the DB every refresh_interval seconds."""
+        now = time.monotonic()
+        if not self._last_full_load or now - self._last_full_load >= self.full_reload_interval:
+            self.load()
+        elif now - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def expire(self) -> None:
+        """Make the next maybe_refresh hit the DB, e.g. when a write elsewhere was announced."""
+        self._last_refresh = 0.0
+
+    def changed_since(self, version: int) -> Optional[np.ndarray]:
+        """
+        Row positions patched or appended after `version` within the current
+        generation, None when the change log doesn't reach back that far.
+        """
+        with self._lock:
+            if version >= self.version:
+                return np.zeros(0, dtype=np.int64)
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+            return np.unique(np.concatenate([p for v, p in self._changes if v > version]))
+
+    def row_of(self, appid: int) -> Optional[int]:
+        return self.columns.row_of.get(int(appid))
+
+    def rows_of(self, appids: np.ndarray) -> np.ndarray:
+        """Vectorized row_of, -1 for appids the snapshot doesn't have."""
+        order, ordered = self.columns.sorted_lookup()
+        appids = np.asarray(appids, dtype=np.int64)
+        if not len(ordered):
+            return np.full(len(appids), -1, dtype=np.int64)
+        at = np.minimum(np.searchsorted(ordered, appids), len(ordered) - 1)
+        return np.where(ordered[at] == appids, order[at], -1)
+
+    def mask_of(self, appids: Iterable[int]) -> np.ndarray:
+        """Row mask with just these apps set (unknown appids are ignored)."""
+        columns = self.columns
+        mask = np.zeros(len(columns), dtype=bool)
+        positions = [columns.row_of.get(int(a)) for a in appids]
+        mask[[p for p in positions if p is not None]] = True
+        return mask
+
+    def __len__(self) -> int:
+        return len(self.appid)
+
+    # -------- ranking --------
+
+    def candidate_mask(self, min_reviews: int, after: Optional[Tuple[float, int]] = None,
+                       scores: Optional[np.ndarray] = None, within: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Rows with enough reviews, and past the cursor when given (on `scores`,
+        default gem score). `within` is an extra row mask (facets etc), rows
+        appended after it was computed count as outside it. So do rows past the
+        end of `scores` when a refresh appended some after they were computed.
+        """
+        columns = self.columns
+        scores = columns.score if scores is None else scores
+        n = min(len(scores), len(columns))
+        mask = np.zeros(len(columns), dtype=bool)
+        mask[:n] = columns.total_reviews[:n] >= min_reviews
+        if after is not None:
+            after_score, after_appid = after
+            mask[:n] &= (scores[:n] < after_score) | ((scores[:n] == after_score) & (columns.appid[:n] < after_appid))
+        if within is not None:
+            n = min(len(within), len(mask))
+            mask[:n] &= within[:n]
+            mask[n:] = False
+        return mask
+
+    def top_k(self, mask: np.ndarray, k: int, scores: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row positions of the k best rows under mask, ordered score desc then
+        appid desc (same order as the SQL path). argpartition keeps it O(n).
+        """
+        columns = self.columns
+        scores = columns.score if scores is None else scores
+        candidates = np.flatnonzero(mask[:min(len(scores), len(columns))])
+        if k <= 0 or not len(candidates):
+            return candidates[:0]
+        if len(candidates) > k:
+            #partition on the negated score to find the k-th best score
+            values = scores[candidates]
+            kth = values[np.argpartition(-values, k - 1)[k - 1]]
+            candidates = candidates[values >= kth]
+            #>= kth keeps every tie at the boundary, the lexsort then decides which survive (like the SQL ORDER BY)
+        order = np.lexsort((-columns.appid[candidates], -scores[candidates]))
+        return candidates[order][:k]
+
+    def names(self, positions: Iterable[int]) -> Dict[int, Optional[str]]:
+        """appid -> name for these rows, names aren't kept in the snapshot."""
+        appid = self.appid
+        appids = sorted({int(appid[p]) for p in positions})
+        names: Dict[int, Optional[str]] = {}
+        for start in range(0, len(appids), 500):
+            chunk = appids[start:start + 500]
+            names.update(db.session.execute(select(App.appid, App.name).where(App.appid.in_(chunk))).all())
+        return names
+
+    def rows(self, positions: np.ndarray, scores: Optional[np.ndarray] = None,
+             names: Optional[Dict[int, Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Materialize ranked positions into the same shape top_gems_sql returns.
+        Pass `names` (see names()) to share one lookup across many rankings.
+        """
+        columns = self.columns
+        scores = columns.score if scores is None else scores
+        appids = [int(a) for a in columns.appid[positions]]
+        if names is None:
+            names = self.names(positions)
+        out = []
+        for pos, appid in zip(positions, appids):
+            rec = int(columns.recommendations_total[pos])
+            out.append(_Row(
+                appid=appid,
+                name=names.get(appid),
+                positive=int(columns.positive[pos]),
+                negative=int(columns.negative[pos]),
+                recommendations_total=rec if rec >= 0 else None,
+                score=float(scores[pos]),
+            ))
+        return out
+
+
+class _Row:
+    """Attribute access like a SQLAlchemy Row so serialize_row works on both paths."""
+    __slots__ = ("appid", "name", "positive", "negative", "recommendations_total", "score")
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+
+def _columns_from_rows(rows: List[Tuple]) -> Tuple[np.ndarray, ...]:
+    n = len(rows)
+    appid = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    positive = np.fromiter((r[1] or 0 for r in rows), dtype=np.int64, count=n)
+    negative = np.fromiter((r[2] or 0 for r in rows), dtype=np.int64, count=n)
+    recommendations = np.fromiter((-1 if r[3] is None else r[3] for r in rows), dtype=np.int64, count=n)
+    metacritic = np.fromiter((-1 if r[4] is None else r[4] for r in rows), dtype=np.int64, count=n)
+    is_free = np.fromiter((bool(r[5]) for r in rows), dtype=bool, count=n)
+    updated = np.fromiter((r[6].timestamp() if r[6] is not None else 0.0 for r in rows), dtype=np.float64, count=n)
+    return appid, positive, negative, recommendations, metacritic, is_free, updated
+
+
+def get_snapshot() -> CatalogSnapshot:
+    """One snapshot per Flask app (so per worker process), refreshed lazily."""
+    ext = current_app.extensions
+    snapshot = ext.get("catalog_snapshot")
+    if snapshot is None:
+        snapshot = CatalogSnapshot(
+            refresh_interval=current_app.config.get("RANKING_REFRESH_SECONDS", 5),
+            full_reload_interval=current_app.config.get("RANKING_FULL_RELOAD_SECONDS", 3600),
+            watermark_overlap=current_app.config.get("RANKING_WATERMARK_OVERLAP_SECONDS", 60),
+        )
+        ext["catalog_snapshot"] = snapshot
+    snapshot.maybe_refresh()
+    return snapshot
+
+
+def top_gems_memory(limit: int, min_reviews: int, after: Optional[Tuple[float, int]] = None,
+                    mask: Optional[np.ndarray] = None, snapshot: Optional[CatalogSnapshot] = None) -> List[Any]:
+    """
+    In-memory counterpart of ranking.top_gems_sql (no name filter). `mask`
+    narrows the candidates further, e.g. facet filters (services/facets.py).
+    """
+    snapshot = snapshot or get_snapshot()
+    positions = snapshot.top_k(snapshot.candidate_mask(min_reviews, after, within=mask), limit)
+    return snapshot.rows(positions)
@@ -0,0 +1,78 @@
+# app/services/readiness.py
+"""
+Ranking data preload behind GET /api/ready. The warmup loads the catalog
+snapshot, the facet bitmaps, the library store and the personalization
+feature matrix on a background thread. /api/ready answers 503 until that has
+finished, while /api/health only says the process is up. The warmup is keyed on the pid, so
+a worker forked from a preloaded master starts its own on the first probe
+instead of trusting a thread that didn't survive the fork.
+"""
+from __future__ import annotations
+import logging, os, threading, time
+from typing import Any, Dict, Optional
+from .metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+
+class Warmup:
+    def __init__(self, app):
+        self.app = app
+        self.pid: Optional[int] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self.timings_ms: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Begin warming in this process unless it's running or done (a failed warmup is retried)."""
+        with self._lock:
+            pid = os.getpid()
+            if self.pid == pid and (self.ready or (self._thread is not None and self._thread.is_alive())):
+                return
+            self.pid, self.ready, self.error, self.timings_ms = pid, False, None, {}
+            self._thread = threading.Thread(target=self._run, name="ranking-warmup", daemon=True)
+            self._thread.start()
+
+    def _step(self, name: str, load) -> None:
+        started = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - started
+        self.timings_ms[name] = round(elapsed * 1000, 1)
+        METRICS.warmup_seconds.set(elapsed, name)
+
+    def _run(self) -> None:
+        from .facets import get_facet_index
+        from .library_store import get_library_store
+        from .personalize import get_personalizer
+        from .ranking_engine import get_snapshot
+        from .schema import missing_tables
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                missing = missing_tables()
+                if missing:
+                    raise RuntimeError(f"schema missing {', '.join(missing)}, run scripts/init_db.py")
+                self._step("snapshot", get_snapshot)
+                self._step("facets", get_facet_index)
+                self._step("libraries", get_library_store)
+                self._step("personalizer", get_personalizer)
+        except Exception as e:
+            self.error = str(e)
+            log.exception("ranking warmup failed")
+            return
+        self.timings_ms["total"] = round((time.perf_counter() - started) * 1000, 1)
+        METRICS.warmup_seconds.set(self.timings_ms["total"] / 1000, "total")
+        self.ready = True
+        log.info("ranking data warm in %.0fms: %s", self.timings_ms["total"], self.timings_ms)
+
+    def status(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "error": self.error, "warmup_ms": dict(self.timings_ms)}
+
+
+def get_warmup(app) -> Warmup:
+    warmup = app.extensions.get("warmup")
+    if warmup is None:
+        warmup = app.extensions["warmup"] = Warmup(app)
+    return warmup
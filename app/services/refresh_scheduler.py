@@ -0,0 +1,158 @@
+# app/services/refresh_scheduler.py
+"""
+Keeps already-fetched apps fresh within an API budget. Every cycle ranks stale
+apps by staleness weighted by popularity (recommendations_total, review count
+and how many users own it), refreshes the top of that priority queue within
+REFRESH_REQUESTS_PER_MINUTE and pushes apps whose storefront data came back
+unchanged further out (doubling per unchanged refresh, capped). Failed
+refetches are deferred the same way on their own streak.
+"""
+from __future__ import annotations
+import hashlib, heapq, json, logging, time
+from math import log10
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, func, select, update
+from ..models.appdetails import db, App, OwnedGame
+from ..models.jobs import AppRefreshState
+from .app_metadata import ingest_app_metadata
+from .bulk import upsert
+from .rate_limit import TokenBucket
+from .seed_pipeline import fetch_many
+from .steam_client import SteamClient
+
+log = logging.getLogger(__name__)
+
+REQUESTS_PER_REFRESH = 2
+#appdetails + appreviews for each app
+
+#fields that count as "changed" when they differ from the last stored payload
+_HASHED_FIELDS = ("name", "type", "is_free", "metacritic_score", "recommendations_total", "positive", "negative")
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    payload = {k: row.get(k) for k in _HASHED_FIELDS}
+    payload["genres"] = sorted(set(row.get("genres") or []))
+    payload["categories"] = sorted(set(row.get("categories") or []))
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def priority(now: int, last_fetched_ts: int, recommendations: Optional[int], reviews: int, owners: int,
+             owner_weight: float = 10.0) -> float:
+    """Hours stale scaled by log popularity, so a stale hit outranks an equally stale unknown."""
+    popularity = (recommendations or 0) + reviews + owner_weight * owners
+    return max(now - last_fetched_ts, 0) / 3600.0 * (1.0 + log10(1.0 + popularity))
+
+
+def stalest_valuable(limit: int, min_age: int, now: Optional[int] = None, owner_weight: float = 10.0) -> List[int]:
+    """
+    Top `limit` appids by priority among fetched apps older than min_age that
+    aren't deferred. Rows stream through a bounded heap, nothing is sorted in full.
+    """
+    now = now or int(time.time())
+    owners = (
+        select(OwnedGame.appid, func.count().label("owners"))
+        .group_by(OwnedGame.appid)
+        .subquery()
+    )
+    state = AppRefreshState.__table__
+    query = (
+        select(
+            App.appid, App.last_fetched_ts, App.recommendations_total,
+            func.coalesce(App.positive, 0) + func.coalesce(App.negative, 0),
+            func.coalesce(owners.c.owners, 0),
+        )
+        .outerjoin(owners, owners.c.appid == App.appid)
+        .outerjoin(state, state.c.appid == App.appid)
+        .where(App.last_fetched_ts.is_not(None), App.last_fetched_ts <= now - min_age)
+        .where(func.coalesce(state.c.defer_until, 0) <= now)
+    )
+    rows = db.session.execute(query.execution_options(yield_per=5000))
+    best = heapq.nlargest(limit, rows, key=lambda r: priority(now, r[1], r[2], r[3], r[4], owner_weight))
+    return [r[0] for r in best]
+
+
+def _known_hashes(appids: List[int]) -> Dict[int, Tuple[Optional[str], int, int]]:
+    state = AppRefreshState.__table__
+    rows = db.session.execute(
+        select(state.c.appid, state.c.content_hash, state.c.unchanged_streak, state.c.failure_streak)
+        .where(state.c.appid.in_(appids))
+    )
+    return {a: (h, streak, failures or 0) for a, h, streak, failures in rows}
+
+
+def refresh_apps(appids: List[int], client: SteamClient, workers: int = 4, min_age: int = 86400,
+                 max_defer: int = 30 * 86400) -> Dict[str, int]:
+    """
+    Refetch `appids`. Changed apps are ingested, unchanged ones only get
+    last_fetched_ts bumped and are deferred for min_age * 2**streak seconds.
+    Failures (errors, payloads without a name) are deferred the same way on
+    their failure streak, the stored hash and unchanged streak stay as they were.
+    """
+    known = _known_hashes(appids)
+    now = int(time.time())
+    changed: List[Dict[str, Any]] = []
+    unchanged: List[int] = []
+    states: List[Dict[str, Any]] = []
+    failed = 0
+    for appid, row, error in fetch_many(client, appids, workers):
+        old_hash, streak, failures = known.get(appid, (None, 0, 0))
+        if error is not None or not row.get("name"):
+            failed += 1
+            failures += 1
+            states.append({"appid": appid, "failure_streak": failures,
+                           "defer_until": now + min(max_defer, min_age * 2 ** failures)})
+            continue
+        digest = content_hash(row)
+        if digest == old_hash:
+            streak += 1
+            unchanged.append(appid)
+            states.append({"appid": appid, "content_hash": digest, "unchanged_streak": streak, "failure_streak": 0,
+                           "defer_until": now + min(max_defer, min_age * 2 ** streak)})
+        else:
+            changed.append(row)
+            states.append({"appid": appid, "content_hash": digest, "unchanged_streak": 0, "failure_streak": 0,
+                           "defer_until": 0})
+    if changed:
+        ingest_app_metadata(changed)
+    if unchanged:
+        db.session.execute(
+            update(App.__table__).where(App.__table__.c.appid == bindparam("_appid")).values(last_fetched_ts=now),
+            [{"_appid": a} for a in unchanged],
+        )
+    if states:
+        upsert(AppRefreshState.__table__, states, key=["appid"])
+    db.session.commit()
+    return {"changed": len(changed), "unchanged": len(unchanged), "failed": failed}
+
+
+def run_scheduler(app, once: bool = False, cycle_seconds: float = 60.0) -> Dict[str, int]:
+    """
+    Each cycle spends at most one minute of REFRESH_REQUESTS_PER_MINUTE on the
+    highest priority stale apps. The client's token bucket enforces the same
+    budget so bursts inside a cycle can't exceed it either.
+    """
+    config = app.config
+    rpm = config.get("REFRESH_REQUESTS_PER_MINUTE", 30)
+    per_cycle = max(1, int(rpm * cycle_seconds / 60.0) // REQUESTS_PER_REFRESH)
+    totals: Dict[str, int] = {"changed": 0, "unchanged": 0, "failed": 0}
+    with app.app_context():
+        client = SteamClient.from_config(config, limiter=TokenBucket(rpm / 60.0, capacity=min(rpm, 10)))
+        while True:
+            started = time.monotonic()
+            appids = stalest_valuable(
+                per_cycle, config.get("REFRESH_MIN_AGE_SECONDS", 86400),
+                owner_weight=config.get("REFRESH_OWNER_WEIGHT", 10.0),
+            )
+            if appids:
+                counts = refresh_apps(
+                    appids, client,
+                    workers=config.get("REFRESH_WORKERS", 4),
+                    min_age=config.get("REFRESH_MIN_AGE_SECONDS", 86400),
+                    max_defer=config.get("REFRESH_MAX_DEFER_SECONDS", 30 * 86400),
+                )
+                for key, n in counts.items():
+                    totals[key] += n
+                log.info("refresh cycle: %s", counts)
+            if once:
+                return totals
+            time.sleep(max(0.0, cycle_seconds - (time.monotonic() - started)))
@@ -0,0 +1,187 @@
+# app/services/response_cache.py
+"""
+Cache of rendered API responses (used on /api/recommendations). Entries are
+keyed on the endpoint path plus its sorted query string and tagged with a
+catalog version counter that lives in the same SQLite file as the entries, so
+every worker on the host shares both. Write paths bump the counter through
+catalog_updated / library_synced (and leaderboard swaps), which orphans every older entry at once
+without deleting anything. A per-process LRU sits in front of the file.
+ETags come from the body, a matching If-None-Match gets a bodiless 304.
+"""
+from __future__ import annotations
+import hashlib, threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+from flask import Response, current_app, request
+from .cache import LRUCache, Stamped
+from .disk_cache import DiskCache
+from ..signals import catalog_updated, leaderboards_swapped, library_synced
+
+VERSION_COUNTER = "catalog"
+
+#response headers worth replaying from a cached entry
+_REPLAYED_HEADERS = ("X-Next-Cursor",)
+
+
+class ResponseCache:
+    """Versioned two-tier (RAM, shared file) store of rendered responses."""
+
+    def __init__(self, store: DiskCache, memory: LRUCache):
+        self.store = store
+        self.memory = memory
+        self._seen_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.requests = self.computed = self.not_modified = 0
+
+    @classmethod
+    def from_config(cls, config) -> "ResponseCache":
+        ttl = config.get("RESPONSE_CACHE_TTL_SECONDS", 300)
+        return cls(
+            DiskCache(config["RESPONSE_CACHE_PATH"], ttl=ttl, max_bytes=config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            LRUCache(ttl=ttl, max_entries=config.get("RESPONSE_CACHE_MEMORY_ENTRIES", 1024)),
+        )
+
+    def version(self) -> int:
+        return self.store.counter(VERSION_COUNTER)
+
+    def bump(self) -> int:
+        return self.store.incr(VERSION_COUNTER)
+
+    def observe(self, version: int) -> bool:
+        """True the first time this process sees `version` (some write happened since the last request)."""
+        with self._lock:
+            changed = self._seen_version is not None and version != self._seen_version
+            self._seen_version = version
+            return changed
+
+    def lookup(self, key: str, render: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Entry for key from RAM, then the shared file, else render() once (single-flight) and store it."""
+        def load():
+            entry = self.store.get(key)
+            if entry is not None:
+                stored_at, data = entry
+                return Stamped(data, stored_at)
+            data = render()
+            self.store.put(key, data)
+            with self._lock:
+                self.computed += 1
+            return data
+        with self._lock:
+            self.requests += 1
+        return self.memory.get_or_load(key, load)
+
+    def count_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, computed, not_modified = self.requests, self.computed, self.not_modified
+        return {
+            "version": self.version(),
+            "requests": requests,
+            "computed": computed,
+            "not_modified": not_modified,
+            "hit_rate": round(1 - computed / requests, 4) if requests else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.store.stats(),
+        }
+
+
+def get_response_cache(app=None) -> Optional[ResponseCache]:
+    """One per Flask app (so per worker process), None when RESPONSE_CACHE_PATH is empty."""
+    app = app or current_app
+    ext = app.extensions
+    if "response_cache" not in ext:
+        ext["response_cache"] = ResponseCache.from_config(app.config) if app.config.get("RESPONSE_CACHE_PATH") else None
+    return ext["response_cache"]
+
+
+def _request_key(version: int) -> str:
+    #same params in any order (repeats included) share an entry
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f"v{version}:{request.path}?{query}"
+
+
+def _render(view: Callable[..., Any], args, kwargs) -> Dict[str, Any]:
+    response = current_app.make_response(view(*args, **kwargs))
+    if response.status_code >= 500:
+        raise _Uncacheable(response)
+    body = response.get_data(as_text=True)
+    return {
+        "status": response.status_code,
+        "mimetype": response.mimetype,
+        "body": body,
+        "etag": hashlib.sha1(body.encode("utf-8")).hexdigest()[:20],
+        "headers": {h: response.headers[h] for h in _REPLAYED_HEADERS if h in response.headers},
+    }
+
+
+def cached_response(view: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Serve a GET view from the response cache. Responses under 500 are cached
+    (a 400 for a bad cursor is as deterministic as a 200), anything else runs
+    the view every time.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if cache is None:
+            return view(*args, **kwargs)
+        version = cache.version()
+        #read before rendering: a write landing mid-render bumps past this entry instead of hiding in it
+        if cache.observe(version):
+            snapshot = current_app.extensions.get("catalog_snapshot")
+            if snapshot is not None:
+                snapshot.expire()
+                #don't render the new version from a snapshot that predates the write
+            libraries = current_app.extensions.get("library_store")
+            if libraries is not None:
+                libraries.refresh_changed()
+                #same for libraries another process synced, or ?user_id= pages would still show owned games
+        try:
+            entry = cache.lookup(_request_key(version), lambda: _render(view, args, kwargs))
+        except _Uncacheable as e:
+            return e.response
+        etag = entry["etag"]
+        if entry["status"] == 200 and request.if_none_match.contains(etag):
+            cache.count_not_modified()
+            response = Response(status=304)
+        else:
+            response = Response(entry["body"], status=entry["status"], mimetype=entry["mimetype"])
+            for name, value in entry["headers"].items():
+                response.headers[name] = value
+        response.set_etag(etag)
+        response.headers["X-Catalog-Version"] = str(version)
+        return response
+    return wrapper
+
+
+class _Uncacheable(Exception):
+    def __init__(self, response: Response):
+        super().__init__(response.status)
+        self.response = response
+
+
+# -------- write-path hooks --------
+
+def _bump(sender) -> None:
+    cache = get_response_cache(sender)
+    if cache is not None:
+        cache.bump()
+
+
+@catalog_updated.connect
+def _on_catalog_updated(sender, **extra):
+    _bump(sender)
+
+
+@library_synced.connect
+def _on_library_synced(sender, **extra):
+    _bump(sender)
+
+
+@leaderboards_swapped.connect
+def _on_leaderboards_swapped(sender, **extra):
+    _bump(sender)
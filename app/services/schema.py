@@ -0,0 +1,29 @@
+# app/services/schema.py
+"""
+Schema creation, kept off the boot path. scripts/init_db.py runs it once per
+deploy; create_app only calls it when SCHEMA_AUTO_CREATE is on (dev).
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+from sqlalchemy import inspect
+from ..extensions import db
+from .search import ensure_search_index
+
+
+def load_models() -> None:
+    #every table has to be on db.metadata before create_all / the presence check
+    from ..models import appdetails, jobs, leaderboards, similarity  # noqa: F401
+
+
+def init_schema() -> Dict[str, Any]:
+    """Create missing tables plus the FTS index and its triggers. Safe to rerun."""
+    load_models()
+    db.create_all(bind_key=None)
+    #primary only, the "read" bind (services/engine_profile.py) is read-only and has no tables of its own
+    return {"tables": len(db.metadata.tables), "search_index": ensure_search_index(db.engine)}
+
+
+def missing_tables() -> List[str]:
+    load_models()
+    present = set(inspect(db.engine).get_table_names())
+    return sorted(name for name in db.metadata.tables if name not in present)
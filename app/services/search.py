@@ -0,0 +1,126 @@
+# app/services/search.py
+"""
+Name search for the ?q= parameter. On SQLite the apps table gets an external
+content FTS5 table using the trigram tokenizer, so any substring of 3+ chars
+(prefixes included) is an index lookup instead of lower()-ing every name.
+Triggers keep it in sync with apps.name on insert/update/delete, including rows
+written with raw INSERT ... ON CONFLICT. Other backends fall back to ILIKE.
+"""
+from __future__ import annotations
+import logging
+from typing import Any, List, Tuple
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, literal_column, text
+from sqlalchemy.engine import Engine
+from ..models.appdetails import db, App
+
+log = logging.getLogger(__name__)
+
+FTS_TABLE = "apps_fts"
+MIN_TRIGRAM = 3
+#trigram can't index anything shorter, those queries fall back to LIKE
+
+#own MetaData so db.create_all never tries to create the virtual table itself
+apps_fts = Table(FTS_TABLE, MetaData(), Column("rowid", Integer), Column("name", String))
+
+_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, content='apps', content_rowid='appid', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON apps BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.appid, new.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON apps BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.appid, old.name);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON apps BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.appid, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.appid, new.name);
+    END""",
+)
+
+_available: dict = {}
+#engine url -> bool, checked once per process
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """
+    Create the FTS table + triggers if missing and backfill it from apps.
+    Safe to call on every boot, only rebuilds when the table is new.
+    Returns whether indexed search is usable on this engine.
+    """
+    if engine.dialect.name != "sqlite":
+        _available[str(engine.url)] = False
+        return False
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": FTS_TABLE}
+            ).first() is not None
+            for statement in _DDL:
+                conn.exec_driver_sql(statement)
+            if not existed:
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    except Exception as e:
+        #old SQLite builds without fts5/trigram, keep serving with LIKE
+        log.warning("name search index unavailable, falling back to LIKE: %s", e)
+        _available[str(engine.url)] = False
+        return False
+    _available[str(engine.url)] = True
+    return True
+
+
+def search_index_available(engine: Engine) -> bool:
+    key = str(engine.url)
+    if key not in _available:
+        #boot skipped ensure_search_index (schema is created by scripts/init_db.py), look once
+        _available[key] = engine.dialect.name == "sqlite" and _index_exists(engine)
+    return _available[key]
+
+
+def _index_exists(engine: Engine) -> bool:
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": FTS_TABLE}
+            ).first() is not None
+    except Exception:
+        return False
+
+
+def fts_phrase(q: str) -> str:
+    #quote as a single phrase so user input can't inject FTS operators
+    return '"' + q.replace('"', '""') + '"'
+
+
+def apply_name_filter(query, engine: Engine, q: str, match: str = "substring") -> Tuple[Any, bool]:
+    """
+    Restrict a query over apps to names containing q (match="substring") or
+    starting with q (match="prefix"). Uses the FTS index when it can.
+    Returns (query, used_index), relevance() only works when used_index is True.
+    """
+    q = q.strip()
+    if not q:
+        return query, False
+    if search_index_available(engine) and len(q) >= MIN_TRIGRAM:
+        query = query.join(apps_fts, apps_fts.c.rowid == App.appid).filter(
+            text(f"{FTS_TABLE} MATCH :fts_q").bindparams(fts_q=fts_phrase(q))
+        )
+        if match == "prefix":
+            #FTS narrowed it to substring hits, LIKE on those few rows pins it to the start
+            query = query.filter(App.name.ilike(f"{q}%"))
+        return query, True
+    pattern = f"{q}%" if match == "prefix" else f"%{q}%"
+    return query.filter(App.name.ilike(pattern)), False
+
+
+def matching_appids(q: str, match: str = "substring") -> List[int]:
+    """Appids whose name matches q, for callers that filter in memory."""
+    query, _ = apply_name_filter(db.session.query(App.appid), db.engine, q, match)
+    return [a for (a,) in query]
+
+
+def relevance():
+    """
+    Higher is better. bm25() is negative with better matches lower, so flip it.
+    Only valid on a query that went through apply_name_filter's FTS join.
+    """
+    return -func.bm25(literal_column(FTS_TABLE))
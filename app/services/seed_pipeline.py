@@ -0,0 +1,112 @@
+# app/services/seed_pipeline.py
+from __future__ import annotations
+import logging, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..models.appdetails import db, App
+from .app_metadata import _parse_app_payload, ingest_app_metadata
+from .steam_client import SteamClient
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SeedReport:
+    requested: int = 0
+    seeded: int = 0
+    chunks_written: int = 0
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requested": self.requested,
+            "seeded": self.seeded,
+            "chunks_written": self.chunks_written,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+        }
+
+
+def fetch_seed_row(client: SteamClient, appid: int) -> Dict[str, Any]:
+    """
+    Both steam calls for one app, shaped for ingest_app_metadata. Raises on HTTP
+    errors (after the client's own retries) so the caller can record the failure.
+    """
+    details = _parse_app_payload(client.app_details(appid), appid) or {}
+    summary = client.app_reviews_summary(appid).get("query_summary", {}) or {}
+    row = dict(details)
+    row.update({
+        "appid": appid,
+        "positive": int(summary.get("total_positive", 0) or 0),
+        "negative": int(summary.get("total_negative", 0) or 0),
+        "last_fetched_ts": int(time.time()),
+    })
+    return row
+
+
+def fetch_many(client: SteamClient, appids: Iterable[int],
+               workers: int = 8) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    fetch_seed_row for many appids on a bounded thread pool, yielding
+    (appid, row, None) or (appid, None, error) as each one finishes.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch_seed_row, client, appid): appid for appid in appids}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def _write_chunk(rows: List[Dict[str, Any]]) -> None:
+    #brand new apps without a storefront name still need one, existing names are left alone
+    nameless = [r["appid"] for r in rows if "name" not in r]
+    if nameless:
+        known = {a for (a,) in db.session.query(App.appid).filter(App.appid.in_(nameless))}
+        for row in rows:
+            if "name" not in row and row["appid"] not in known:
+                row["name"] = f"App {row['appid']}"
+    ingest_app_metadata(rows, chunk_size=len(rows))
+
+
+def seed_apps(appids: Iterable[Any], client: SteamClient, workers: int = 8, chunk_size: int = 200) -> SeedReport:
+    """
+    Fetch details + review summaries for many appids with bounded concurrency
+    (the client's token bucket keeps the total rate under steam's limits) and
+    write them through ingest_app_metadata, one bulk upsert per chunk. A failing
+    appid is recorded in the report and skipped, the rest of the seed keeps going.
+    """
+    started = time.monotonic()
+    report = SeedReport()
+    ids: List[int] = []
+    for raw in appids:
+        try:
+            ids.append(int(raw))
+        except (TypeError, ValueError):
+            report.failed.append({"appid": raw, "error": "not an integer appid"})
+    ids = list(dict.fromkeys(ids))
+    #dedupe but keep order
+    report.requested = len(ids) + len(report.failed)
+
+    pending: List[Dict[str, Any]] = []
+    for appid, row, error in fetch_many(client, ids, workers):
+        if error is not None:
+            report.failed.append({"appid": appid, "error": str(error)})
+            log.warning("seed appid=%s failed: %s", appid, error)
+        else:
+            pending.append(row)
+        if len(pending) >= chunk_size:
+            _write_chunk(pending)
+            report.seeded += len(pending)
+            report.chunks_written += 1
+            pending = []
+    if pending:
+        _write_chunk(pending)
+        report.seeded += len(pending)
+        report.chunks_written += 1
+    report.elapsed_seconds = time.monotonic() - started
+    log.info("seeded %s/%s apps in %.1fs", report.seeded, report.requested, report.elapsed_seconds)
+    return report
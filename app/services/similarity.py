@@ -0,0 +1,263 @@
+# app/services/similarity.py
+"""
+Item-to-item "more like this" index.
+
+Similarity of two apps blends cosine over genre/category features with cosine
+over co-ownership (how many users own both, normalized by owner counts). The
+build works on chunks of rows: a chunk's feature sims are one (chunk x F) @ (F x N)
+product and its co-ownership counts come from walking owner -> library lists,
+so memory is O(chunk x N), never N x N. Chunks fan out over a fork-based process
+pool and each chunk's top K lands in app_neighbors as soon as it's done.
+Incremental builds only redo apps marked dirty (metadata or owners changed)
+plus the apps whose lists currently point at them.
+"""
+from __future__ import annotations
+import logging, multiprocessing, time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from ..models.appdetails import db, App, AppGenre, AppCategory
+from ..models.similarity import AppNeighbor, NeighborDirty
+from .bulk import chunked, upsert
+from .library_store import get_library_store
+from .neighbor_dirty import mark_dirty
+#dirty marks live there, light enough for the write paths to import
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SimilarityInputs:
+    appids: np.ndarray          # sorted, row i is appids[i]
+    features: np.ndarray        # N x F float32, rows L2 normalized
+    app_users_ptr: np.ndarray   # CSR app -> owner (user index)
+    app_users: np.ndarray
+    user_apps_ptr: np.ndarray   # CSR user -> owned app rows
+    user_apps: np.ndarray
+    owner_counts: np.ndarray
+    k: int = 20
+    feature_weight: float = 0.5
+    max_owners: int = 2000
+
+    @property
+    def size(self) -> int:
+        return len(self.appids)
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n_keys: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_keys), out=ptr[1:])
+    return ptr, values[order]
+
+
+def load_inputs(k: int = 20, feature_weight: float = 0.5, max_owners: int = 2000) -> SimilarityInputs:
+    """Everything the build needs, as flat arrays (no ORM objects)."""
+    appids = np.array(sorted(a for (a,) in db.session.execute(select(App.appid))), dtype=np.int64)
+    n = len(appids)
+
+    vocab: Dict[str, int] = {}
+    pairs: List[Tuple[int, int]] = []
+    for model, column, prefix in ((AppGenre, AppGenre.genre, "genre:"), (AppCategory, AppCategory.category, "category:")):
+        for appid, value in db.session.execute(select(model.appid, column)):
+            pairs.append((appid, vocab.setdefault(prefix + value, len(vocab))))
+    features = np.zeros((n, max(len(vocab), 1)), dtype=np.float32)
+    if pairs:
+        pair_apps = np.searchsorted(appids, np.array([p[0] for p in pairs], dtype=np.int64))
+        features[pair_apps, np.array([p[1] for p in pairs])] = 1.0
+        norms = np.linalg.norm(features, axis=1)
+        features[norms > 0] /= norms[norms > 0, None]
+
+    user_ids, user_ptr, owned = get_library_store().csr()
+    #ownership straight from the library store's arrays, user i owns owned[user_ptr[i]:user_ptr[i + 1]]
+    user_rows = np.repeat(np.arange(len(user_ids), dtype=np.int64), np.diff(user_ptr))
+    at = np.minimum(np.searchsorted(appids, owned), max(n - 1, 0))
+    known = appids[at] == owned if n else np.zeros(len(owned), dtype=bool)
+    #rows for apps deleted since the store loaded are dropped
+    apps, user_rows = at[known], user_rows[known]
+    app_users_ptr, app_users = _csr(apps, user_rows, n)
+    user_apps_ptr, user_apps = _csr(user_rows, apps, len(user_ids))
+    return SimilarityInputs(
+        appids=appids, features=features,
+        app_users_ptr=app_users_ptr, app_users=app_users,
+        user_apps_ptr=user_apps_ptr, user_apps=user_apps,
+        owner_counts=np.diff(app_users_ptr), k=k, feature_weight=feature_weight, max_owners=max_owners,
+    )
+
+
+def _co_ownership(inputs: SimilarityInputs, row: int) -> np.ndarray:
+    """Cosine co-ownership of one app against all apps."""
+    owners = inputs.app_users[inputs.app_users_ptr[row]:inputs.app_users_ptr[row + 1]]
+    if not len(owners):
+        return np.zeros(inputs.size, dtype=np.float32)
+    scale = 1.0
+    if len(owners) > inputs.max_owners:
+        #huge games: an even sample of owners, counts scaled back up
+        scale = len(owners) / inputs.max_owners
+        owners = owners[np.linspace(0, len(owners) - 1, inputs.max_owners).astype(np.int64)]
+    libraries = [inputs.user_apps[inputs.user_apps_ptr[u]:inputs.user_apps_ptr[u + 1]] for u in owners]
+    counts = np.bincount(np.concatenate(libraries), minlength=inputs.size).astype(np.float32) * scale
+    denom = np.sqrt(float(inputs.owner_counts[row]) * np.maximum(inputs.owner_counts, 1))
+    return counts / denom
+
+
+def _similarities(inputs: SimilarityInputs, rows: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """(row, blended similarity of that row against every app) for each row in the chunk."""
+    feature_sims = inputs.features[rows] @ inputs.features.T
+    for i, row in enumerate(rows):
+        sims = inputs.feature_weight * feature_sims[i] + (1.0 - inputs.feature_weight) * _co_ownership(inputs, row)
+        sims[row] = 0.0
+        yield int(row), sims
+
+
+def _top(inputs: SimilarityInputs, sims: np.ndarray) -> np.ndarray:
+    """Top K positive rows of sims, score desc then appid asc so ties are deterministic."""
+    k = min(inputs.k, inputs.size - 1)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    kth = sims[np.argpartition(-sims, k - 1)[k - 1]]
+    candidates = np.flatnonzero((sims >= kth) & (sims > 0))
+    #>= kth keeps every tie at the boundary, the lexsort then decides which survive
+    return candidates[np.lexsort((inputs.appids[candidates], -sims[candidates]))][:k]
+
+
+def neighbors_for_rows(inputs: SimilarityInputs, rows: np.ndarray) -> List[Tuple[int, int, int, float]]:
+    """(appid, rank, neighbor_appid, score) for the top K of each row in the chunk."""
+    out: List[Tuple[int, int, int, float]] = []
+    for row, sims in _similarities(inputs, rows):
+        appid = int(inputs.appids[row])
+        for rank, neighbor in enumerate(_top(inputs, sims)):
+            out.append((appid, rank, int(inputs.appids[neighbor]), float(sims[neighbor])))
+    return out
+
+
+_INPUTS: Optional[SimilarityInputs] = None
+#set in the parent right before forking so workers inherit it copy-on-write
+
+
+def _chunk_worker(rows: np.ndarray) -> Tuple[np.ndarray, List[Tuple[int, int, int, float]]]:
+    return rows, neighbors_for_rows(_INPUTS, rows)
+
+
+def _write(inputs: SimilarityInputs, rows: np.ndarray, results: List[Tuple[int, int, int, float]]) -> None:
+    table = AppNeighbor.__table__
+    db.session.execute(table.delete().where(table.c.appid.in_([int(a) for a in inputs.appids[rows]])))
+    for chunk in chunked(results, 2000):
+        db.session.execute(table.insert(), [
+            {"appid": a, "rank": r, "neighbor_appid": nb, "score": s} for a, r, nb, s in chunk
+        ])
+    db.session.commit()
+
+
+def _rows_for(inputs: SimilarityInputs, appids: Iterable[int]) -> np.ndarray:
+    wanted = np.array(sorted(set(int(a) for a in appids)), dtype=np.int64)
+    if not inputs.size:
+        return wanted[:0]
+    rows = np.minimum(np.searchsorted(inputs.appids, wanted), inputs.size - 1)
+    return rows[inputs.appids[rows] == wanted]
+
+
+def build_neighbors(appids: Optional[Iterable[int]] = None, processes: int = 1, chunk_size: int = 256,
+                    k: int = 20, feature_weight: float = 0.5, max_owners: int = 2000,
+                    inputs: Optional[SimilarityInputs] = None) -> Dict[str, Any]:
+    """
+    Rebuild neighbor lists for `appids` (None = every app). Results are
+    written chunk by chunk so a long build never holds more than a few chunks.
+    """
+    global _INPUTS
+    started = time.monotonic()
+    started_at = int(time.time())
+    inputs = inputs or load_inputs(k, feature_weight, max_owners)
+    rows = np.arange(inputs.size) if appids is None else _rows_for(inputs, appids)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    written = 0
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    if processes > 1 and can_fork and len(chunks) > 1:
+        _INPUTS = inputs
+        try:
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                for chunk_rows, results in pool.imap_unordered(_chunk_worker, chunks):
+                    _write(inputs, chunk_rows, results)
+                    written += len(chunk_rows)
+        finally:
+            _INPUTS = None
+    else:
+        for chunk_rows in chunks:
+            _write(inputs, chunk_rows, neighbors_for_rows(inputs, chunk_rows))
+            written += len(chunk_rows)
+    if appids is None:
+        #a full build covers anything marked before it started
+        db.session.execute(NeighborDirty.__table__.delete().where(NeighborDirty.marked_at <= started_at))
+        db.session.commit()
+    elapsed = time.monotonic() - started
+    log.info("neighbors built for %s apps in %.1fs", written, elapsed)
+    return {"apps": written, "chunks": len(chunks), "elapsed_seconds": round(elapsed, 3)}
+
+
+def _affected_by(inputs: SimilarityInputs, dirty_rows: np.ndarray) -> set:
+    """
+    Apps whose lists can change when `dirty_rows` change. Both cosines are
+    symmetric and a pair only moves if one side is dirty, so a clean app Y is
+    affected iff a dirty app is already in its list or now scores at least as
+    high as the weakest entry in it (any positive score if the list isn't full).
+    """
+    floor = np.zeros(inputs.size)
+    #0 -> list not full, anything positive gets in
+    listed = db.session.execute(
+        select(AppNeighbor.appid, func.min(AppNeighbor.score), func.count()).group_by(AppNeighbor.appid)
+    ).all()
+    if listed:
+        at = _rows_for(inputs, [a for a, _, _ in listed])
+        full = {a: low for a, low, n in listed if n >= min(inputs.k, inputs.size - 1)}
+        floor[at] = [full.get(int(a), 0.0) for a in inputs.appids[at]]
+    affected = set(int(a) for a in inputs.appids[dirty_rows])
+    for row, sims in _similarities(inputs, dirty_rows):
+        hits = np.flatnonzero((sims > 0) & (sims >= floor))
+        affected.update(int(a) for a in inputs.appids[hits])
+    for chunk in chunked([int(a) for a in inputs.appids[dirty_rows]], 500):
+        affected.update(a for (a,) in db.session.execute(
+            select(AppNeighbor.appid).where(AppNeighbor.neighbor_appid.in_(chunk)).distinct()
+        ))
+    return affected
+
+
+def build_incremental(processes: int = 1, k: int = 20, feature_weight: float = 0.5, max_owners: int = 2000,
+                      **kwargs) -> Dict[str, Any]:
+    """
+    Rebuild only dirty apps and the apps whose lists they enter or leave,
+    then clear the dirty marks that existed when the build started.
+    """
+    started_at = int(time.time())
+    dirty = [a for (a,) in db.session.execute(select(NeighborDirty.appid).where(NeighborDirty.marked_at <= started_at))]
+    if not dirty:
+        return {"apps": 0, "chunks": 0, "elapsed_seconds": 0.0, "dirty": 0}
+    inputs = load_inputs(k, feature_weight, max_owners)
+    #apps deleted since they were marked still need their stale lists dropped
+    gone = set(dirty) - set(int(a) for a in inputs.appids[_rows_for(inputs, dirty)])
+    affected = _affected_by(inputs, _rows_for(inputs, dirty))
+    for chunk in chunked(list(gone), 500):
+        affected.update(a for (a,) in db.session.execute(
+            select(AppNeighbor.appid).where(AppNeighbor.neighbor_appid.in_(chunk)).distinct()
+        ))
+        db.session.execute(AppNeighbor.__table__.delete().where(AppNeighbor.appid.in_(chunk)))
+    result = build_neighbors(affected, processes=processes, inputs=inputs, **kwargs)
+    table = NeighborDirty.__table__
+    for chunk in chunked(dirty, 500):
+        db.session.execute(table.delete().where(table.c.appid.in_(chunk), table.c.marked_at <= started_at))
+    db.session.commit()
+    result["dirty"] = len(dirty)
+    return result
+
+
+def similar_apps(appid: int, limit: int = 10) -> List[Any]:
+    """One indexed range read of the precomputed list, joined to App for display."""
+    return db.session.execute(
+        select(App.appid, App.name, App.positive, App.negative, App.recommendations_total, App.score,
+               AppNeighbor.score.label("similarity"))
+        .join(App, App.appid == AppNeighbor.neighbor_appid)
+        .where(AppNeighbor.appid == appid)
+        .order_by(AppNeighbor.rank)
+        .limit(limit)
+    ).all()
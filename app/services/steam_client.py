@@ -1,55 +1,155 @@
-import os,time, requests
+import os,time, random, requests
 #time for caching, requests for HTTP requests
 from typing import Any, Dict, Optional
 #type hints, any for any type, json can be whatever
 #dict only imported for type hints
+from .cache import LRUCache, Stamped, canonical_key
+from .disk_cache import DiskCache
+from .metrics import METRICS
+from .rate_limit import TokenBucket
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+#steam answers 429 when we go too fast and the odd 5xx under load, both worth retrying
+
 class SteamClient:
-    def __init__(self, cache_ttl: int = 3600):
+    def __init__(self, cache_ttl: int = 3600, api_base: Optional[str] = None, store_base: Optional[str] = None,
+                 limiter: Optional[TokenBucket] = None, max_retries: int = 4, backoff: float = 1.0,
+                 timeout: float = 10.0, cache: Optional[LRUCache] = None, disk_cache: Optional[DiskCache] = None):
         self.cache_ttl = cache_ttl
-        self._cache: Dict[str, tuple[float, Any]] = {}
-        #type hinting for cache, key is str, value is tuple of (timestamp, data)
-        #important for catching errors in development, any is for JSON payload, float for timestamp
+        self._cache = cache if cache is not None else LRUCache(ttl=cache_ttl)
+        #bounded LRU keyed on canonical url+params, concurrent misses on one key share a single fetch
+        self._disk = disk_cache
+        #optional second tier shared by every process on the host, checked before the network
         self.key = os.getenv("STEAM_API_KEY")
-        self._base_api = "https://api.steampowered.com"
+        self._base_api = (api_base or "https://api.steampowered.com").rstrip("/")
+        self._base_store = (store_base or "https://store.steampowered.com").rstrip("/")
+        #overridable so tests and benchmarks can point at a local fake steam server
         self._session = requests.Session()
         #keeps connections open and is faster than calling requests.get every time'
+        self.limiter = limiter
+        #shared token bucket, None means no client side rate limiting
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config, limiter: Optional[TokenBucket] = None) -> "SteamClient":
+        """Build a client from a Flask config mapping (current_app.config)."""
+        ttl = config.get("STEAM_CACHE_TTL_SECONDS", 3600)
+        cache = LRUCache(
+            ttl=ttl,
+            max_entries=config.get("STEAM_CACHE_MAX_ENTRIES", 2048),
+            max_bytes=config.get("STEAM_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            stale_while_revalidate=config.get("STEAM_CACHE_STALE_WHILE_REVALIDATE", False),
+        )
+        disk_path = config.get("STEAM_DISK_CACHE_PATH")
+        disk = DiskCache(disk_path, ttl=ttl, max_bytes=config.get("STEAM_DISK_CACHE_MAX_BYTES", 256 * 1024 * 1024)) if disk_path else None
+        return cls(
+            cache_ttl=ttl,
+            cache=cache,
+            disk_cache=disk,
+            api_base=config.get("STEAM_API_BASE"),
+            store_base=config.get("STEAM_STORE_BASE"),
+            limiter=limiter,
+            max_retries=config.get("STEAM_MAX_RETRIES", 4),
+            backoff=config.get("STEAM_BACKOFF_SECONDS", 1.0),
+            timeout=config.get("STEAM_TIMEOUT_SECONDS", 10.0),
+        )
+
+    @classmethod
+    def for_app(cls, app) -> "SteamClient":
+        """
+        One client per Flask app (so per worker process), sharing its cache and
+        token bucket across requests and threads.
+        """
+        client = app.extensions.get("steam_client")
+        if client is None:
+            limiter = TokenBucket(app.config.get("STEAM_RATE_PER_SECOND", 0.66), app.config.get("STEAM_RATE_BURST", 10))
+            client = cls.from_config(app.config, limiter=limiter)
+            app.extensions["steam_client"] = client
+        return client
 
-    def _get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        
-        key = f"{url}|{params}"
-        #create a unique cache key based on URL and parameters
-        now = time.time()
-        #grab current time - float
-        
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            #retrieve cached entry, remember tho data is a JSON payload, can be anything as a tuple
-            if now - timestamp < self.cache_ttl:
-                #if key exists and entry is fresh return data - cache hit, return data
-                #from RAM rather than network, far in quit bursts that acknowledge ttl
-                return data
-        
-        #cache miss or stale entry, make network request
-        response_object = requests.get(url, params=params)
-        #call get func from requests library, pass url and params
-            #essentially calls out to someone elses API and gets a response object
-        response_object.raise_for_status()
-            #built in func to raise an error if status code is not 200
-        data = response_object.json()
-        #JSON response and store in cache and return the data
-        self._cache[key] = (now, data)
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None, endpoint: str = "other",
+             disk: bool = True) -> Any:
+        key = canonical_key(url, params)
+        #same url + params in any dict order is the same entry, the api key is never part of it
+        if not METRICS.enabled:
+            return self._cache.get_or_load(key, lambda: self._load(key, url, params, endpoint, disk=disk))
+            #fresh hit comes from RAM, a miss fetches once even if many threads ask at the same time
+        tier = ["memory"]
+        #_load overwrites this when the RAM tier missed, threads that joined someone else's fetch count as memory
+        data = self._cache.get_or_load(key, lambda: self._load(key, url, params, endpoint, tier, disk))
+        METRICS.steam_cache.inc(endpoint, tier[0])
         return data
 
+    def _load(self, key: str, url: str, params: Optional[Dict[str, Any]], endpoint: str = "other",
+              tier: Optional[list] = None, disk: bool = True) -> Any:
+        #RAM miss: try the shared disk tier before spending API quota
+        disk_cache = self._disk if disk else None
+        if disk_cache is not None:
+            entry = disk_cache.get(key)
+            if entry is not None:
+                if tier is not None:
+                    tier[0] = "disk"
+                stored_at, data = entry
+                return Stamped(data, stored_at)
+        if tier is not None:
+            tier[0] = "upstream"
+        data = self._fetch(url, params, endpoint)
+        if disk_cache is not None:
+            disk_cache.put(key, data)
+        return data
+
+    def cache_stats(self) -> Dict[str, Any]:
+        stats = {"memory": self._cache.stats()}
+        if self._disk is not None:
+            stats["disk"] = self._disk.stats()
+        return stats
+
+    def _fetch(self, url: str, params: Optional[Dict[str, Any]] = None, endpoint: str = "other") -> Any:
+        """
+        One upstream GET behind the rate limiter, retrying 429/5xx and connection
+        errors with exponential backoff + jitter (Retry-After wins if steam sends it).
+        """
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response_object = self._session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if METRICS.enabled:
+                    METRICS.steam_upstream.inc(endpoint, "error")
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if METRICS.enabled:
+                    METRICS.steam_upstream_seconds.observe(time.perf_counter() - started, endpoint)
+                    METRICS.steam_upstream.inc(endpoint, str(response_object.status_code))
+                if response_object.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    response_object.raise_for_status()
+                    #built in func to raise an error if status code is not 200
+                    return response_object.json()
+                retry_after = response_object.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    time.sleep(min(float(retry_after), 60.0))
+                    attempt += 1
+                    continue
+            time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+            attempt += 1
+
 
     #below functions are specific to Steam API, but return JSON data using our get method
 
     def app_details(self, appid: int) -> dict:
-        url = f"{self._base_api}/api/appdetails"
-        return self._get(url, {"appids": appid})
+        url = f"{self._base_store}/api/appdetails"
+        #appdetails is a storefront endpoint, not part of api.steampowered.com
+        return self._get(url, {"appids": appid}, endpoint="appdetails")
 
     def app_reviews_summary(self, appid: int) -> dict:
-        url = f"{self._base_api}/{appid}"
-        return self._get(url, {"json": 1, "purchase_type": "all", "filter": "summary"})#cur
+        url = f"{self._base_store}/appreviews/{appid}"
+        return self._get(url, {"json": 1, "purchase_type": "all", "filter": "summary"}, endpoint="appreviews")#cur
     
     def owned_games(self, steamid: str, include_appinfo: bool = True, include_played_free: bool = True):
         if not self.key:
@@ -63,7 +163,8 @@ class SteamClient:
             "include_appinfo": 1,
             "include_played_free_games": 1
         }
-        response = self._get(url, params)
+        response = self._get(url, params, endpoint="owned_games", disk=False)
+        #per-user libraries stay out of the shared disk tier and its fixture dumps, RAM only
         '''will be json hopefully full of vals that we use body to extract, something like
         {
      "response": {
@@ -0,0 +1,18 @@
+from blinker import Namespace
+
+#write paths announce what changed, in-process caches/indexes subscribe instead of polling
+_signals = Namespace()
+
+catalog_updated = _signals.signal("catalog-updated")
+#sent by ingest_app_metadata with appids=[...] after the chunk commits
+
+library_synced = _signals.signal("library-synced")
+#sent by upsert_owned_games_only with user_id and changes=[(appid, old, new)],
+#old/new are (playtime_forever, rtime_last_played) tuples or None for created/deleted rows
+
+library_reloaded = _signals.signal("library-reloaded")
+#sent by LibraryStore.refresh_changed with the same user_id/changes shape when it picks up
+#another process's sync, in-process only (the response cache version was already bumped)
+
+leaderboards_swapped = _signals.signal("leaderboards-swapped")
+#sent by build_leaderboards after a new set of materialized rankings goes live
@@ -0,0 +1,10 @@
+"""
+Benchmarks: a deterministic synthetic catalog/library generator
+(benchmarks/synthetic.py), a local fake Steam server (benchmarks/fake_steam.py)
+and the harness that times the hot paths against them and writes / compares
+JSON baselines (benchmarks/harness.py).
+
+    python -m benchmarks.synthetic bench.db --apps 100000 --users 1000
+    python -m benchmarks.harness --apps 50000 --out baseline.json
+    python -m benchmarks.harness --apps 50000 --compare baseline.json
+"""
@@ -0,0 +1,119 @@
+# benchmarks/fake_steam.py
+"""
+Local stand-in for the storefront endpoints SteamClient calls (appdetails and
+appreviews). Payloads are derived from the appid so every run sees the same
+data; `latency` adds a fixed delay per request to mimic the real network.
+fail_next() answers the next requests with 429/5xx to exercise client retries.
+Point STEAM_STORE_BASE / STEAM_API_BASE at FakeSteam.url.
+"""
+from __future__ import annotations
+import json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from .synthetic import CATEGORIES, GENRES
+
+
+def appdetails_payload(appid: int) -> Dict[str, Any]:
+    rng = random.Random(appid)
+    total = int(rng.lognormvariate(3.0, 2.0))
+    return {str(appid): {"success": True, "data": {
+        "steam_appid": appid,
+        "name": f"Fake App {appid}",
+        "type": "game",
+        "is_free": rng.random() < 0.12,
+        "recommendations": {"total": total},
+        "release_date": {"date": "1 Jan, 2020"},
+        "genres": [{"id": str(i), "description": g} for i, g in enumerate(rng.sample(GENRES, rng.randint(1, 4)))],
+        "categories": [{"id": str(i), "description": c} for i, c in enumerate(rng.sample(CATEGORIES, rng.randint(1, 6)))],
+        **({"metacritic": {"score": rng.randint(40, 95)}} if rng.random() < 0.15 else {}),
+    }}}
+
+
+def reviews_payload(appid: int) -> Dict[str, Any]:
+    rng = random.Random(-appid)
+    total = int(rng.lognormvariate(3.0, 2.0))
+    positive = int(total * rng.betavariate(6.0, 2.0))
+    return {"success": 1, "query_summary": {"total_positive": positive, "total_negative": total - positive}}
+
+
+class FakeSteam:
+    """Threaded HTTP server on 127.0.0.1, counts requests per endpoint."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Dict[str, int] = {"appdetails": 0, "appreviews": 0, "other": 0, "faults": 0}
+        self._faults: List[Tuple[int, Optional[int]]] = []
+        #(status, Retry-After) answered instead of the payload, oldest first
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def fail_next(self, times: int, status: int = 503, retry_after: Optional[int] = None) -> None:
+        """Answer the next `times` storefront requests with `status` (and Retry-After when given)."""
+        with self._lock:
+            self._faults.extend([(status, retry_after)] * times)
+
+    def _fault(self) -> Optional[Tuple[int, Optional[int]]]:
+        with self._lock:
+            if not self._faults:
+                return None
+            self.requests["faults"] += 1
+            return self._faults.pop(0)
+
+    def start(self) -> "FakeSteam":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                parsed = urlparse(self.path)
+                if parsed.path == "/api/appdetails" or parsed.path.startswith("/appreviews/"):
+                    fault = fake._fault()
+                    if fault is not None:
+                        status, retry_after = fault
+                        return self._send(status, {}, {"Retry-After": str(retry_after)} if retry_after is not None else None)
+                if parsed.path == "/api/appdetails":
+                    fake._count("appdetails")
+                    return self._send(200, appdetails_payload(int(parse_qs(parsed.query)["appids"][0])))
+                if parsed.path.startswith("/appreviews/"):
+                    fake._count("appreviews")
+                    return self._send(200, reviews_payload(int(parsed.path.rsplit("/", 1)[1])))
+                fake._count("other")
+                self._send(404, {})
+
+            def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 128
+            #the default backlog of 5 drops connections under seed concurrency, and each drop costs a client backoff
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,430 @@
+# benchmarks/harness.py
+"""
+Times the hot paths against a synthetic catalog and a local fake Steam server:
+
+  recommendations.*   GET /api/recommendations (gem ranking, ?q= substring /
+                      prefix, genre facet, ?user_id=) under both ranking engines
+  seed                POST /api/seed with appids the catalog doesn't have yet
+  owned_sync.*        upsert_owned_games_only on a large library (first sync,
+                      unchanged resync, resync with 10% changed / 5% removed)
+  backfill.*          backfill_metadata_for_user (enqueue) and one worker drain
+  libraries.*         LibraryStore load, scanning owned_games vs mapping its
+                      snapshot file
+  startup.*           fresh interpreter: `import app`, create_app (production
+                      config) and time until /api/ready answers 200
+
+Each benchmark records latency percentiles over its samples, the first (cold)
+call separately, SQL statements per call and the process peak RSS. Results go
+to a JSON file; --compare checks them against a saved baseline and exits 1
+when something regressed past --threshold.
+
+The app reads its config from the environment at import time, so the
+database, fake server and disabled caches are set up before `app` is imported.
+"""
+from __future__ import annotations
+import argparse, json, os, platform, resource, shutil, subprocess, sys, tempfile, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+#absolute latency changes below this are noise, whatever the ratio
+NOISE_FLOOR_MS = 1.0
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    #bytes on macOS, kilobytes on Linux
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {
+        "p50_ms": pick(0.50), "p90_ms": pick(0.90), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 3), "mean_ms": round(sum(ordered) / len(ordered), 3),
+    }
+
+
+class QueryCounter:
+    """Counts SQL statements (executemany is one) and their time on an engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        self.seconds = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.count += 1
+            self.seconds += elapsed
+
+    def reading(self):
+        with self._lock:
+            return self.count, self.seconds
+
+
+def measure(name: str, call: Callable[[int], Any], counter: QueryCounter, repeat: int,
+            warmup: int = 1) -> Dict[str, Any]:
+    """
+    Run call(i) for i in range(warmup + repeat). The first run is reported as
+    cold_ms, warmup runs (snapshot builds, first connections) aren't sampled
+    and their SQL doesn't count toward queries_per_call.
+    """
+    samples: List[float] = []
+    cold_ms = None
+    queries_before, sql_before = counter.reading()
+    for i in range(warmup + repeat):
+        if i == warmup:
+            queries_before, sql_before = counter.reading()
+        started = time.perf_counter()
+        call(i)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if i == 0:
+            cold_ms = round(elapsed_ms, 3)
+        if i >= warmup:
+            samples.append(elapsed_ms)
+    queries, sql_seconds = counter.reading()
+    result = {
+        "samples": len(samples),
+        "cold_ms": cold_ms,
+        **percentiles(samples),
+        "queries_per_call": round((queries - queries_before) / len(samples), 2),
+        "sql_ms_per_call": round((sql_seconds - sql_before) * 1000 / len(samples), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"  {name:<34} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+          f"queries/call {result['queries_per_call']:>8}  rss {result['peak_rss_mb']}MB", flush=True)
+    return result
+
+
+# -------- benchmarks --------
+
+SUBSTRINGS = ("ight", "rust", "orbit", "lantern", "of", "station", "colony", "abyss")
+PREFIXES = ("Hol", "Cri", "Neo", "Clock", "Sun", "Wan", "Iron", "Last")
+#short terms, common words and near-misses, so both dense and sparse matches get timed
+
+
+def _get(client, path: str, params: Dict[str, Any]) -> None:
+    response = client.get(path, query_string=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {path} {params} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def bench_recommendations(app, counter: QueryCounter, users: int, repeat: int) -> Dict[str, Any]:
+    from .synthetic import GENRES
+    from app.services.leaderboards import build_leaderboards
+    client = app.test_client()
+    views = {
+        "top": lambda i: {"limit": 20},
+        "deep_min_reviews": lambda i: {"limit": 20, "min_reviews": 5000},
+        "q_substring": lambda i: {"limit": 20, "q": SUBSTRINGS[i % len(SUBSTRINGS)]},
+        "q_prefix": lambda i: {"limit": 20, "q": PREFIXES[i % len(PREFIXES)], "match": "prefix"},
+        "genre": lambda i: {"limit": 20, "genre": GENRES[i % 5]},
+        "user": lambda i: {"limit": 20, "user_id": 1 + i % users},
+    }
+    results = {}
+    for engine in ("sql", "memory"):
+        app.config["RANKING_ENGINE"] = engine
+        for view, params in views.items():
+            results[f"recommendations.{engine}.{view}"] = measure(
+                f"recommendations.{engine}.{view}", lambda i, p=params: _get(client, "/api/recommendations", p(i)),
+                counter, repeat,
+            )
+    app.config["RANKING_ENGINE"] = "sql"
+    with app.app_context():
+        build_leaderboards(app.config["LEADERBOARD_SIZE"], app.config["LEADERBOARD_MIN_REVIEWS"])
+    results["recommendations.leaderboard.top"] = measure(
+        "recommendations.leaderboard.top", lambda i: _get(client, "/api/recommendations", {"limit": 20}), counter, repeat,
+    )
+    results["recommendations.leaderboard.genre"] = measure(
+        "recommendations.leaderboard.genre",
+        lambda i: _get(client, "/api/recommendations", {"limit": 20, "genre": GENRES[i % 5]}), counter, repeat,
+    )
+    return results
+
+
+def bench_seed(app, counter: QueryCounter, first_appid: int, batch: int, repeat: int) -> Dict[str, Any]:
+    client = app.test_client()
+    def seed(i: int) -> None:
+        appids = list(range(first_appid + i * batch * 10, first_appid + (i + 1) * batch * 10, 10))
+        #new appids every call, so every one is a real fetch from the fake server
+        response = client.post("/api/seed", json={"appids": appids})
+        report = response.get_json()
+        if response.status_code != 201 or report["seeded"] != batch:
+            raise RuntimeError(f"seed -> {response.status_code}: {report}")
+    return {"seed": measure(f"seed ({batch} appids)", seed, counter, repeat, warmup=0)}
+
+
+def _library(appids, size: int, first_new_appid: int, seed: int) -> List[Dict[str, Any]]:
+    #80% catalog apps, 20% appids the catalog has never seen (they get stub parents)
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    known = rng.choice(appids, size=min(len(appids), size - size // 5), replace=False)
+    new = first_new_appid + np.arange(size - len(known)) * 10
+    return [
+        {"appid": int(a), "playtime_forever": int(rng.integers(0, 20000)), "rtime_last_played": 1_760_000_000 - int(rng.integers(0, 10**7))}
+        for a in np.concatenate([known, new])
+    ]
+
+
+def _mutated(games: List[Dict[str, Any]], seed: int) -> List[Dict[str, Any]]:
+    #10% played more, 5% refunded/removed
+    import random
+    rng = random.Random(seed)
+    out = []
+    for g in games:
+        roll = rng.random()
+        if roll < 0.05:
+            continue
+        out.append({**g, "playtime_forever": g["playtime_forever"] + 60} if roll < 0.15 else g)
+    return out
+
+
+def bench_owned_sync(app, counter: QueryCounter, appids, size: int, first_new_appid: int,
+                     repeat: int) -> Dict[str, Any]:
+    from app.services.owned_games_sync import upsert_owned_games_only
+    base_user = 1_000_000
+    libraries = [_library(appids, size, first_new_appid, seed) for seed in range(repeat + 1)]
+    results = {}
+    with app.app_context():
+        results[f"owned_sync.first.{size}"] = measure(
+            f"owned_sync.first ({size} games)",
+            lambda i: upsert_owned_games_only(base_user + i, libraries[i]), counter, repeat, warmup=1,
+        )
+        #every sample is a new user, so every row is an insert
+        games = libraries[0]
+        changed = _mutated(games, 7)
+        results[f"owned_sync.unchanged.{size}"] = measure(
+            f"owned_sync.unchanged ({size} games)",
+            lambda i: upsert_owned_games_only(base_user, games, prune=True), counter, repeat, warmup=0,
+        )
+        results[f"owned_sync.changed.{size}"] = measure(
+            f"owned_sync.changed ({size} games)",
+            lambda i: upsert_owned_games_only(base_user, changed if i % 2 == 0 else games, prune=True), counter, repeat, warmup=0,
+        )
+        #alternating keeps the diff the same size every call, prune so the removed 5% are real deletes
+    return results
+
+
+def bench_backfill(app, counter: QueryCounter, users: int, repeat: int, fake) -> Dict[str, Any]:
+    from app.services.app_metadata import backfill_metadata_for_user
+    from app.services.backfill_queue import queue_stats, run_worker
+    results = {}
+    queued = [0]
+    def enqueue(i: int) -> None:
+        with app.app_context():
+            queued[0] += backfill_metadata_for_user(1 + i % users)
+    results["backfill.enqueue"] = measure("backfill.enqueue", enqueue, counter, repeat, warmup=0)
+    fetched_before = fake.requests["appdetails"]
+    totals: Dict[str, int] = {}
+    def drain(i: int) -> None:
+        totals.update(run_worker(app, once=True))
+    results["backfill.drain"] = measure("backfill.drain", drain, counter, 1, warmup=0)
+    results["backfill.drain"]["jobs"] = totals
+    results["backfill.drain"]["upstream_requests"] = fake.requests["appdetails"] - fetched_before
+    with app.app_context():
+        results["backfill.drain"]["queue"] = queue_stats()
+    return results
+
+
+def bench_libraries(app, counter: QueryCounter, workdir: str, repeat: int) -> Dict[str, Any]:
+    from app.services.library_store import LibraryStore, write_snapshot
+    path = os.path.join(workdir, "libraries.snap")
+    results = {}
+    with app.app_context():
+        def scan(i: int) -> None:
+            LibraryStore().load()
+        results["libraries.scan"] = measure("libraries.scan", scan, counter, repeat, warmup=0)
+        store = LibraryStore()
+        store.load()
+        write_snapshot(path, store.user_ids, store.ptr, store.appid, store.playtime, store.last_played)
+        results["libraries.scan"].update(rows=len(store.appid), users=len(store.user_ids),
+                                         bytes=store.stats()["bytes"])
+
+        def mapped(i: int) -> None:
+            LibraryStore(path=path).load()
+        results["libraries.map"] = measure("libraries.map", mapped, counter, repeat, warmup=0)
+    return results
+
+
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app("prod")
+created = time.perf_counter()
+client = application.test_client()
+while client.get("/api/ready").status_code != 200:
+    if time.perf_counter() - created > 120:
+        sys.exit("not ready after 120s: " + client.get("/api/ready").get_data(as_text=True))
+    time.sleep(0.005)
+ready = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": created - imported, "ready": ready - created}))
+"""
+
+
+def bench_startup(repeat: int) -> Dict[str, Any]:
+    """Each sample is a new interpreter, so nothing is shared with the in-process benchmarks above."""
+    env = {**os.environ, "PRELOAD_RANKING": "1", "SCHEMA_AUTO_CREATE": "0"}
+    samples: Dict[str, List[float]] = {"startup.process": [], "startup.import": [], "startup.create_app": [],
+                                       "startup.ready": []}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE], env=env, capture_output=True, text=True,
+                             check=True).stdout
+        samples["startup.process"].append((time.perf_counter() - started) * 1000)
+        #interpreter start to exit, what a worker spawn or a script run pays
+        for key, seconds in json.loads(out.strip().splitlines()[-1]).items():
+            samples[f"startup.{key}"].append(seconds * 1000)
+    results = {}
+    for name, values in samples.items():
+        results[name] = {"samples": len(values), **percentiles(values)}
+        print(f"  {name:<34} p50 {results[name]['p50_ms']:>9.2f}ms  p95 {results[name]['p95_ms']:>9.2f}ms",
+              flush=True)
+    return results
+
+
+# -------- baselines --------
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Human-readable regressions of current vs baseline (empty when none)."""
+    regressions = []
+    for name, base in baseline["benchmarks"].items():
+        now = current["benchmarks"].get(name)
+        if now is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if now[key] > base[key] * (1 + threshold) and now[key] - base[key] > NOISE_FLOOR_MS:
+                regressions.append(f"{name}: {key} {base[key]} -> {now[key]} (+{(now[key] / base[key] - 1) * 100:.0f}%)")
+        if "queries_per_call" in base and now["queries_per_call"] > base["queries_per_call"] + 0.01:
+            #statement counts are deterministic, any increase is real
+            regressions.append(f"{name}: queries_per_call {base['queries_per_call']} -> {now['queries_per_call']}")
+    rss_now, rss_base = current["meta"]["peak_rss_mb"], baseline["meta"]["peak_rss_mb"]
+    if rss_now > rss_base * (1 + threshold):
+        regressions.append(f"peak_rss_mb {rss_base} -> {rss_now}")
+    return regressions
+
+
+def _workload(args) -> Dict[str, Any]:
+    return {"apps": args.apps, "users": args.users, "library_mean": args.library_mean, "seed": args.seed,
+            "library_size": args.library_size, "seed_batch": args.seed_batch, "repeat": args.repeat}
+
+
+def _configure_env(db_path: str, steam_url: str) -> None:
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "STEAM_STORE_BASE": steam_url,
+        "STEAM_API_BASE": steam_url,
+        "STEAM_DISK_CACHE_PATH": "",
+        "RESPONSE_CACHE_PATH": "",
+        #cached responses would time the cache, not the code behind it
+        "STEAM_RATE_PER_SECOND": "1000000",
+        "STEAM_RATE_BURST": "1000",
+    })
+
+
+def run(args) -> Dict[str, Any]:
+    from .fake_steam import FakeSteam
+    workdir = tempfile.mkdtemp(prefix="steam-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    fake = FakeSteam(latency=args.upstream_latency_ms / 1000).start()
+    try:
+        _configure_env(db_path, fake.url)
+        from .synthetic import generate
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+            #benchmarks write to the catalog, the pre-generated file stays pristine
+            generated = {"path": args.db}
+        else:
+            print(f"generating {args.apps} apps / {args.users} users ...", flush=True)
+            generated = generate(db_path, args.apps, args.users, args.library_mean, args.seed)
+
+        from app import create_app
+        from app.extensions import db
+        app = create_app()
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+            appids = [a for (a,) in db.session.execute(db.text("SELECT appid FROM apps ORDER BY appid"))]
+        first_new_appid = (appids[-1] // 10 + 1) * 10 + 10_000_000
+        #far above the catalog, the seed and owned-sync benchmarks use disjoint ranges
+
+        benchmarks: Dict[str, Any] = {}
+        print("recommendations:", flush=True)
+        benchmarks.update(bench_recommendations(app, counter, args.users, args.repeat))
+        print("seed:", flush=True)
+        benchmarks.update(bench_seed(app, counter, first_new_appid, args.seed_batch, max(args.repeat // 20, 3)))
+        print("owned games sync:", flush=True)
+        benchmarks.update(bench_owned_sync(app, counter, appids, args.library_size, first_new_appid + 5_000_000,
+                                           max(args.repeat // 20, 3)))
+        print("backfill:", flush=True)
+        benchmarks.update(bench_backfill(app, counter, args.users, max(args.repeat // 4, 5), fake))
+        print("library store:", flush=True)
+        benchmarks.update(bench_libraries(app, counter, workdir, max(args.repeat // 20, 3)))
+        print("startup:", flush=True)
+        benchmarks.update(bench_startup(max(args.repeat // 20, 3)))
+    finally:
+        fake.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "workload": _workload(args),
+            "generated": generated,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": int(time.time()),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recommender against a synthetic catalog")
+    parser.add_argument("--apps", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--library-mean", type=int, default=150, help="typical games per generated library")
+    parser.add_argument("--seed", type=int, default=42, help="generator seed")
+    parser.add_argument("--db", help="pre-generated catalog (benchmarks.synthetic) to copy instead of generating")
+    parser.add_argument("--repeat", type=int, default=100, help="samples per request benchmark")
+    parser.add_argument("--library-size", type=int, default=20_000, help="games in the owned-sync library")
+    parser.add_argument("--seed-batch", type=int, default=200, help="appids per /api/seed call")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="delay the fake steam server adds")
+    parser.add_argument("--out", help="write results here (JSON)")
+    parser.add_argument("--compare", help="baseline JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before a regression")
+    parser.add_argument("--keep", action="store_true", help="keep the temp database")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline["meta"]["workload"] != _workload(args):
+            raise SystemExit(f"baseline was recorded with a different workload: {baseline['meta']['workload']}")
+
+    results = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+        print("results written to", args.out)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
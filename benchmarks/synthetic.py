@@ -0,0 +1,239 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic catalogs for benchmarking. The same (apps, users,
+seed) always produces byte-for-byte the same rows: appids, names, review
+counts (log-normal, so a long tail of hidden gems and a few giants), genres
+and categories (skewed toward the common ones, like the real store) and
+OwnedGame libraries drawn by popularity. Rows are written straight into
+SQLite with executemany, the FTS index is built once at the end instead of
+through the per-row triggers.
+"""
+from __future__ import annotations
+import argparse, os, sqlite3, time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import numpy as np
+
+BASE_TS = 1_760_000_000
+#fixed "now" so timestamps don't depend on when the generator ran
+
+ADJECTIVES = (
+    "Hollow", "Crimson", "Silent", "Iron", "Lost", "Tiny", "Endless", "Broken", "Neon", "Frozen",
+    "Wandering", "Ancient", "Hidden", "Quiet", "Cosmic", "Rusty", "Golden", "Paper", "Shadow", "Little",
+    "Burning", "Electric", "Secret", "Wild", "Distant", "Pale", "Clockwork", "Sunken", "Velvet", "Last",
+)
+NOUNS = (
+    "Knight", "Garden", "Station", "Dungeon", "Voyage", "Kingdom", "Signal", "Harbor", "Forest", "Engine",
+    "Witch", "Orbit", "Citadel", "Tavern", "Lantern", "Frontier", "Circuit", "Island", "Archive", "Golem",
+    "Colony", "Labyrinth", "Pilgrim", "Reactor", "Meadow", "Outpost", "Spire", "Caravan", "Abyss", "Farm",
+)
+SUFFIXES = ("", "", "", "", " II", " III", ": Remastered", " Deluxe", " Online", " Tactics", " Simulator", " Zero")
+GENRES = (
+    "Indie", "Action", "Adventure", "Casual", "Simulation", "Strategy", "RPG", "Free to Play", "Sports",
+    "Racing", "Massively Multiplayer", "Early Access", "Education", "Utilities", "Design & Illustration",
+)
+CATEGORIES = (
+    "Single-player", "Steam Achievements", "Steam Cloud", "Full controller support", "Multi-player",
+    "Steam Trading Cards", "Partial Controller Support", "Co-op", "Online PvP", "Steam Leaderboards",
+    "Remote Play Together", "Online Co-op", "Shared/Split Screen", "Steam Workshop", "In-App Purchases",
+    "Captions available", "Includes level editor", "Cross-Platform Multiplayer", "VR Support", "Stats",
+)
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _pick_many(rng: np.random.Generator, values, per_row: np.ndarray, weights: np.ndarray) -> List[List[str]]:
+    #distinct values per row drawn by weight: Gumbel top-k, one vectorized sort instead of a choice() per row
+    keys = np.log(weights) + rng.gumbel(size=(len(per_row), len(values)))
+    order = np.argsort(-keys, axis=1)
+    return [[values[i] for i in sorted(row[:count])] for row, count in zip(order.tolist(), per_row.tolist())]
+
+
+def make_apps(n: int, seed: int = 42, unfetched: float = 0.02) -> Dict[str, Any]:
+    """
+    Column arrays for n apps plus their genre/category lists. `unfetched`
+    is the share of apps that look like bare OwnedGame parents (never
+    fetched), which is what backfill_metadata_for_user queues.
+    """
+    rng = np.random.default_rng(seed)
+    appids = (np.cumsum(rng.integers(1, 4, n)) * 10).astype(np.int64)
+    #steam appids step by 10 with gaps
+    names = [
+        f"{ADJECTIVES[a]} {NOUNS[b]}{SUFFIXES[c]}"
+        for a, b, c in zip(rng.integers(0, len(ADJECTIVES), n), rng.integers(0, len(NOUNS), n),
+                           rng.integers(0, len(SUFFIXES), n))
+    ]
+    total = np.minimum(np.floor(rng.lognormal(3.0, 2.0, n)), 2_000_000).astype(np.int64)
+    positive = np.rint(total * rng.beta(6.0, 2.0, n)).astype(np.int64)
+    negative = total - positive
+    has_recs = rng.random(n) < 0.7
+    recommendations = np.where(has_recs, np.rint(total * rng.uniform(0.5, 1.5, n)), -1).astype(np.int64)
+    has_metacritic = rng.random(n) < 0.15
+    metacritic = np.where(has_metacritic, np.clip(np.rint(rng.normal(75, 10, n)), 20, 100), -1).astype(np.int64)
+    kind = rng.choice(3, size=n, p=[0.92, 0.06, 0.02])
+    is_free = rng.random(n) < 0.12
+    released = BASE_TS - rng.integers(0, 15 * 365 * 86400, n)
+    fetched = BASE_TS - rng.integers(0, 60 * 86400, n)
+    never_fetched = rng.random(n) < unfetched
+    genres = _pick_many(rng, GENRES, rng.integers(1, 5, n), _zipf_weights(len(GENRES)))
+    categories = _pick_many(rng, CATEGORIES, rng.integers(1, 7, n), _zipf_weights(len(CATEGORIES), 0.8))
+    return {
+        "appids": appids, "names": names, "positive": positive, "negative": negative,
+        "recommendations": recommendations, "metacritic": metacritic, "kind": kind, "is_free": is_free,
+        "released": released, "fetched": fetched, "never_fetched": never_fetched,
+        "genres": genres, "categories": categories,
+    }
+
+
+def _release_date(ts: int) -> str:
+    day = datetime.fromtimestamp(int(ts), tz=timezone.utc)
+    return f"{day.day} {MONTHS[day.month - 1]}, {day.year}"
+
+
+def app_rows(apps: Dict[str, Any]) -> List[tuple]:
+    from app.models.appdetails import gem_score
+    rows = []
+    kinds = ("game", "dlc", "demo")
+    stamp = datetime.fromtimestamp(BASE_TS, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S.000000")
+    for i, appid in enumerate(apps["appids"].tolist()):
+        pos, neg = int(apps["positive"][i]), int(apps["negative"][i])
+        recs = int(apps["recommendations"][i])
+        recs = recs if recs >= 0 else None
+        bare = bool(apps["never_fetched"][i])
+        #bare parents look like _ensure_app_parents rows: no storefront fields, no reviews
+        if bare:
+            pos = neg = 0
+            recs = None
+        metacritic = int(apps["metacritic"][i])
+        rows.append((
+            appid,
+            None if bare else apps["names"][i],
+            None if bare else kinds[int(apps["kind"][i])],
+            bool(apps["is_free"][i]) and not bare,
+            metacritic if metacritic >= 0 and not bare else None,
+            recs,
+            None if bare else _release_date(apps["released"][i]),
+            None if bare else int(apps["fetched"][i]),
+            pos, neg, None, stamp,
+            gem_score(pos, neg, recs),
+        ))
+    return rows
+
+
+def popularity_cdf(positive: np.ndarray) -> np.ndarray:
+    cdf = np.cumsum((positive.astype(np.float64) + 1.0) ** 0.7)
+    return cdf / cdf[-1]
+
+
+def make_libraries(appids: np.ndarray, positive: np.ndarray, users: int, mean_size: int = 150,
+                   seed: int = 42) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    GetOwnedGames-shaped lists per user_id (1..users). Sizes are log-normal
+    around mean_size, titles are drawn with probability ~ reviews^0.7 so
+    popular games show up in most libraries and gems in a few.
+    """
+    rng = np.random.default_rng(seed + 1)
+    cdf = popularity_cdf(positive)
+    sizes = np.clip(np.rint(rng.lognormal(np.log(mean_size), 0.9, users)), 1, len(appids)).astype(np.int64)
+    libraries = {}
+    for user_id, size in enumerate(sizes.tolist(), start=1):
+        libraries[user_id] = library_games(appids, cdf, size, rng)
+    return libraries
+
+
+def library_games(appids: np.ndarray, cdf: np.ndarray, size: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    #oversample with replacement and dedupe, exact sampling without replacement is O(catalog) per user
+    draws = np.minimum(np.searchsorted(cdf, rng.random(int(size * 1.5) + 8), side="right"), len(appids) - 1)
+    _, first = np.unique(draws, return_index=True)
+    positions = draws[np.sort(first)][:size]
+    #first occurrences in draw order, truncating sorted uniques would favour low appids
+    played = rng.random(len(positions)) >= 0.3
+    playtime = np.where(played, np.rint(rng.lognormal(5.5, 1.6, len(positions))), 0).astype(np.int64)
+    last_played = BASE_TS - np.rint(rng.exponential(90 * 86400, len(positions))).astype(np.int64)
+    return [
+        {"appid": int(appids[p]), "playtime_forever": int(t), "rtime_last_played": int(r) if t else None}
+        for p, t, r in zip(positions.tolist(), playtime.tolist(), last_played.tolist())
+    ]
+
+
+def generate(path: str, apps: int = 10_000, users: int = 200, library_mean: int = 150,
+             seed: int = 42, unfetched: float = 0.02) -> Dict[str, Any]:
+    """Create a fresh SQLite database at `path` (schema from the models) and fill it."""
+    from sqlalchemy import create_engine
+    from app.extensions import db
+    from app.services.search import ensure_search_index
+    #app is imported here, not at the top: the harness sets its config env before the first import
+    started = time.monotonic()
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{os.path.abspath(path)}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    catalog = make_apps(apps, seed, unfetched)
+    libraries = make_libraries(catalog["appids"], catalog["positive"], users, library_mean, seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA journal_mode=MEMORY")
+        #throwaway database, durability doesn't matter while loading
+        with conn:
+            conn.executemany(
+                "INSERT INTO apps (appid, name, type, is_free, metacritic_score, recommendations_total,"
+                " release_date_raw, last_fetched_ts, positive, negative, players, last_updated, score)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                app_rows(catalog),
+            )
+            fetched = ~catalog["never_fetched"]
+            conn.executemany(
+                "INSERT INTO app_genres (appid, genre) VALUES (?, ?)",
+                ((int(a), g) for a, ok, gs in zip(catalog["appids"], fetched, catalog["genres"]) if ok for g in gs),
+            )
+            conn.executemany(
+                "INSERT INTO app_categories (appid, category) VALUES (?, ?)",
+                ((int(a), c) for a, ok, cs in zip(catalog["appids"], fetched, catalog["categories"]) if ok for c in cs),
+            )
+            conn.executemany(
+                "INSERT INTO owned_games (user_id, appid, playtime_forever, rtime_last_played) VALUES (?, ?, ?, ?)",
+                ((user_id, g["appid"], g["playtime_forever"], g["rtime_last_played"])
+                 for user_id, games in libraries.items() for g in games),
+            )
+            conn.executemany(
+                "INSERT INTO steam_links (user_id, steamid64) VALUES (?, ?)",
+                ((user_id, str(76561198000000000 + user_id)) for user_id in libraries),
+            )
+    finally:
+        conn.close()
+
+    engine = create_engine(f"sqlite:///{os.path.abspath(path)}")
+    ensure_search_index(engine)
+    #new FTS table -> one 'rebuild' over all names
+    engine.dispose()
+    return {
+        "path": path,
+        "apps": apps,
+        "users": users,
+        "owned_games": sum(len(g) for g in libraries.values()),
+        "seed": seed,
+        "elapsed_seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog + user libraries into SQLite")
+    parser.add_argument("path", help="database file to (re)create")
+    parser.add_argument("--apps", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--library-mean", type=int, default=150, help="typical games per library")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--unfetched", type=float, default=0.02, help="share of apps never fetched")
+    args = parser.parse_args()
+    print("generated:", generate(args.path, args.apps, args.users, args.library_mean, args.seed, args.unfetched))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.backfill_queue import run_worker, queue_stats
+
+"""
+Metadata backfill worker, run as many of these as you like:
+    python -m scripts.backfill_worker          # poll forever
+    python -m scripts.backfill_worker --once   # drain what's due and exit
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Claim and process metadata backfill jobs")
+    parser.add_argument("--once", action="store_true", help="exit when nothing is due")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--idle-sleep", type=float, default=5.0, help="seconds to wait when the queue is empty")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    totals = run_worker(app, batch_size=args.batch_size, once=args.once, idle_sleep=args.idle_sleep)
+    print("processed:", totals)
+    with app.app_context():
+        print("queue:", queue_stats())
+
+if __name__ == "__main__":
+    main()
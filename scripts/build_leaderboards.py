@@ -0,0 +1,31 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.leaderboards import build_leaderboards
+
+"""
+Rebuilds the materialized hidden gems leaderboards (global, per genre, per
+category) and swaps them in atomically. Run from cron, e.g. every 15 minutes:
+    python -m scripts.build_leaderboards
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize top gems leaderboards")
+    parser.add_argument("--size", type=int, default=None, help="rows kept per board")
+    parser.add_argument("--min-reviews", type=int, action="append", default=None,
+                        help="threshold to materialize, repeatable (default LEADERBOARD_MIN_REVIEWS)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    with app.app_context():
+        result = build_leaderboards(
+            size=args.size or app.config.get("LEADERBOARD_SIZE", 200),
+            thresholds=args.min_reviews or app.config.get("LEADERBOARD_MIN_REVIEWS", [50]),
+        )
+    print("leaderboards:", result)
+
+if __name__ == "__main__":
+    main()
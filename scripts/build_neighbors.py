@@ -0,0 +1,41 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.models.similarity import AppNeighbor
+from app.extensions import db
+from app.services.similarity import build_neighbors, build_incremental
+
+"""
+Builds the "more like this" neighbor table:
+    python -m scripts.build_neighbors            # only apps marked dirty since the last build
+    python -m scripts.build_neighbors --full     # every app
+The first run always does a full build.
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute item-to-item neighbors")
+    parser.add_argument("--full", action="store_true", help="rebuild every app instead of just dirty ones")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    config = app.config
+    options = dict(
+        processes=args.processes or config.get("SIMILAR_PROCESSES", 4),
+        chunk_size=config.get("SIMILAR_CHUNK_SIZE", 256),
+        k=config.get("SIMILAR_K", 20),
+        feature_weight=config.get("SIMILAR_FEATURE_WEIGHT", 0.5),
+        max_owners=config.get("SIMILAR_MAX_OWNERS", 2000),
+    )
+    with app.app_context():
+        empty = db.session.query(AppNeighbor.appid).first() is None
+        if args.full or empty:
+            print("full build:", build_neighbors(None, **options))
+        else:
+            print("incremental build:", build_incremental(**options))
+
+if __name__ == "__main__":
+    main()
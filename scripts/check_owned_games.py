@@ -11,16 +11,18 @@ if not STEAMID64:
     raise SystemExit("Set STEAMID64 in your env (export STEAMID64=17_digit_id)")
 
 def main():
-    client = SteamClient()
+    app = create_app()
+    client = SteamClient.for_app(app)
+    #same config as the server, so this run reads/writes the shared disk cache too
     games, count = client.owned_games(STEAMID64, include_appinfo=True)
     print("game_count:", count)
     for g in games[:10]:  # limit print noise
         print(g["appid"], g.get("name"), g.get("playtime_forever", 0))
 
     # write to DB (inside app context)
-    app = create_app()
     with app.app_context():
-        stats = upsert_owned_games_only(USER_ID, games)
+        stats = upsert_owned_games_only(USER_ID, games, prune=count > 0 and len(games) >= count)
+        #only a complete, non-empty response may delete games the user no longer has
         print("sync stats:", stats)
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.catalog_import import import_catalog
+
+"""
+Offline bulk import of a local appdetails / review summary dump, no network needed:
+    python -m scripts.import_catalog dumps/appdetails.jsonl.gz
+    python -m scripts.import_catalog dumps/appdetails.json --batch-size 10000
+Progress is checkpointed next to the file (<path>.checkpoint), rerunning the
+same command resumes where it stopped. --restart ignores the checkpoint.
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a catalog dump into the database")
+    parser.add_argument("path", help=".json / .jsonl / .ndjson, optionally .gz")
+    parser.add_argument("--batch-size", type=int, default=5000, help="apps per transaction")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="start from the top even if a checkpoint exists")
+    parser.add_argument("--max-record-mb", type=float, default=64, help="largest single record accepted")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    def progress(report):
+        elapsed = max(report.elapsed_seconds, 1e-9)
+        print(f"batch {report.batches}: {report.records} records, {report.apps_written} apps, "
+              f"{report.records / elapsed:.0f} rec/s, {report.bytes_read / elapsed / 1e6:.1f} MB/s", flush=True)
+
+    app = create_app()
+    with app.app_context():
+        report = import_catalog(args.path, batch_size=args.batch_size, checkpoint_path=args.checkpoint,
+                                resume=not args.restart, progress=progress,
+                                max_record=int(args.max_record_mb * (1 << 20)))
+    print("import:", report.as_dict())
+
+if __name__ == "__main__":
+    main()
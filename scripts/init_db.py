@@ -0,0 +1,30 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.schema import init_schema, missing_tables
+
+"""
+Creates the tables and the search index. Run once per deploy, before the
+workers start (production config doesn't create the schema on boot):
+    python -m scripts.init_db
+    python -m scripts.init_db --check   # exit 1 if any table is missing
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the database schema and search index")
+    parser.add_argument("--check", action="store_true", help="only report missing tables")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    with app.app_context():
+        if args.check:
+            missing = missing_tables()
+            print("missing tables:", missing or "none")
+            raise SystemExit(1 if missing else 0)
+        print("schema:", init_schema())
+
+if __name__ == "__main__":
+    main()
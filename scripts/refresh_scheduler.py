@@ -0,0 +1,25 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.refresh_scheduler import run_scheduler
+
+"""
+Staleness-driven catalog refresh, budgeted by REFRESH_REQUESTS_PER_MINUTE:
+    python -m scripts.refresh_scheduler          # run forever, one cycle a minute
+    python -m scripts.refresh_scheduler --once   # a single cycle
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the most valuable stale apps within an API budget")
+    parser.add_argument("--once", action="store_true", help="run one cycle and exit")
+    parser.add_argument("--cycle-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    print("refreshed:", run_scheduler(app, once=args.once, cycle_seconds=args.cycle_seconds))
+
+if __name__ == "__main__":
+    main()
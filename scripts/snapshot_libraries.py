@@ -0,0 +1,32 @@
+import argparse, logging
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app import create_app
+from app.services.library_store import LibraryStore
+
+"""
+Rewrites the owned_games snapshot file (LIBRARY_STORE_PATH) that workers
+memory-map instead of scanning the table. Run from cron more often than
+LIBRARY_RELOAD_SECONDS, e.g. every 30 minutes:
+    python -m scripts.snapshot_libraries
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the library store snapshot file")
+    parser.add_argument("--path", default=None, help="defaults to LIBRARY_STORE_PATH")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    app = create_app()
+    path = args.path or app.config.get("LIBRARY_STORE_PATH", "")
+    if not path:
+        parser.error("set LIBRARY_STORE_PATH or pass --path")
+    with app.app_context():
+        store = LibraryStore(path=path, reload_interval=0)
+        #reload_interval=0 treats any existing file as stale, so this always scans and rewrites it
+        store.load()
+    print("library snapshot:", path, store.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+from dotenv import load_dotenv
+load_dotenv()  # loads .env at project root
+
+from app.config import get_config
+from app.services.disk_cache import DiskCache
+
+"""
+Load or dump the shared on-disk steam response cache.
+    python -m scripts.warm_steam_cache load fixtures/steam.jsonl
+    python -m scripts.warm_steam_cache dump fixtures/steam.jsonl
+Fixture lines are {"url": ..., "params": {...}, "data": {...}} (or {"key": ..., "data": ...}).
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm or dump the steam disk cache")
+    parser.add_argument("action", choices=["load", "dump", "stats"])
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--keep-timestamps", action="store_true", help="keep stored_at from the dump instead of now")
+    args = parser.parse_args()
+
+    config = get_config("dev")
+    if not config.STEAM_DISK_CACHE_PATH:
+        raise SystemExit("STEAM_DISK_CACHE_PATH is empty, disk cache is disabled")
+    cache = DiskCache(config.STEAM_DISK_CACHE_PATH, ttl=config.STEAM_CACHE_TTL_SECONDS,
+                      max_bytes=config.STEAM_DISK_CACHE_MAX_BYTES)
+    if args.action == "stats":
+        print(cache.stats())
+        return
+    if not args.path:
+        raise SystemExit("path is required for load/dump")
+    if args.action == "load":
+        print("loaded:", cache.warm_from_file(args.path, keep_timestamps=args.keep_timestamps))
+    else:
+        print("dumped:", cache.dump(args.path))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# tests/conftest.py
+import os
+
+os.environ.update(STEAM_DISK_CACHE_PATH="", RESPONSE_CACHE_PATH="", PRELOAD_RANKING="0", PROFILER_ENABLED="0")
+#config classes read the environment once on import, before any test builds an app
+
+import pytest
+from app import create_app
+from app.config import DevConfig
+from app.extensions import db
+from app.models.appdetails import App, AppGenre
+from benchmarks.fake_steam import FakeSteam
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Build an app on its own SQLite file, config keys passed as overrides. Apps made by one test share the file."""
+    apps = []
+
+    def make(**overrides):
+        overrides.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+        for key, value in overrides.items():
+            monkeypatch.setattr(DevConfig, key, value, raising=False)
+        app = create_app("dev")
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_apps(app):
+    """Insert App rows through the ORM (so score is computed), kwargs per row."""
+    def add(*rows):
+        with app.app_context():
+            for row in rows:
+                genres = row.pop("genres", [])
+                db.session.add(App(**row))
+                for genre in genres:
+                    db.session.add(AppGenre(appid=row["appid"], genre=genre))
+            db.session.commit()
+    return add
+
+
+@pytest.fixture
+def fake_steam():
+    fake = FakeSteam().start()
+    yield fake
+    fake.stop()
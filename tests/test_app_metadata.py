@@ -0,0 +1,62 @@
+from app.extensions import db
+from app.models.appdetails import App, AppCategory, AppGenre, gem_score
+from app.services.app_metadata import _parse_app_payload, ingest_app_metadata
+from app.signals import catalog_updated
+
+
+def _pivot(model, column, appid):
+    return sorted(getattr(row, column) for row in model.query.filter_by(appid=appid))
+
+
+def test_parse_app_payload():
+    raw = {"570": {"success": True, "data": {
+        "steam_appid": 570, "name": "Dota 2", "type": "game", "is_free": True,
+        "metacritic": {"score": "90"}, "recommendations": {"total": "bad"},
+        "genres": [{"description": "Action"}, {"id": 1}], "categories": [{"description": "Co-op"}],
+    }}}
+    parsed = _parse_app_payload(raw, 570)
+    assert parsed["metacritic_score"] == 90
+    assert parsed["recommendations_total"] is None
+    assert (parsed["genres"], parsed["categories"]) == (["Action"], ["Co-op"])
+    assert _parse_app_payload({"570": {"success": False}}, 570) is None
+
+
+def test_bulk_ingest_writes_apps_pivots_and_scores(app):
+    metas = [{"appid": a, "name": f"App {a}", "positive": 90, "negative": 10, "recommendations_total": 500,
+              "genres": ["Action", "Action", "RPG"], "categories": ["Co-op"]} for a in range(1, 1201)]
+    with app.app_context():
+        assert ingest_app_metadata(metas + [None], chunk_size=500) == 1200
+        assert App.query.count() == 1200
+        assert _pivot(AppGenre, "genre", 7) == ["Action", "RPG"]
+        assert db.session.get(App, 7).score == gem_score(90, 10, 500)
+
+
+def test_partial_rows_leave_other_columns_alone(app):
+    with app.app_context():
+        ingest_app_metadata([{"appid": 1, "name": "A", "positive": 90, "negative": 10,
+                              "genres": ["Action"], "categories": ["Co-op"]}])
+        ingest_app_metadata([{"appid": 1, "name": "A2", "genres": ["RPG"]}])
+        ingest_app_metadata([{"appid": 1, "positive": 10, "negative": 90}])
+        db.session.expire_all()
+        row = db.session.get(App, 1)
+        assert (row.name, row.positive, row.negative) == ("A2", 10, 90)
+        assert row.score == gem_score(10, 90, None)
+        assert _pivot(AppGenre, "genre", 1) == ["RPG"]
+        assert _pivot(AppCategory, "category", 1) == ["Co-op"]
+
+
+def test_duplicates_in_a_chunk_last_one_wins(app):
+    with app.app_context():
+        ingest_app_metadata([{"appid": 1, "name": "First"}, {"appid": 1, "name": "Second"}])
+        assert db.session.get(App, 1).name == "Second"
+
+
+def test_each_chunk_announces_its_appids(app):
+    seen = []
+
+    def listener(sender, appids=None, **extra):
+        seen.append(sorted(appids))
+
+    with catalog_updated.connected_to(listener), app.app_context():
+        ingest_app_metadata([{"appid": a, "name": str(a)} for a in (1, 2, 3)], chunk_size=2)
+    assert seen == [[1, 2], [3]]
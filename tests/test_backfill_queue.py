@@ -0,0 +1,39 @@
+import time
+from app.extensions import db
+from app.models.jobs import BackfillJob
+from app.services.backfill_queue import claim_batch, enqueue_appids, jobs
+
+
+def _settle(appid, status, at):
+    db.session.execute(jobs.update().where(jobs.c.appid == appid).values(status=status, next_run_at=at, attempts=5))
+
+
+def _jobs():
+    db.session.expire_all()
+    return {j.appid: (j.status, j.attempts) for j in BackfillJob.query.all()}
+
+
+def test_enqueue_dedupes(app):
+    with app.app_context():
+        enqueue_appids([1, 1, 2])
+        enqueue_appids([2, 3])
+        db.session.commit()
+        assert _jobs() == {1: ("pending", 0), 2: ("pending", 0), 3: ("pending", 0)}
+
+
+def test_failed_and_missing_jobs_requeue_after_the_cooldown(app):
+    now = int(time.time())
+    with app.app_context():
+        enqueue_appids([1, 2, 3, 4, 5])
+        db.session.commit()
+        _settle(1, "failed", now - 7200)
+        _settle(2, "missing", now - 7200)
+        _settle(3, "failed", now - 60)
+        _settle(4, "done", now - 7200)
+        _settle(5, "running", now)
+        db.session.commit()
+        enqueue_appids([1, 2, 3, 4, 5], requeue_after=3600)
+        db.session.commit()
+        assert _jobs() == {1: ("pending", 0), 2: ("pending", 0), 3: ("failed", 5),
+                           4: ("done", 5), 5: ("running", 5)}
+        assert sorted(job.appid for job in claim_batch("w", size=10)) == [1, 2]
@@ -0,0 +1,51 @@
+import json
+import pytest
+from app.services import batch
+from app.services.app_metadata import ingest_app_metadata
+from app.services.owned_games_sync import upsert_owned_games_only
+
+
+@pytest.fixture
+def catalog(app):
+    app.config.update(LEADERBOARDS_ENABLED=False, BATCH_CHUNK_SIZE=2)
+    with app.app_context():
+        ingest_app_metadata([{"appid": a, "name": f"App {a}", "positive": 100 - a, "negative": a,
+                              "genres": ["Action" if a % 2 else "RPG"], "categories": []} for a in range(1, 21)])
+        upsert_owned_games_only(7, [{"appid": a, "playtime_forever": 600} for a in (1, 3, 5)])
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_matches_single_requests_in_order(client, catalog):
+    body = {"min_reviews": 1, "limit": 5, "requests": [
+        {"id": "a", "user_id": 7}, {"id": "b", "genre": "RPG"}, {"id": "c", "limit": "x"}, {"id": "d"}]}
+    lines = _lines(client.post("/api/recommendations/batch", json=body))
+    assert [line["id"] for line in lines] == ["a", "b", "c", "d"]
+    assert "error" in lines[2]
+    for line, query in zip([lines[0], lines[1], lines[3]], ["user_id=7", "genre=RPG", ""]):
+        single = client.get(f"/api/recommendations?min_reviews=1&limit=5&{query}").get_json()
+        assert [r["appid"] for r in line["results"]] == [r["appid"] for r in single]
+    assert not {1, 3, 5} & {r["appid"] for r in lines[0]["results"]}
+
+
+@pytest.mark.parametrize("body", [[1, 2], 5, "x", {"user_ids": 7}, {"requests": []}])
+def test_malformed_bodies_are_400(client, body):
+    assert client.post("/api/recommendations/batch", json=body).status_code == 400
+
+
+def test_a_failing_request_does_not_cut_the_stream(client, catalog, monkeypatch):
+    original = batch.matching_appids
+
+    def flaky(q, match="substring"):
+        if q == "boom":
+            raise RuntimeError("boom")
+        return original(q, match)
+
+    monkeypatch.setattr(batch, "matching_appids", flaky)
+    body = {"min_reviews": 1, "requests": [{"id": 1, "q": "App"}, {"id": 2, "q": "boom"}, {"id": 3}]}
+    lines = _lines(client.post("/api/recommendations/batch", json=body))
+    assert [line["id"] for line in lines] == [1, 2, 3]
+    assert lines[1] == {"id": 2, "error": "internal error"}
+    assert lines[0]["results"] and lines[2]["results"]
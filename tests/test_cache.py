@@ -0,0 +1,96 @@
+import threading, time
+from app.services.cache import LRUCache, Stamped
+
+
+def test_evicts_least_recently_used_first():
+    cache = LRUCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_and_oversized_entries():
+    cache = LRUCache(ttl=60, max_bytes=100)
+    cache.put("big", "x" * 500)
+    assert cache.get("big") is None
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    cache.put("c", "z" * 40)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 100
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(ttl=0.05)
+    cache.put("a", 1)
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_concurrent_misses_share_one_load():
+    cache = LRUCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_failed_loads_are_not_cached():
+    cache = LRUCache(ttl=60)
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    for _ in range(2):
+        try:
+            cache.get_or_load("k", boom)
+        except RuntimeError:
+            pass
+    assert cache.stats()["misses"] == 2
+    assert cache.get_or_load("k", lambda: 1) == 1
+
+
+def test_stale_while_revalidate_serves_old_value_and_refreshes_once():
+    cache = LRUCache(ttl=0.05, stale_while_revalidate=True, max_stale=10)
+    cache.put("k", "old")
+    time.sleep(0.06)
+    loads = []
+    go = threading.Event()
+
+    def loader():
+        loads.append(1)
+        go.wait(1)
+        return "new"
+
+    assert cache.get_or_load("k", loader) == "old"
+    assert cache.get_or_load("k", loader) == "old"
+    go.set()
+    deadline = time.time() + 1
+    while cache.get("k") is None and time.time() < deadline:
+        time.sleep(0.005)
+    assert cache.get_or_load("k", loader) == "new"
+    assert len(loads) == 1
+
+
+def test_stamped_results_keep_their_age():
+    cache = LRUCache(ttl=10)
+    assert cache.get_or_load("k", lambda: Stamped("v", time.time() - 20)) == "v"
+    assert cache.get("k") is None
@@ -0,0 +1,70 @@
+import io, json
+import pytest
+from app.services import catalog_import
+from app.services.catalog_import import _JsonStream, iter_jsonl
+
+
+def _details(appid):
+    return {str(appid): {"success": True, "data": {"steam_appid": appid, "name": f"App {appid}", "type": "game"}}}
+
+
+def test_json_array_streams_across_buffer_edges(monkeypatch):
+    monkeypatch.setattr(catalog_import, "READ_SIZE", 16)
+    data = json.dumps([_details(a) for a in range(1, 50)]).encode()
+    records = [record for record, _, _ in _JsonStream(io.BytesIO(data)).items()]
+    assert records == [_details(a) for a in range(1, 50)]
+
+
+def test_oversized_json_record_fails_with_its_offset(monkeypatch):
+    monkeypatch.setattr(catalog_import, "READ_SIZE", 64)
+    data = b'[{"a": 1}, {"b": "' + b"x" * 5000 + b'"}]'
+    stream = _JsonStream(io.BytesIO(data), max_record=1000).items()
+    assert next(stream)[0] == {"a": 1}
+    with pytest.raises(ValueError, match="byte 11"):
+        next(stream)
+
+
+def test_truncated_json_does_not_buffer_to_eof(monkeypatch):
+    monkeypatch.setattr(catalog_import, "READ_SIZE", 64)
+    reads = []
+    data = io.BytesIO(b'[{"a": 1}, {"b": [' + b"1," * 100000)
+    original = data.read
+    monkeypatch.setattr(data, "read", lambda size=-1: reads.append(size) or original(size))
+    with pytest.raises(ValueError):
+        list(_JsonStream(data, max_record=1000).items())
+    assert len(reads) * 64 < 2000
+
+
+def test_oversized_jsonl_line_is_skipped():
+    data = b'{"a": 1}\n{"b": "' + b"y" * 5000 + b'"}\n{"c": 3}\n'
+    located = list(iter_jsonl(io.BytesIO(data), max_record=1000))
+    assert [record for record, _, _ in located] == [{"a": 1}, None, {"c": 3}]
+    assert located[-1][1] == len(data)
+
+
+def test_import_resumes_from_its_checkpoint(app, tmp_path):
+    from app.models.appdetails import App
+    from app.services.catalog_import import import_catalog
+    path = tmp_path / "dump.jsonl"
+    path.write_text("".join(json.dumps(_details(a)) + "\n" for a in range(1, 11)))
+    with app.app_context():
+        first = import_catalog(str(path), batch_size=4)
+        assert (first.records, first.apps_written) == (10, 10)
+        assert import_catalog(str(path), batch_size=4).records == 0
+        assert App.query.count() == 10
+
+
+def test_import_does_not_look_freshly_fetched(app, add_apps, tmp_path):
+    from app.extensions import db
+    from app.models.appdetails import App
+    add_apps(dict(appid=1, name="Fetched", last_fetched_ts=2_000_000_000))
+    path = tmp_path / "dump.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in (
+        {"appid": 1, "appdetails": _details(1), "last_fetched_ts": 1_000_000_000},
+        {"appid": 2, "appdetails": _details(2), "last_fetched_ts": 1_000_000_000},
+        {"appid": 3, "appdetails": _details(3)},
+    )))
+    with app.app_context():
+        assert catalog_import.import_catalog(str(path)).apps_written == 3
+        fetched = {a: db.session.get(App, a).last_fetched_ts for a in (1, 2, 3)}
+    assert fetched == {1: 2_000_000_000, 2: 1_000_000_000, 3: None}
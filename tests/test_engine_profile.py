@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.services import engine_profile
+from app.services.engine_profile import READ_BIND, engine_options, read_bind, sqlite_read_uri
+
+
+def test_engine_options_per_backend():
+    on = {"DB_TUNING": True, "DB_POOL_SIZE": 3}
+    assert engine_options("sqlite:///x.db", {}) == {}
+    assert engine_options("sqlite:///:memory:", on) == {}
+    sqlite = engine_options("sqlite:///x.db", on)
+    assert sqlite["pool_size"] == 3 and sqlite["connect_args"] == {"timeout": 5.0}
+    server = engine_options("postgresql://u:p@db/steam", on)
+    assert server["pool_pre_ping"] and "connect_args" not in server
+
+
+def test_read_bind_targets():
+    routing = {"DB_READ_ROUTING": True}
+    assert read_bind("sqlite:///x.db", {}) is None
+    assert read_bind("postgresql://db/steam", routing) is None
+    assert read_bind("sqlite:///x.db", routing)["url"] == sqlite_read_uri("sqlite:///x.db")
+    assert "mode=ro" in sqlite_read_uri("sqlite:////tmp/x.db")
+    replica = read_bind("postgresql://db/steam", {**routing, "DATABASE_READ_URL": "postgresql://replica/steam"})
+    assert replica == {"url": "postgresql://replica/steam", "connect_args": {}}
+
+
+def test_tuned_sqlite_runs_in_wal(make_app):
+    app = make_app(DB_TUNING=True, SQLITE_SYNCHRONOUS="NORMAL")
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_read_only_views_use_the_read_engine(make_app, add_apps):
+    app = make_app(DB_READ_ROUTING=True)
+    add_apps(dict(appid=1, name="A", positive=90, negative=10))
+    with app.app_context():
+        read_engine = db.engines[READ_BIND]
+        with pytest.raises(OperationalError):
+            with read_engine.begin() as connection:
+                connection.execute(text("DELETE FROM apps"))
+        token = engine_profile._reading.set(True)
+        try:
+            assert db.session.get_bind() is read_engine
+            assert db.session.get_bind(clause=text("SELECT 1")) is read_engine
+        finally:
+            engine_profile._reading.reset(token)
+        assert db.session.get_bind() is not read_engine
+    rows = app.test_client().get("/api/recommendations?min_reviews=1").get_json()
+    assert [row["appid"] for row in rows] == [1]
@@ -0,0 +1,52 @@
+import pytest
+from app.services.app_metadata import ingest_app_metadata
+from app.services.facets import get_facet_index
+
+
+@pytest.fixture
+def catalog(app):
+    app.config.update(LEADERBOARDS_ENABLED=False)
+    with app.app_context():
+        ingest_app_metadata([
+            {"appid": 1, "name": "A", "positive": 90, "negative": 10, "is_free": True, "metacritic_score": 80,
+             "genres": ["Action"], "categories": ["Co-op"]},
+            {"appid": 2, "name": "B", "positive": 80, "negative": 20, "is_free": False, "metacritic_score": 60,
+             "genres": ["RPG"], "categories": ["Co-op"]},
+            {"appid": 3, "name": "C", "positive": 70, "negative": 30, "is_free": False,
+             "genres": ["Action", "RPG"], "categories": []},
+        ])
+
+
+def _appids(client, query):
+    return sorted(row["appid"] for row in client.get(f"/api/recommendations?min_reviews=1&{query}").get_json())
+
+
+def test_values_of_one_facet_or_and_facets_and(client, catalog):
+    assert _appids(client, "genre=Action") == [1, 3]
+    assert _appids(client, "genre=action,rpg") == [1, 2, 3]
+    assert _appids(client, "genre=RPG&category=Co-op") == [2]
+    assert _appids(client, "genre=RPG&is_free=false&min_metacritic=50") == [2]
+    assert _appids(client, "genre=Nope") == []
+    assert client.get("/api/recommendations?is_free=maybe").status_code == 400
+
+
+def test_counts_leave_their_own_facet_out(client, catalog):
+    body = client.get("/api/recommendations?min_reviews=1&genre=RPG&include_facets=1").get_json()
+    assert sorted(row["appid"] for row in body["results"]) == [2, 3]
+    assert body["facets"]["genre"] == {"Action": 2, "RPG": 2}
+    assert body["facets"]["category"] == {"Co-op": 1}
+    assert body["facets"]["is_free"] == {"true": 0, "false": 2}
+
+
+def test_genre_only_change_is_reindexed(app, client, catalog):
+    assert _appids(client, "genre=Strategy") == []
+    with app.app_context():
+        index, snapshot = get_facet_index()
+        version = snapshot.version
+        ingest_app_metadata([{"appid": 2, "genres": ["Strategy"]}])
+        #same review counts, only the pivot rows (and last_updated) moved
+        snapshot.expire()
+        index, snapshot = get_facet_index()
+        assert snapshot.version > version
+    assert _appids(client, "genre=Strategy") == [2]
+    assert _appids(client, "genre=RPG") == [3]
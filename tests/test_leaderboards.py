@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import inspect, text
+from app.extensions import db
+from app.services.leaderboards import build_leaderboards
+
+
+@pytest.fixture
+def catalog(add_apps):
+    add_apps(*(dict(appid=100 + i, name=f"App {i}", positive=60 + i, negative=40 - i % 7, recommendations_total=1000,
+                    genres=["Action" if i % 2 else "RPG"]) for i in range(20)))
+
+
+def _get(client, query=""):
+    response = client.get(f"/api/recommendations?min_reviews=50{query}")
+    assert response.status_code == 200
+    return [row["appid"] for row in response.get_json()], response.headers.get("X-Next-Cursor")
+
+
+def _live(app, client, query):
+    app.config["LEADERBOARDS_ENABLED"] = False
+    try:
+        return _get(client, query)
+    finally:
+        app.config["LEADERBOARDS_ENABLED"] = True
+
+
+def test_boards_match_live_scoring(app, client, catalog):
+    with app.app_context():
+        assert build_leaderboards(size=10)["boards"] == 3
+    for query in ("&limit=5", "&limit=5&genre=Action", "&limit=3&category=Nope", "&limit=10&genre=rpg"):
+        assert _get(client, query) == _live(app, client, query)
+
+
+def test_board_is_served_until_the_next_swap(app, client, catalog):
+    with app.app_context():
+        build_leaderboards(size=10)
+        db.session.execute(text("UPDATE apps SET score = 5 WHERE appid = 100"))
+        db.session.commit()
+    assert 100 not in _get(client, "&limit=5")[0]
+    assert _live(app, client, "&limit=5")[0][0] == 100
+    with app.app_context():
+        build_leaderboards(size=10)
+        tables = inspect(db.engine).get_table_names()
+    assert _get(client, "&limit=5")[0][0] == 100
+    assert not [t for t in tables if "_shadow" in t or t.endswith("_old")]
+
+
+def test_pages_past_the_board_fall_back_to_live_scoring(app, client, catalog):
+    with app.app_context():
+        build_leaderboards(size=4)
+    first, cursor = _get(client, "&limit=3")
+    second, _ = _get(client, f"&limit=3&cursor={cursor}")
+    live_first, live_cursor = _live(app, client, "&limit=3")
+    assert (first, second) == (live_first, _live(app, client, f"&limit=3&cursor={live_cursor}")[0])
+    assert len(set(first + second)) == 6
+
+
+def test_leftover_shadow_tables_are_dropped(app, client, catalog):
+    with app.app_context():
+        db.session.execute(text("CREATE TABLE leaderboard_entries_shadow_1 (x INTEGER)"))
+        db.session.commit()
+        build_leaderboards(size=4)
+        assert "leaderboard_entries_shadow_1" not in inspect(db.engine).get_table_names()
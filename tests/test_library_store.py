@@ -0,0 +1,94 @@
+import time
+import numpy as np
+import pytest
+from app.extensions import db
+from app.models.appdetails import OwnedGame
+from app.services.app_metadata import ingest_app_metadata
+from app.services.library_store import LibraryStore, get_library_store
+from app.services.owned_games_sync import upsert_owned_games_only
+from app.services.personalize import get_personalizer
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        ingest_app_metadata([{"appid": a, "name": f"App {a}", "positive": 90, "negative": 10,
+                              "genres": ["Action" if a % 2 else "RPG"], "categories": ["Co-op"]}
+                             for a in range(1, 21)])
+        upsert_owned_games_only(7, [{"appid": a, "playtime_forever": 60 * a} for a in (1, 2, 3)])
+
+
+def _appids(library):
+    return [int(a) for a in library.appid]
+
+
+def test_load_matches_owned_games(app, catalog):
+    with app.app_context():
+        store = LibraryStore()
+        store.load()
+        library = store.library(7)
+        assert _appids(library) == [1, 2, 3]
+        assert list(library.playtime) == [60, 120, 180]
+        assert len(store.library(8).appid) == 0
+
+
+def test_in_process_syncs_patch_the_store(app, catalog):
+    with app.app_context():
+        store = get_library_store()
+        upsert_owned_games_only(7, [{"appid": a, "playtime_forever": 60 * a} for a in (1, 2, 3, 4)])
+        assert _appids(store.library(7)) == [1, 2, 3, 4]
+        upsert_owned_games_only(7, [{"appid": 1, "playtime_forever": 5}])
+        assert int(store.library(7).playtime[0]) == 5
+
+
+def test_snapshot_file_round_trip(app, catalog, tmp_path):
+    path = str(tmp_path / "libraries.snap")
+    with app.app_context():
+        LibraryStore(path=path).load()
+        mapped = LibraryStore(path=path)
+        mapped.load()
+        assert mapped.source == "file"
+        assert _appids(mapped.library(7)) == [1, 2, 3]
+
+
+def test_other_process_syncs_are_picked_up(make_app, catalog):
+    worker, writer = make_app(), make_app(LIBRARY_CHECK_SECONDS=3600)
+    with worker.app_context():
+        personalizer, snapshot = get_personalizer()
+        profile = personalizer.profile(snapshot, 7)
+        store = personalizer.libraries
+    with writer.app_context():
+        upsert_owned_games_only(7, [{"appid": a, "playtime_forever": 60 * a} for a in (2, 3, 9)], prune=True)
+    with worker.app_context():
+        assert _appids(store.library(7)) == [1, 2, 3]
+        assert store.refresh_changed() == [7]
+        assert _appids(store.library(7)) == [2, 3, 9]
+        assert store.refresh_changed() == []
+        rebuilt = personalizer._profile_from_library(snapshot, 7)
+        np.testing.assert_allclose(personalizer._vector(profile, time.time()), personalizer._vector(rebuilt, time.time()))
+
+
+def test_new_response_version_reloads_changed_libraries(make_app, tmp_path, catalog):
+    settings = dict(RESPONSE_CACHE_PATH=str(tmp_path / "responses.db"), LIBRARY_CHECK_SECONDS=3600)
+    worker, writer = make_app(**settings), make_app(**settings)
+    client = worker.test_client()
+    first = [row["appid"] for row in client.get("/api/recommendations?user_id=7&min_reviews=1&limit=20").get_json()]
+    with writer.app_context():
+        upsert_owned_games_only(7, [{"appid": first[0], "playtime_forever": 1}])
+    second = [row["appid"] for row in client.get("/api/recommendations?user_id=7&min_reviews=1&limit=20").get_json()]
+    assert first[0] not in second
+
+
+def test_reload_bumps_generation_only_when_data_differs(app, catalog):
+    with app.app_context():
+        store = get_library_store()
+        generation = store.generation
+        upsert_owned_games_only(7, [{"appid": 4, "playtime_forever": 1}])
+        store.load()
+        assert store.generation == generation
+        #the overlay already had that sync
+        db.session.add(OwnedGame(user_id=8, appid=1, playtime_forever=5))
+        db.session.commit()
+        store.load()
+        assert store.generation == generation + 1
+        assert _appids(store.library(8)) == [1]
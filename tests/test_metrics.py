@@ -0,0 +1,48 @@
+import os, time
+import pytest
+from app.services.metrics import METRICS
+
+
+def test_requests_and_their_sql_are_counted(client, add_apps):
+    add_apps(dict(appid=1, name="A", positive=90, negative=10))
+    route = "/api/recommendations"
+    before = METRICS.requests.value(route, "GET", "200")
+    statements = METRICS.request_sql_statements.count(route)
+    assert client.get("/api/recommendations?min_reviews=1").status_code == 200
+    assert METRICS.requests.value(route, "GET", "200") == before + 1
+    assert METRICS.request_sql_statements.count(route) == statements + 1
+    body = client.get("/api/metrics").get_data(as_text=True)
+    assert 'http_requests_total{route="/api/recommendations",method="GET",status="200"}' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+
+
+def test_metrics_off_installs_nothing(make_app):
+    assert make_app(METRICS_ENABLED=False).test_client().get("/api/metrics").status_code == 404
+
+
+@pytest.fixture
+def profiled(make_app, tmp_path):
+    """Client of a profiled app with a /api/nap route that runs long enough to be sampled."""
+    def make(**overrides):
+        app = make_app(PROFILER_ENABLED=True, PROFILER_INTERVAL_MS=1, PROFILER_DIR=str(tmp_path / "profiles"), **overrides)
+        app.add_url_rule("/api/nap", "nap", lambda: (time.sleep(0.05), "")[1])
+        return app.test_client()
+    return make
+
+
+def test_forced_profiles_need_the_token_and_are_rate_limited(profiled, tmp_path):
+    out = tmp_path / "profiles"
+    client = profiled(PROFILER_SLOW_MS=60000, PROFILER_FORCE_TOKEN="s3cret", PROFILER_FORCED_PER_MINUTE=1)
+    client.get("/api/nap")
+    client.get("/api/nap", headers={"X-Profile": "guess"})
+    assert not out.exists()
+    client.get("/api/nap", headers={"X-Profile": "s3cret"})
+    client.get("/api/nap", headers={"X-Profile": "s3cret"})
+    assert len(os.listdir(out)) == 1
+    #the second forced dump is over the per-minute budget
+
+
+def test_slow_requests_are_dumped_without_a_token(profiled, tmp_path):
+    profiled(PROFILER_SLOW_MS=10).get("/api/nap")
+    [name] = os.listdir(tmp_path / "profiles")
+    assert "GET_api_nap" in name and name.endswith(".folded")
@@ -0,0 +1,44 @@
+from app.extensions import db
+from app.models.appdetails import LibrarySync, OwnedGame
+from app.services.owned_games_sync import upsert_owned_games_only
+
+GAMES = [{"appid": a, "playtime_forever": a * 10, "rtime_last_played": 1700000000 + a} for a in (10, 20, 30)]
+
+
+def _library(user_id):
+    return {a: (p, lp) for a, p, lp in db.session.query(
+        OwnedGame.appid, OwnedGame.playtime_forever, OwnedGame.rtime_last_played).filter_by(user_id=user_id)}
+
+
+def test_sync_creates_and_updates_only_changes(app):
+    with app.app_context():
+        assert upsert_owned_games_only(1, GAMES)["created"] == 3
+        again = upsert_owned_games_only(1, [dict(GAMES[0], playtime_forever=999)] + GAMES[1:])
+        assert (again["created"], again["updated"], again["unchanged"]) == (0, 1, 2)
+        assert _library(1)[10] == (999, 1700000010)
+
+
+def test_empty_list_never_prunes(app):
+    with app.app_context():
+        upsert_owned_games_only(1, GAMES)
+        for prune in (False, True):
+            report = upsert_owned_games_only(1, [], prune=prune)
+            assert report["deleted"] == 0
+        assert set(_library(1)) == {10, 20, 30}
+
+
+def test_missing_games_are_only_pruned_when_asked(app):
+    with app.app_context():
+        upsert_owned_games_only(1, GAMES)
+        assert upsert_owned_games_only(1, GAMES[:1])["deleted"] == 0
+        assert set(_library(1)) == {10, 20, 30}
+        assert upsert_owned_games_only(1, GAMES[:1], prune=True)["diff"]["deleted"] == [20, 30]
+        assert set(_library(1)) == {10}
+
+
+def test_sync_stamps_library_syncs_only_on_change(app):
+    with app.app_context():
+        upsert_owned_games_only(1, GAMES)
+        stamped = db.session.get(LibrarySync, 1).synced_at
+        upsert_owned_games_only(1, GAMES)
+        assert db.session.get(LibrarySync, 1).synced_at == stamped
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+import pytest
+from app.extensions import db
+from app.models.appdetails import OwnedGame
+from app.services.app_metadata import ingest_app_metadata
+from app.services.owned_games_sync import upsert_owned_games_only
+from app.services.personalize import Personalizer, get_personalizer
+
+
+@pytest.fixture
+def catalog(app):
+    app.config.update(LEADERBOARDS_ENABLED=False)
+    with app.app_context():
+        ingest_app_metadata([{"appid": a, "name": f"App {a}", "positive": 90, "negative": 10,
+                              "genres": ["Action" if a <= 10 else "RPG"], "categories": []}
+                             for a in range(1, 21)])
+        upsert_owned_games_only(7, [{"appid": a, "playtime_forever": 600, "rtime_last_played": int(time.time())}
+                                    for a in (1, 2, 3)])
+
+
+def _vectors_match(personalizer, snapshot, profile):
+    now = time.time()
+    rebuilt = personalizer._profile_from_library(snapshot, profile.user_id)
+    np.testing.assert_allclose(personalizer._vector(profile, now), personalizer._vector(rebuilt, now))
+
+
+def test_owned_games_excluded_and_genre_affinity_wins(client, catalog):
+    rows = client.get("/api/recommendations?user_id=7&min_reviews=1&limit=20").get_json()
+    appids = [row["appid"] for row in rows]
+    assert not {1, 2, 3} & set(appids)
+    assert set(appids[:7]) == set(range(4, 11))
+
+
+def test_library_change_patch_matches_rebuild(app, catalog):
+    with app.app_context():
+        personalizer, snapshot = get_personalizer()
+        profile = personalizer.profile(snapshot, 7)
+        upsert_owned_games_only(7, [{"appid": 15, "playtime_forever": 3000, "rtime_last_played": int(time.time())}])
+        _vectors_match(personalizer, snapshot, profile)
+
+
+def test_genre_change_from_another_worker_patches_profiles(make_app, catalog):
+    worker, writer = make_app(RANKING_REFRESH_SECONDS=0), make_app()
+    with worker.app_context():
+        personalizer, snapshot = get_personalizer()
+        profile = personalizer.profile(snapshot, 7)
+    with writer.app_context():
+        ingest_app_metadata([{"appid": 2, "genres": ["RPG"]}])
+        #announced in the writer process only
+    with worker.app_context():
+        personalizer, snapshot = get_personalizer()
+        assert personalizer.profiles[7] is profile
+        row = personalizer.features.row_vectors([snapshot.row_of(2)])[snapshot.row_of(2)]
+        assert row[personalizer.features.vocab["genre:RPG"]] == 1.0
+        _vectors_match(personalizer, snapshot, profile)
+
+
+def test_library_reload_drops_profiles_instead_of_rebuilding(app, catalog):
+    with app.app_context():
+        personalizer, snapshot = get_personalizer()
+        personalizer.profile(snapshot, 7)
+        db.session.add(OwnedGame(user_id=7, appid=15, playtime_forever=60))
+        db.session.commit()
+        #behind the store's back, only a full reload sees it
+        personalizer.libraries.load()
+        personalizer, snapshot = get_personalizer()
+        assert 7 not in personalizer.profiles
+        assert personalizer.profile(snapshot, 7).long_term.any()
+
+
+def test_short_half_life_stays_finite(app, catalog):
+    with app.app_context():
+        personalizer, snapshot = get_personalizer()
+        fast = Personalizer(personalizer.libraries, half_life_days=1)
+        fast.sync(snapshot)
+        with np.errstate(over="raise"):
+            affinity = fast.affinity(snapshot, fast.profile(snapshot, 7))
+        assert np.isfinite(affinity).all() and affinity.max() > 0
+        with pytest.raises(ValueError):
+            Personalizer(personalizer.libraries, half_life_days=0.5)
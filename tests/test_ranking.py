@@ -0,0 +1,45 @@
+import pytest
+from app.models.appdetails import gem_score
+
+
+def _pages(client, limit=7, extra=""):
+    seen, cursor = [], None
+    while True:
+        response = client.get(f"/api/recommendations?limit={limit}&min_reviews=1{extra}"
+                              + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        seen += [row["appid"] for row in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+@pytest.fixture
+def tied_catalog(add_apps):
+    #30 apps on one score, interleaved with a few distinct ones above and below it
+    rows = [dict(appid=1000 + i * 7 % 30 * 3, name=f"Tie {i}", positive=80, negative=20,
+                 recommendations_total=100, is_free=False) for i in range(30)]
+    rows += [dict(appid=2000 + i, name=f"Other {i}", positive=50 + i * 10, negative=10,
+                  recommendations_total=100, is_free=True) for i in range(5)]
+    add_apps(*rows)
+    return sorted(((gem_score(r["positive"], r["negative"], r["recommendations_total"]), r["appid"]) for r in rows),
+                  reverse=True)
+
+
+def test_sql_pagination_walks_ties_once_in_order(app, client, tied_catalog):
+    app.config.update(RANKING_ENGINE="sql", LEADERBOARDS_ENABLED=False)
+    assert _pages(client) == [appid for _, appid in tied_catalog]
+
+
+def test_min_reviews_and_limit(app, client, add_apps):
+    app.config.update(LEADERBOARDS_ENABLED=False)
+    add_apps(dict(appid=1, name="Few", positive=3, negative=0), dict(appid=2, name="Many", positive=90, negative=10),
+             dict(appid=3, name="More", positive=80, negative=40))
+    body = client.get("/api/recommendations?min_reviews=50&limit=1").get_json()
+    assert [row["appid"] for row in body] == [2]
+    assert body[0] == {"appid": 2, "name": "Many", "pos_ratio": 0.9, "total_reviews": 100, "owners_estimate": 100}
+    assert [row["appid"] for row in client.get("/api/recommendations?min_reviews=50").get_json()] == [2, 3]
+
+
+def test_bad_cursor_is_rejected(client):
+    assert client.get("/api/recommendations?cursor=nope").status_code == 400
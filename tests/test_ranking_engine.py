@@ -0,0 +1,37 @@
+import pytest
+from .test_ranking import _pages, tied_catalog  # noqa: F401
+
+
+def test_memory_pagination_walks_ties_once_in_order(app, client, tied_catalog):
+    app.config.update(RANKING_ENGINE="memory", LEADERBOARDS_ENABLED=False)
+    assert _pages(client) == [appid for _, appid in tied_catalog]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 30, 50])
+def test_engines_agree(app, client, tied_catalog, limit):
+    app.config.update(LEADERBOARDS_ENABLED=False)
+    app.config["RANKING_ENGINE"] = "sql"
+    by_sql = _pages(client, limit)
+    app.config["RANKING_ENGINE"] = "memory"
+    assert _pages(client, limit) == by_sql
+
+
+def test_memory_top_k_keeps_ties_at_the_cut(app, client, tied_catalog):
+    app.config.update(RANKING_ENGINE="memory", LEADERBOARDS_ENABLED=False)
+    first = client.get("/api/recommendations?limit=7&min_reviews=1&is_free=false").get_json()
+    assert [row["appid"] for row in first] == [a for _, a in tied_catalog if a < 2000][:7]
+
+
+def test_snapshot_refresh_picks_up_writes(app, client, tied_catalog):
+    from app.services.app_metadata import ingest_app_metadata
+    from app.services.ranking_engine import get_snapshot
+    app.config.update(RANKING_ENGINE="memory", LEADERBOARDS_ENABLED=False)
+    with app.app_context():
+        snapshot = get_snapshot()
+        version = snapshot.version
+        ingest_app_metadata([{"appid": 5, "name": "New", "positive": 100, "negative": 0}])
+        snapshot.expire()
+        snapshot = get_snapshot()
+        assert snapshot.version > version
+        assert snapshot.row_of(5) is not None
+    assert client.get("/api/recommendations?limit=1&min_reviews=1").get_json()[0]["appid"] == 5
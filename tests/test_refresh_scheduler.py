@@ -0,0 +1,56 @@
+import time
+import pytest
+from app.extensions import db
+from app.models.jobs import AppRefreshState
+from app.services.cache import LRUCache
+from app.services.refresh_scheduler import refresh_apps, stalest_valuable
+from app.services.steam_client import SteamClient
+
+MIN_AGE = 100
+
+
+@pytest.fixture
+def stale_apps(add_apps):
+    old = int(time.time()) - 10 * MIN_AGE
+    add_apps(*(dict(appid=a, name=f"App {a}", positive=100, negative=10, last_fetched_ts=old) for a in (1, 2)))
+
+
+@pytest.fixture
+def steam(fake_steam):
+    return SteamClient(store_base=fake_steam.url, max_retries=0, backoff=0.001, cache=LRUCache(ttl=0))
+
+
+def test_failed_fetch_is_deferred_with_backoff(app, stale_apps, fake_steam, steam):
+    with app.app_context():
+        assert set(stalest_valuable(10, MIN_AGE)) == {1, 2}
+        fake_steam.fail_next(100, 500)
+        assert refresh_apps([1], steam, workers=1, min_age=MIN_AGE)["failed"] == 1
+        state = db.session.get(AppRefreshState, 1)
+        assert state.failure_streak == 1
+        assert state.defer_until >= int(time.time()) + 2 * MIN_AGE - 5
+        assert stalest_valuable(10, MIN_AGE) == [2]
+
+        refresh_apps([1], steam, workers=1, min_age=MIN_AGE)
+        db.session.expire_all()
+        state = db.session.get(AppRefreshState, 1)
+        assert state.failure_streak == 2
+        assert state.defer_until >= int(time.time()) + 4 * MIN_AGE - 5
+
+
+def test_failure_backoff_is_capped(app, stale_apps, fake_steam, steam):
+    with app.app_context():
+        fake_steam.fail_next(100, 503)
+        for _ in range(4):
+            refresh_apps([1], steam, workers=1, min_age=MIN_AGE, max_defer=3 * MIN_AGE)
+        state = db.session.get(AppRefreshState, 1)
+        assert state.defer_until <= int(time.time()) + 3 * MIN_AGE
+
+
+def test_success_resets_the_failure_streak(app, stale_apps, fake_steam, steam):
+    with app.app_context():
+        fake_steam.fail_next(1, 500)
+        assert refresh_apps([1], steam, workers=1, min_age=MIN_AGE)["failed"] == 1
+        assert refresh_apps([1], steam, workers=1, min_age=MIN_AGE)["changed"] == 1
+        db.session.expire_all()
+        state = db.session.get(AppRefreshState, 1)
+        assert (state.failure_streak, state.unchanged_streak, state.defer_until) == (0, 0, 0)
@@ -0,0 +1,60 @@
+import pytest
+from app.services.app_metadata import ingest_app_metadata
+from app.services.response_cache import get_response_cache
+
+
+@pytest.fixture
+def cached_app(make_app, tmp_path):
+    return make_app(RESPONSE_CACHE_PATH=str(tmp_path / "responses.db"), LEADERBOARDS_ENABLED=False)
+
+
+@pytest.fixture
+def catalog(cached_app):
+    with cached_app.app_context():
+        ingest_app_metadata([{"appid": 10 + i, "name": f"App {i}", "positive": 80 + i, "negative": 20}
+                             for i in range(5)])
+
+
+def test_repeat_requests_are_served_from_the_cache(cached_app, catalog):
+    client = cached_app.test_client()
+    first = client.get("/api/recommendations?limit=3&min_reviews=1")
+    second = client.get("/api/recommendations?min_reviews=1&limit=3")
+    assert first.get_data() == second.get_data()
+    assert first.headers["ETag"] == second.headers["ETag"]
+    with cached_app.app_context():
+        assert get_response_cache().stats()["computed"] == 1
+
+
+def test_matching_etag_gets_304(cached_app, catalog):
+    client = cached_app.test_client()
+    etag = client.get("/api/recommendations?limit=3&min_reviews=1").headers["ETag"]
+    response = client.get("/api/recommendations?limit=3&min_reviews=1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not response.get_data()
+
+
+def test_catalog_updated_invalidates(cached_app, catalog):
+    client = cached_app.test_client()
+    before = client.get("/api/recommendations?limit=3&min_reviews=1")
+    with cached_app.app_context():
+        ingest_app_metadata([{"appid": 99, "name": "New", "positive": 100, "negative": 0}])
+    after = client.get("/api/recommendations?limit=3&min_reviews=1", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert int(after.headers["X-Catalog-Version"]) > int(before.headers["X-Catalog-Version"])
+    assert after.get_json()[0]["appid"] == 99
+
+
+def test_memory_engine_sees_the_write_under_the_new_version(cached_app, catalog):
+    cached_app.config["RANKING_ENGINE"] = "memory"
+    cached_app.config["RANKING_REFRESH_SECONDS"] = 3600
+    client = cached_app.test_client()
+    client.get("/api/recommendations?limit=3&min_reviews=1")
+    with cached_app.app_context():
+        ingest_app_metadata([{"appid": 99, "name": "New", "positive": 100, "negative": 0}])
+    assert client.get("/api/recommendations?limit=3&min_reviews=1").get_json()[0]["appid"] == 99
+
+
+def test_errors_are_not_cached_as_success(cached_app, catalog):
+    client = cached_app.test_client()
+    assert client.get("/api/recommendations?cursor=bad").status_code == 400
+    assert client.get("/api/recommendations?cursor=bad").status_code == 400
@@ -0,0 +1,51 @@
+import pytest
+from app.extensions import db
+from app.services.app_metadata import ingest_app_metadata
+from app.services.search import search_index_available
+
+
+def _names(client, query):
+    response = client.get(f"/api/recommendations?min_reviews=1&limit=50&{query}")
+    assert response.status_code == 200
+    return sorted(row["name"] for row in response.get_json())
+
+
+@pytest.fixture
+def catalog(app, add_apps):
+    app.config["LEADERBOARDS_ENABLED"] = False
+    add_apps(*(dict(appid=i + 1, name=name, positive=90, negative=10) for i, name in enumerate(
+        ["Portal", "Portal 2", "Teleportal", "Dota 2", "Half-Life", "Quake \"Arena\""])))
+
+
+def test_index_is_built_on_boot(app):
+    with app.app_context():
+        assert search_index_available(db.engine)
+
+
+def test_substring_and_prefix_match(client, catalog):
+    assert _names(client, "q=portal") == ["Portal", "Portal 2", "Teleportal"]
+    assert _names(client, "q=portal&match=prefix") == ["Portal", "Portal 2"]
+    assert _names(client, "q=LIFE") == ["Half-Life"]
+
+
+def test_short_queries_fall_back_to_like(client, catalog):
+    assert _names(client, "q=2") == ["Dota 2", "Portal 2"]
+
+
+def test_fts_operators_in_input_are_literal(client, catalog):
+    assert _names(client, 'q="Arena"') == ['Quake "Arena"']
+    assert _names(client, "q=portal OR dota") == []
+
+
+def test_renames_and_bulk_writes_are_searchable(app, client, catalog):
+    with app.app_context():
+        ingest_app_metadata([{"appid": 4, "name": "Dota Underlords"}, {"appid": 99, "name": "Portalized", "positive": 9,
+                                                                         "negative": 1}])
+    assert _names(client, "q=dota") == ["Dota Underlords"]
+    assert "Portalized" in _names(client, "q=portal")
+
+
+def test_relevance_sort_has_no_cursor(client, catalog):
+    response = client.get("/api/recommendations?min_reviews=1&limit=1&q=portal&sort=relevance")
+    assert len(response.get_json()) == 1
+    assert "X-Next-Cursor" not in response.headers
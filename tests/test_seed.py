@@ -0,0 +1,45 @@
+import pytest
+from app.extensions import db
+from app.models.appdetails import App
+
+
+@pytest.fixture
+def seed_app(make_app, fake_steam):
+    return make_app(STEAM_STORE_BASE=fake_steam.url, STEAM_API_BASE=fake_steam.url, STEAM_MAX_RETRIES=3,
+                    STEAM_BACKOFF_SECONDS=0.001, STEAM_RATE_PER_SECOND=1000.0, STEAM_RATE_BURST=100, SEED_WORKERS=1)
+
+
+def _seed(app, appids):
+    response = app.test_client().post("/api/seed", json={"appids": appids})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_seed_retries_429_and_5xx(seed_app, fake_steam):
+    fake_steam.fail_next(2, 429, retry_after=0)
+    fake_steam.fail_next(1, 503)
+    report = _seed(seed_app, [10, 20, 30])
+    assert (report["seeded"], report["failed"]) == (3, [])
+    assert fake_steam.requests["faults"] == 3
+    with seed_app.app_context():
+        apps = {a.appid: a for a in App.query.all()}
+        assert apps[10].name == "Fake App 10"
+        assert all(apps[a].last_fetched_ts for a in (10, 20, 30))
+
+
+def test_seed_reports_apps_that_run_out_of_retries(seed_app, fake_steam):
+    fake_steam.fail_next(4, 500)
+    #workers=1: every retry of the first app's details call fails, the others go through
+    report = _seed(seed_app, [10, 20, "x"])
+    assert report["seeded"] == 1
+    assert sorted(str(f["appid"]) for f in report["failed"]) == ["10", "x"]
+    with seed_app.app_context():
+        assert db.session.get(App, 10) is None
+        assert db.session.get(App, 20) is not None
+
+
+def test_seed_hits_the_client_cache_on_repeat(seed_app, fake_steam):
+    _seed(seed_app, [10])
+    before = dict(fake_steam.requests)
+    _seed(seed_app, [10])
+    assert fake_steam.requests == before
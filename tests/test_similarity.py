@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import select
+from app.extensions import db
+from app.models.similarity import AppNeighbor, NeighborDirty
+from app.services.app_metadata import ingest_app_metadata
+from app.services.owned_games_sync import upsert_owned_games_only
+from app.services.similarity import build_incremental, build_neighbors
+
+
+@pytest.fixture
+def catalog(app):
+    with app.app_context():
+        ingest_app_metadata([{"appid": a, "name": f"App {a}", "positive": 90, "negative": 10,
+                              "genres": ["Action"] if a <= 5 else ["RPG"], "categories": ["Co-op"] if a % 2 else []}
+                             for a in range(1, 11)])
+        for user_id in (1, 2, 3):
+            upsert_owned_games_only(user_id, [{"appid": a, "playtime_forever": 60} for a in (1, 2, 6)])
+
+
+def _dirty():
+    return sorted(a for (a,) in db.session.execute(select(NeighborDirty.appid)))
+
+
+def _lists():
+    rows = db.session.execute(select(AppNeighbor.appid, AppNeighbor.rank, AppNeighbor.neighbor_appid)
+                              .order_by(AppNeighbor.appid, AppNeighbor.rank))
+    return [tuple(row) for row in rows]
+
+
+def test_similar_route_reads_the_built_lists(app, client, catalog):
+    with app.app_context():
+        build_neighbors(None, k=3)
+        assert _dirty() == []
+    rows = client.get("/api/apps/1/similar?limit=2").get_json()
+    assert len(rows) == 2 and rows[0]["appid"] == 2
+    #same genre and co-owned beats either one alone
+    assert rows[0]["similarity"] > rows[1]["similarity"] > 0
+    assert client.get("/api/apps/999/similar").get_json() == []
+
+
+def test_writes_mark_dirty_in_their_own_transaction(app, catalog):
+    with app.app_context():
+        build_neighbors(None, k=3)
+        upsert_owned_games_only(1, [{"appid": a, "playtime_forever": 90} for a in (1, 2, 6)])
+        assert _dirty() == []
+        #playtime only, co-ownership didn't change
+        upsert_owned_games_only(1, [{"appid": a, "playtime_forever": 90} for a in (1, 2, 6, 9)])
+        ingest_app_metadata([{"appid": 4, "genres": ["RPG"]}])
+        db.session.rollback()
+        #nothing left pending: the marks were committed with the rows
+        assert _dirty() == [4, 9]
+
+
+def test_incremental_build_matches_full_build(app, catalog):
+    with app.app_context():
+        build_neighbors(None, k=3)
+        ingest_app_metadata([{"appid": 4, "genres": ["RPG"]}])
+        upsert_owned_games_only(2, [{"appid": a, "playtime_forever": 60} for a in (1, 2, 6, 7)])
+        assert build_incremental(k=3)["dirty"] == 2
+        incremental = _lists()
+        build_neighbors(None, k=3)
+        assert _lists() == incremental
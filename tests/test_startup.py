@@ -0,0 +1,45 @@
+import os, subprocess, sys, time
+import pytest
+from scripts import init_db
+
+
+def _ready(client, timeout=10.0):
+    """Probe until the warmup has finished one way or the other."""
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/api/ready")
+        if response.status_code == 200 or response.get_json()["error"] or time.monotonic() > deadline:
+            return response
+        time.sleep(0.02)
+
+
+def test_ready_waits_for_the_warmup(client):
+    assert client.get("/api/health").get_json() == {"ok": True}
+    body = _ready(client).get_json()
+    assert body["ok"] and body["database"]
+    assert {"snapshot", "facets", "libraries", "personalizer", "total"} <= set(body["warmup_ms"])
+    assert {"import", "config", "routes", "database"} <= set(body["startup_ms"])
+
+
+def test_missing_schema_is_not_ready_until_init_db(make_app, monkeypatch):
+    client = make_app(SCHEMA_AUTO_CREATE=False).test_client()
+    response = _ready(client)
+    assert response.status_code == 503
+    assert "init_db" in response.get_json()["error"]
+
+    monkeypatch.setattr(sys, "argv", ["init_db", "--check"])
+    with pytest.raises(SystemExit) as exit:
+        init_db.main()
+    assert exit.value.code == 1
+    monkeypatch.setattr(sys, "argv", ["init_db"])
+    init_db.main()
+    assert _ready(client).status_code == 200
+    #the failed warmup is retried on the next probe
+
+
+def test_create_app_leaves_numpy_and_requests_unloaded(tmp_path):
+    code = ("import sys, app; app.create_app('dev'); "
+            "print([m for m in ('numpy', 'requests') if m in sys.modules])")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'lazy.db'}"}
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,43 @@
+import json
+from app.services.cache import canonical_key, scrub_key
+from app.services.disk_cache import DiskCache
+from app.services.steam_client import SteamClient
+
+
+def test_canonical_key_ignores_order_types_and_credentials():
+    key = canonical_key("http://x/owned", {"steamid": 7, "key": "SECRET", "include_appinfo": 1})
+    assert key == canonical_key("http://x/owned", {"include_appinfo": "1", "steamid": "7"})
+    assert "SECRET" not in key
+    assert canonical_key("http://x/y", {"key": "SECRET"}) == "http://x/y"
+
+
+def test_scrub_key_cleans_keys_stored_before_the_fix():
+    assert scrub_key("http://x/owned?key=SECRET&steamid=7") == "http://x/owned?steamid=7"
+    assert scrub_key("http://x/y") == "http://x/y"
+
+
+def test_api_key_never_reaches_the_disk_cache_or_dumps(tmp_path, monkeypatch):
+    monkeypatch.setenv("STEAM_API_KEY", "SECRET")
+    disk = DiskCache(str(tmp_path / "steam.db"))
+    client = SteamClient(disk_cache=disk)
+    seen = []
+    monkeypatch.setattr(client, "_fetch", lambda url, params, endpoint: seen.append(params) or
+                        {"response": {"game_count": 1, "games": [{"appid": 10}]}})
+    assert client.owned_games("7") == ([{"appid": 10}], 1)
+    assert seen[0]["key"] == "SECRET"
+    #still sent upstream, just never stored
+    assert disk.stats()["entries"] == 0
+
+    disk.put("http://x/owned?key=SECRET&steamid=7", {"old": True})
+    dump = tmp_path / "dump.jsonl"
+    disk.dump(str(dump))
+    assert "SECRET" not in dump.read_text()
+    assert json.loads(dump.read_text())["key"] == "http://x/owned?steamid=7"
+
+
+def test_storefront_responses_use_the_disk_tier(tmp_path, fake_steam):
+    disk = DiskCache(str(tmp_path / "steam.db"))
+    SteamClient(store_base=fake_steam.url, disk_cache=disk).app_details(10)
+    fresh = SteamClient(store_base=fake_steam.url, disk_cache=disk)
+    assert fresh.app_details(10)["10"]["data"]["name"] == "Fake App 10"
+    assert fake_steam.requests["appdetails"] == 1